@@ -0,0 +1,43 @@
+"""Add unique constraint on study_achievements (user_id, type)
+
+Revision ID: add_achievement_user_type_unique
+Revises: add_user_stats_table
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_achievement_user_type_unique'
+down_revision: Union[str, None] = 'add_user_stats_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 清理重复记录：每个用户每种成就只保留等级最高（同等级时id最大）的一行
+    op.execute("""
+        DELETE FROM study_achievements a
+        USING study_achievements b
+        WHERE a.user_id = b.user_id
+          AND a.type = b.type
+          AND (a.level < b.level OR (a.level = b.level AND a.id < b.id))
+    """)
+
+    # 添加唯一约束
+    op.create_unique_constraint(
+        'uq_study_achievements_user_type',
+        'study_achievements',
+        ['user_id', 'type']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 删除唯一约束
+    op.drop_constraint('uq_study_achievements_user_type', 'study_achievements', type_='unique')
@@ -0,0 +1,39 @@
+"""Add study_daily_rollup table
+
+Revision ID: add_daily_rollup_table
+Revises: add_achievement_user_type_unique
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_daily_rollup_table'
+down_revision: Union[str, None] = 'add_achievement_user_type_unique'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 创建每日学习汇总表（创建后先运行 scripts/rebuild_daily_rollup.py --all 回填，再运行 rebuild_user_stats.py --all）
+    op.create_table(
+        'study_daily_rollup',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('common_users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('local_date', sa.Date(), primary_key=True),
+        sa.Column('task_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completed_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('total_minutes', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('hourly_counts', sa.JSON(), nullable=False),
+        sa.Column('hourly_minutes', sa.JSON(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 删除每日学习汇总表
+    op.drop_table('study_daily_rollup')
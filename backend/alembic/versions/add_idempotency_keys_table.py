@@ -0,0 +1,42 @@
+"""Add study_idempotency_keys table
+
+Revision ID: add_idempotency_keys_table
+Revises: add_task_client_key
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_idempotency_keys_table'
+down_revision: Union[str, None] = 'add_task_client_key'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 创建幂等键表（保存写接口首次执行的响应）
+    op.create_table(
+        'study_idempotency_keys',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('common_users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('key', sa.String(length=64), primary_key=True),
+        sa.Column('endpoint', sa.String(length=64), primary_key=True),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_study_idempotency_keys_expires_at', 'study_idempotency_keys', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 删除幂等键表
+    op.drop_index('ix_study_idempotency_keys_expires_at', table_name='study_idempotency_keys')
+    op.drop_table('study_idempotency_keys')
@@ -0,0 +1,57 @@
+"""Add id to task/plan list indexes for keyset pagination
+
+Revision ID: add_keyset_pagination_indexes
+Revises: add_study_composite_indexes
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_keyset_pagination_indexes'
+down_revision: Union[str, None] = 'add_study_composite_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 先在线建新索引再删除旧索引，期间列表查询始终有索引可用（CONCURRENTLY 不能在事务中执行）
+    with op.get_context().autocommit_block():
+        # 任务：(user_id, start DESC NULLS LAST, id DESC)，与列表的排序和游标条件一致（start 可以为空）
+        op.create_index(
+            'ix_study_tasks_user_start_id',
+            'study_tasks',
+            ['user_id', sa.text('start DESC NULLS LAST'), sa.text('id DESC')],
+            postgresql_include=['duration'],
+            postgresql_concurrently=True
+        )
+
+        # 计划：(user_id, created_at DESC NULLS LAST, id DESC)
+        op.create_index(
+            'ix_study_plans_user_created_id',
+            'study_plans',
+            ['user_id', sa.text('created_at DESC NULLS LAST'), sa.text('id DESC')],
+            postgresql_concurrently=True
+        )
+
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_study_tasks_user_start')
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_study_plans_user_created')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_study_plans_user_created', 'study_plans', ['user_id', 'created_at'])
+    op.create_index(
+        'ix_study_tasks_user_start',
+        'study_tasks',
+        ['user_id', sa.text('start DESC')],
+        postgresql_include=['duration']
+    )
+
+    op.drop_index('ix_study_plans_user_created_id', table_name='study_plans')
+    op.drop_index('ix_study_tasks_user_start_id', table_name='study_tasks')
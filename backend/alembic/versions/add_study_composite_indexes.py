@@ -0,0 +1,57 @@
+"""Add composite indexes for study tasks and plans
+
+Revision ID: add_study_composite_indexes
+Revises: add_daily_rollup_table
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_study_composite_indexes'
+down_revision: Union[str, None] = 'add_daily_rollup_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 在线建索引（CONCURRENTLY 不能在事务中执行）
+    with op.get_context().autocommit_block():
+        # 任务：按用户+开始时间范围查询、倒序排列，附带duration支持仅索引扫描
+        op.create_index(
+            'ix_study_tasks_user_start',
+            'study_tasks',
+            ['user_id', sa.text('start DESC')],
+            postgresql_include=['duration'],
+            postgresql_concurrently=True
+        )
+
+        # 计划：按用户查询、按创建时间排序
+        op.create_index(
+            'ix_study_plans_user_created',
+            'study_plans',
+            ['user_id', 'created_at'],
+            postgresql_concurrently=True
+        )
+
+        # 任务名称和计划内容从不作为查询条件，删除无用的btree索引
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_study_tasks_name')
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_study_plans_text')
+
+    # 成就的 (user_id, type) 已由唯一约束 uq_study_achievements_user_type 的索引覆盖，无需重复建索引
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 恢复名称/内容索引
+    op.create_index('ix_study_plans_text', 'study_plans', ['text'])
+    op.create_index('ix_study_tasks_name', 'study_tasks', ['name'])
+
+    # 删除复合索引
+    op.drop_index('ix_study_plans_user_created', table_name='study_plans')
+    op.drop_index('ix_study_tasks_user_start', table_name='study_tasks')
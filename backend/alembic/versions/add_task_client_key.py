@@ -0,0 +1,40 @@
+"""Add client_key to study tasks for idempotent bulk sync
+
+Revision ID: add_task_client_key
+Revises: add_keyset_pagination_indexes
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_task_client_key'
+down_revision: Union[str, None] = 'add_keyset_pagination_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 可空列无默认值，PostgreSQL只修改表定义，不重写表
+    op.add_column('study_tasks', sa.Column('client_key', sa.String(length=64), nullable=True))
+
+    # 唯一索引供批量同步的 INSERT ... ON CONFLICT DO NOTHING 使用，在线创建（CONCURRENTLY 不能在事务中执行）
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_study_tasks_user_client_key',
+            'study_tasks',
+            ['user_id', 'client_key'],
+            unique=True,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_study_tasks_user_client_key', table_name='study_tasks')
+    op.drop_column('study_tasks', 'client_key')
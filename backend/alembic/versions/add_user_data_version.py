@@ -0,0 +1,29 @@
+"""Add data_version to study_user_stats
+
+Revision ID: add_user_data_version
+Revises: add_idempotency_keys_table
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_data_version'
+down_revision: Union[str, None] = 'add_idempotency_keys_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 用户数据版本（统计和成就接口的ETag），已有记录从0开始，下一次写入时更新
+    op.add_column('study_user_stats', sa.Column('data_version', sa.BigInteger(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('study_user_stats', 'data_version')
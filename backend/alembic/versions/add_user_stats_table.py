@@ -0,0 +1,47 @@
+"""Add study_user_stats table
+
+Revision ID: add_user_stats_table
+Revises: 71c0d6672908
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_stats_table'
+down_revision: Union[str, None] = '71c0d6672908'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 创建用户统计汇总表（创建后运行 scripts/rebuild_user_stats.py --all 回填数据）
+    op.create_table(
+        'study_user_stats',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('common_users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('total_tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('total_minutes', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('long_tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('night_tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('early_tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('weekend_tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('max_daily_tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('longest_streak', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('current_streak', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_study_date', sa.Date(), nullable=True),
+        sa.Column('last_day_tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('total_plans', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completed_plans', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 删除用户统计汇总表
+    op.drop_table('study_user_stats')
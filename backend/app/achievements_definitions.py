@@ -2,6 +2,7 @@
 """
 成就定义文件
 包含所有成就的名称、描述、解锁条件和等级
+每个等级的解锁条件为声明式规则 (统计指标, 比较运算符, 阈值)，由 app.services.achievements 编译后批量求值
 """
 
 ACHIEVEMENTS = [
@@ -13,17 +14,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成1个番茄钟任务",
-                "condition": lambda user_stats: user_stats["total_tasks"] >= 1
+                "rule": ("total_tasks", ">=", 1)
             },
             {
                 "level": 2,
                 "description": "完成30个番茄钟任务",
-                "condition": lambda user_stats: user_stats["total_tasks"] >= 30
+                "rule": ("total_tasks", ">=", 30)
             },
             {
                 "level": 3,
                 "description": "完成150个番茄钟任务",
-                "condition": lambda user_stats: user_stats["total_tasks"] >= 150
+                "rule": ("total_tasks", ">=", 150)
             }
         ]
     },
@@ -35,17 +36,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "在晚上10点后完成1个任务",
-                "condition": lambda user_stats: user_stats["night_tasks"] >= 1
+                "rule": ("night_tasks", ">=", 1)
             },
             {
                 "level": 2,
                 "description": "在晚上10点后完成15个任务",
-                "condition": lambda user_stats: user_stats["night_tasks"] >= 15
+                "rule": ("night_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "在晚上10点后完成45个任务",
-                "condition": lambda user_stats: user_stats["night_tasks"] >= 45
+                "rule": ("night_tasks", ">=", 45)
             }
         ]
     },
@@ -57,17 +58,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "累计学习时间达到5小时",
-                "condition": lambda user_stats: user_stats["total_minutes"] >= 300
+                "rule": ("total_minutes", ">=", 300)
             },
             {
                 "level": 2,
                 "description": "累计学习时间达到30小时",
-                "condition": lambda user_stats: user_stats["total_minutes"] >= 1800
+                "rule": ("total_minutes", ">=", 1800)
             },
             {
                 "level": 3,
                 "description": "累计学习时间达到100小时",
-                "condition": lambda user_stats: user_stats["total_minutes"] >= 6000
+                "rule": ("total_minutes", ">=", 6000)
             }
         ]
     },
@@ -79,17 +80,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "在早上6点前开始1个任务",
-                "condition": lambda user_stats: user_stats["early_tasks"] >= 1
+                "rule": ("early_tasks", ">=", 1)
             },
             {
                 "level": 2,
                 "description": "在早上6点前开始10个任务",
-                "condition": lambda user_stats: user_stats["early_tasks"] >= 10
+                "rule": ("early_tasks", ">=", 10)
             },
             {
                 "level": 3,
                 "description": "在早上6点前开始30个任务",
-                "condition": lambda user_stats: user_stats["early_tasks"] >= 30
+                "rule": ("early_tasks", ">=", 30)
             }
         ]
     },
@@ -101,17 +102,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "连续7天完成至少1个任务",
-                "condition": lambda user_stats: user_stats["streak_days"] >= 7
+                "rule": ("streak_days", ">=", 7)
             },
             {
                 "level": 2,
                 "description": "连续30天完成至少1个任务",
-                "condition": lambda user_stats: user_stats["streak_days"] >= 30
+                "rule": ("streak_days", ">=", 30)
             },
             {
                 "level": 3,
                 "description": "连续90天完成至少1个任务",
-                "condition": lambda user_stats: user_stats["streak_days"] >= 90
+                "rule": ("streak_days", ">=", 90)
             }
         ]
     },
@@ -123,17 +124,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "创建10个学习计划",
-                "condition": lambda user_stats: user_stats["total_plans"] >= 10
+                "rule": ("total_plans", ">=", 10)
             },
             {
                 "level": 2,
                 "description": "创建30个学习计划",
-                "condition": lambda user_stats: user_stats["total_plans"] >= 30
+                "rule": ("total_plans", ">=", 30)
             },
             {
                 "level": 3,
                 "description": "创建90个学习计划",
-                "condition": lambda user_stats: user_stats["total_plans"] >= 90
+                "rule": ("total_plans", ">=", 90)
             }
         ]
     },
@@ -145,17 +146,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个计划中的任务",
-                "condition": lambda user_stats: user_stats["completed_plans"] >= 5
+                "rule": ("completed_plans", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成20个计划中的任务",
-                "condition": lambda user_stats: user_stats["completed_plans"] >= 20
+                "rule": ("completed_plans", ">=", 20)
             },
             {
                 "level": 3,
                 "description": "完成60个计划中的任务",
-                "condition": lambda user_stats: user_stats["completed_plans"] >= 60
+                "rule": ("completed_plans", ">=", 60)
             }
         ]
     },
@@ -167,17 +168,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个25分钟以上的任务",
-                "condition": lambda user_stats: user_stats["long_tasks"] >= 5
+                "rule": ("long_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成25个25分钟以上的任务",
-                "condition": lambda user_stats: user_stats["long_tasks"] >= 25
+                "rule": ("long_tasks", ">=", 25)
             },
             {
                 "level": 3,
                 "description": "完成60个25分钟以上的任务",
-                "condition": lambda user_stats: user_stats["long_tasks"] >= 60
+                "rule": ("long_tasks", ">=", 60)
             }
         ]
     },
@@ -189,17 +190,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "在周末完成3个任务",
-                "condition": lambda user_stats: user_stats["weekend_tasks"] >= 3
+                "rule": ("weekend_tasks", ">=", 3)
             },
             {
                 "level": 2,
                 "description": "在周末完成15个任务",
-                "condition": lambda user_stats: user_stats["weekend_tasks"] >= 15
+                "rule": ("weekend_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "在周末完成40个任务",
-                "condition": lambda user_stats: user_stats["weekend_tasks"] >= 40
+                "rule": ("weekend_tasks", ">=", 40)
             }
         ]
     },
@@ -211,17 +212,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "单日完成5个任务",
-                "condition": lambda user_stats: user_stats["max_daily_tasks"] >= 5
+                "rule": ("max_daily_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "单日完成10个任务",
-                "condition": lambda user_stats: user_stats["max_daily_tasks"] >= 10
+                "rule": ("max_daily_tasks", ">=", 10)
             },
             {
                 "level": 3,
                 "description": "单日完成20个任务",
-                "condition": lambda user_stats: user_stats["max_daily_tasks"] >= 20
+                "rule": ("max_daily_tasks", ">=", 20)
             }
         ]
     },
@@ -233,17 +234,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"经济\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("economics_tasks", 0) >= 5
+                "rule": ("economics_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"经济\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("economics_tasks", 0) >= 15
+                "rule": ("economics_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"经济\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("economics_tasks", 0) >= 30
+                "rule": ("economics_tasks", ">=", 30)
             }
         ]
     },
@@ -255,17 +256,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"数学\"或\"统计\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("math_stats_tasks", 0) >= 5
+                "rule": ("math_stats_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"数学\"或\"统计\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("math_stats_tasks", 0) >= 15
+                "rule": ("math_stats_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"数学\"或\"统计\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("math_stats_tasks", 0) >= 30
+                "rule": ("math_stats_tasks", ">=", 30)
             }
         ]
     },
@@ -277,17 +278,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"英语\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("english_tasks", 0) >= 5
+                "rule": ("english_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"英语\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("english_tasks", 0) >= 15
+                "rule": ("english_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"英语\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("english_tasks", 0) >= 30
+                "rule": ("english_tasks", ">=", 30)
             }
         ]
     },
@@ -299,17 +300,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"货币\"或\"银行\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("money_banking_tasks", 0) >= 5
+                "rule": ("money_banking_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"货币\"或\"银行\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("money_banking_tasks", 0) >= 15
+                "rule": ("money_banking_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"货币\"或\"银行\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("money_banking_tasks", 0) >= 30
+                "rule": ("money_banking_tasks", ">=", 30)
             }
         ]
     },
@@ -321,17 +322,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"金融\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("finance_tasks", 0) >= 5
+                "rule": ("finance_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"金融\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("finance_tasks", 0) >= 15
+                "rule": ("finance_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"金融\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("finance_tasks", 0) >= 30
+                "rule": ("finance_tasks", ">=", 30)
             }
         ]
     },
@@ -343,17 +344,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"财务\"或\"会计\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("accounting_tasks", 0) >= 5
+                "rule": ("accounting_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"财务\"或\"会计\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("accounting_tasks", 0) >= 15
+                "rule": ("accounting_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"财务\"或\"会计\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("accounting_tasks", 0) >= 30
+                "rule": ("accounting_tasks", ">=", 30)
             }
         ]
     },
@@ -365,17 +366,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"投资\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("investment_tasks", 0) >= 5
+                "rule": ("investment_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"投资\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("investment_tasks", 0) >= 15
+                "rule": ("investment_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"投资\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("investment_tasks", 0) >= 30
+                "rule": ("investment_tasks", ">=", 30)
             }
         ]
     },
@@ -387,17 +388,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "完成5个包含\"考研\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("exam_prep_tasks", 0) >= 5
+                "rule": ("exam_prep_tasks", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "完成15个包含\"考研\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("exam_prep_tasks", 0) >= 15
+                "rule": ("exam_prep_tasks", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "完成30个包含\"考研\"关键词的任务",
-                "condition": lambda user_stats: user_stats.get("exam_prep_tasks", 0) >= 30
+                "rule": ("exam_prep_tasks", ">=", 30)
             }
         ]
     },
@@ -409,17 +410,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "获得5个其他成就",
-                "condition": lambda user_stats: user_stats.get("total_achievements", 0) >= 5
+                "rule": ("total_achievements", ">=", 5)
             },
             {
                 "level": 2,
                 "description": "获得10个其他成就",
-                "condition": lambda user_stats: user_stats.get("total_achievements", 0) >= 10
+                "rule": ("total_achievements", ">=", 10)
             },
             {
                 "level": 3,
                 "description": "获得18个其他成就",
-                "condition": lambda user_stats: user_stats.get("total_achievements", 0) >= 18
+                "rule": ("total_achievements", ">=", 18)
             }
         ]
     },
@@ -431,17 +432,17 @@ ACHIEVEMENTS = [
             {
                 "level": 1,
                 "description": "解锁8个成就",
-                "condition": lambda user_stats: user_stats.get("unlocked_achievements", 0) >= 8
+                "rule": ("unlocked_achievements", ">=", 8)
             },
             {
                 "level": 2,
                 "description": "解锁15个成就",
-                "condition": lambda user_stats: user_stats.get("unlocked_achievements", 0) >= 15
+                "rule": ("unlocked_achievements", ">=", 15)
             },
             {
                 "level": 3,
                 "description": "解锁19个成就",
-                "condition": lambda user_stats: user_stats.get("unlocked_achievements", 0) >= 19
+                "rule": ("unlocked_achievements", ">=", 19)
             }
         ]
     }
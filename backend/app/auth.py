@@ -1,25 +1,83 @@
 # backend/app/auth.py
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, NamedTuple, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.schemas.token import TokenData
 from app.modules.common.models import User
 from app.database import get_db
-from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.cache import TTLCache, create_cache
+from app.core.workers import BoundedExecutor, PoolBusyError
+from app.core.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, CACHE_REDIS_URL, USER_CACHE_SIZE, USER_CACHE_TTL,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+)
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# bcrypt每次耗时约100-300ms，在有界线程池中执行
+password_hasher = BoundedExecutor("password-hash", PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+# 已解码的令牌只缓存在本进程；用户快照可通过 CACHE_REDIS_URL 在多个进程间共享
+_claims_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_user_cache = create_cache("auth:user", maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, redis_url=CACHE_REDIS_URL)
+
+
+class CurrentUser(NamedTuple):
+    """认证用户的精简快照，只包含鉴权和常用接口需要的字段"""
+    id: int
+    username: str
+    is_active: bool
+    is_superuser: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def of(cls, user: User) -> "CurrentUser":
+        return cls(user.id, user.username, bool(user.is_active), bool(user.is_superuser), user.created_at)
+
+    def to_cache(self) -> Dict[str, Any]:
+        data = self._asdict()
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return data
+
+    @classmethod
+    def from_cache(cls, data: Dict[str, Any]) -> "CurrentUser":
+        created_at = data.get("created_at")
+        return cls(
+            id=data["id"],
+            username=data["username"],
+            is_active=data["is_active"],
+            is_superuser=data["is_superuser"],
+            created_at=datetime.fromisoformat(created_at) if created_at else None
+        )
+
+
 def get_password_hash(password: str):
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
+async def _run_hasher(fn, *args):
+    try:
+        return await password_hasher.run(fn, *args)
+    except PoolBusyError:
+        raise HTTPException(status_code=503, detail="服务繁忙，请稍后再试")
+
+async def get_password_hash_async(password: str) -> str:
+    """在密码哈希线程池中计算哈希，不阻塞事件循环"""
+    return await _run_hasher(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在密码哈希线程池中校验密码，不阻塞事件循环"""
+    return await _run_hasher(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     # Fix: Use datetime.utcnow() instead of datetime.now(datetime.timezone.utc)
@@ -27,31 +85,70 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """解码并校验令牌，结果缓存到令牌过期为止（最长 USER_CACHE_TTL 秒）"""
+    claims = _claims_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        remaining = claims.get("exp", 0) - time.time()
+        if remaining > 0:
+            _claims_cache.set(token, claims, ttl=min(USER_CACHE_TTL, remaining))
+    return claims
+
+def invalidate_user_cache(user_id: int) -> None:
+    """用户信息变化（改名、停用、删除等）后清除其缓存快照"""
+    _user_cache.delete(user_id)
+
+def user_cache_stats() -> Dict[str, Any]:
+    """认证缓存命中统计"""
+    return {"claims": _claims_cache.stats(), "users": _user_cache.stats()}
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+        payload = decode_access_token(token)
+        user_id: Optional[int] = payload.get("uid")
+        username: Optional[str] = payload.get("sub")
+        if user_id is None and username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    if user_id is not None:
+        # 命中缓存时不访问数据库（Redis缓存在线程池中读取）
+        cached = await _user_cache.aget(user_id)
+        if cached is not None:
+            return CurrentUser.from_cache(cached)
+        user = await run_in_threadpool(db.get, User, user_id)
+    else:
+        # 兼容不含用户ID的旧令牌
+        user = await run_in_threadpool(lambda: db.query(User).filter(User.username == username).first())
+
     if user is None:
         raise credentials_exception
-    return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+    current_user = CurrentUser.of(user)
+    await _user_cache.aset(user.id, current_user.to_cache())
+    return current_user
+
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="用户未激活")
     return current_user
 
-async def get_current_superuser(current_user: User = Depends(get_current_user)):
+async def get_current_superuser(current_user: CurrentUser = Depends(get_current_user)):
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="权限不足")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_user_record(current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_db)) -> User:
+    """需要完整用户资料（邮箱、头像等）的接口使用，按主键读取用户记录"""
+    user = await run_in_threadpool(db.get, User, current_user.id)
+    if user is None:
+        await _user_cache.adelete(current_user.id)
+        raise HTTPException(status_code=404, detail="用户不存在")
+    return user
@@ -0,0 +1,298 @@
+# backend/app/core/backplane.py
+"""
+WebSocket服务的在线状态与消息分发后端
+内存实现只适用于单进程；Redis实现（或兼容Redis协议的服务）让多个WebSocket进程/节点共享在线用户集合，
+并通过发布订阅把消息分发到其他节点。每个节点的在线用户保存在带过期时间的哈希中，
+节点异常退出后其在线用户在 node_ttl 秒内自动消失。
+在线状态的每次可见变化分配一个全局递增的版本号，客户端据此发现漏掉的增量。
+API进程通过 notify_nodes 向所有节点发送消息（如用户资料变化）：使用Redis时发布到频道，
+单进程部署时直接请求WebSocket服务的内部接口
+"""
+import os
+import hmac
+import json
+import uuid
+import hashlib
+import socket
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# 节点哈希中的占位字段，没有在线用户的节点也保留哈希，哈希消失即说明节点已退出
+_NODE_FIELD = "_node"
+
+
+def _node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class MemoryBackplane:
+    """进程内实现：在线用户只在本进程可见，publish 不分发到其他节点"""
+
+    def __init__(self):
+        self.node_id = _node_id()
+        self._users: Dict[int, bool] = {}  # user_id -> 隐私模式
+        self._version = 0
+
+    async def start(self, handler: MessageHandler) -> None:
+        """开始接收其他节点的消息（内存实现没有其他节点）"""
+
+    async def close(self) -> None:
+        self._users.clear()
+
+    async def join(self, user_id: int, privacy: bool = False) -> None:
+        self._users[user_id] = privacy
+
+    async def leave(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+    async def set_privacy(self, user_id: int, privacy: bool) -> None:
+        if user_id in self._users:
+            self._users[user_id] = privacy
+
+    async def online(self) -> Dict[int, bool]:
+        """所有节点的在线用户，user_id -> 隐私模式"""
+        return dict(self._users)
+
+    async def status(self, user_id: int) -> Optional[bool]:
+        """单个用户的在线状态：不在线为None，否则为隐私模式"""
+        return self._users.get(user_id)
+
+    async def next_version(self) -> int:
+        """分配下一个在线状态版本号"""
+        self._version += 1
+        return self._version
+
+    async def current_version(self) -> int:
+        return self._version
+
+    async def reap(self) -> bool:
+        """清理已退出的节点，返回是否清理了节点（内存实现没有其他节点）"""
+        return False
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """把消息发送给其他节点（本节点的连接由调用方直接处理）"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "node": self.node_id, "local_users": len(self._users)}
+
+
+class RedisBackplane:
+    """
+    基于Redis发布订阅的实现
+    {prefix}:nodes 记录节点集合，{prefix}:node:{node_id} 为节点的在线用户哈希（user_id -> 隐私模式），
+    节点定期续期；消息通过 {prefix}:events 频道分发，带上来源节点以忽略自己发出的消息
+    """
+
+    def __init__(self, client, prefix: str = "ws", node_ttl: int = 30):
+        self.client = client
+        self.prefix = prefix
+        self.node_ttl = node_ttl
+        self.node_id = _node_id()
+        self._users: Dict[int, bool] = {}
+        self._tasks = []
+        self._pubsub = None
+
+    @property
+    def _nodes_key(self) -> str:
+        return f"{self.prefix}:nodes"
+
+    @property
+    def _node_key(self) -> str:
+        return f"{self.prefix}:node:{self.node_id}"
+
+    @property
+    def _channel(self) -> str:
+        return f"{self.prefix}:events"
+
+    @property
+    def _version_key(self) -> str:
+        return f"{self.prefix}:presence_version"
+
+    async def start(self, handler: MessageHandler) -> None:
+        """注册节点、订阅消息频道并启动节点续期"""
+        await self._write_users()
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._channel)
+        self._tasks = [
+            asyncio.create_task(self._listen(handler)),
+            asyncio.create_task(self._keepalive()),
+        ]
+        logger.info(f"WebSocket节点 {self.node_id} 已连接到Redis后端")
+
+    async def close(self) -> None:
+        """停止后台任务并删除本节点的在线用户"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.delete(self._node_key)
+                pipe.srem(self._nodes_key, self.node_id)
+                await pipe.execute()
+        finally:
+            if self._pubsub is not None:
+                await self._pubsub.aclose()
+            await self.client.aclose()
+        self._users.clear()
+
+    async def _listen(self, handler: MessageHandler) -> None:
+        async for raw in self._pubsub.listen():
+            try:
+                envelope = json.loads(raw["data"])
+                if envelope.get("node") == self.node_id:
+                    continue
+                await handler(envelope["message"])
+            except Exception as e:
+                logger.error(f"处理其他节点的消息失败: {str(e)}")
+
+    async def _keepalive(self) -> None:
+        """定期续期本节点的在线用户；Redis重启等原因丢失时按本地记录重新写入"""
+        while True:
+            await asyncio.sleep(max(self.node_ttl / 3, 1))
+            try:
+                await self._write_users()
+            except Exception as e:
+                logger.error(f"续期WebSocket节点失败: {str(e)}")
+
+    async def _write_users(self) -> None:
+        mapping = {_NODE_FIELD: 1, **{user_id: int(privacy) for user_id, privacy in self._users.items()}}
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._node_key)
+            pipe.hset(self._node_key, mapping=mapping)
+            pipe.expire(self._node_key, self.node_ttl)
+            pipe.sadd(self._nodes_key, self.node_id)
+            await pipe.execute()
+
+    async def join(self, user_id: int, privacy: bool = False) -> None:
+        self._users[user_id] = privacy
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._node_key, mapping={_NODE_FIELD: 1, user_id: int(privacy)})
+            pipe.expire(self._node_key, self.node_ttl)
+            pipe.sadd(self._nodes_key, self.node_id)
+            await pipe.execute()
+
+    async def leave(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+        await self.client.hdel(self._node_key, user_id)
+
+    async def set_privacy(self, user_id: int, privacy: bool) -> None:
+        if user_id in self._users:
+            await self.join(user_id, privacy)
+
+    async def _each_node(self, command: str, *args) -> List[Tuple[str, Any]]:
+        """对所有节点的哈希执行同一条命令，返回 [(节点, 结果)]"""
+        nodes = sorted(self._text(node) for node in await self.client.smembers(self._nodes_key))
+        if not nodes:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for node in nodes:
+                getattr(pipe, command)(f"{self.prefix}:node:{node}", *args)
+            results = await pipe.execute()
+        return list(zip(nodes, results))
+
+    async def online(self) -> Dict[int, bool]:
+        """合并所有节点的在线用户；同一用户在多个节点在线时，任一连接开启隐私模式即视为开启"""
+        users: Dict[int, bool] = {}
+        for _, entries in await self._each_node("hgetall"):
+            for user_id, privacy in entries.items():
+                if self._text(user_id) == _NODE_FIELD:
+                    continue
+                user_id = int(user_id)
+                users[user_id] = users.get(user_id, False) or privacy in (b"1", "1")
+        return users
+
+    async def status(self, user_id: int) -> Optional[bool]:
+        """单个用户的在线状态：不在线为None，否则为隐私模式（规则同 online）"""
+        values = [value for _, value in await self._each_node("hget", user_id) if value is not None]
+        if not values:
+            return None
+        return any(value in (b"1", "1") for value in values)
+
+    async def next_version(self) -> int:
+        return int(await self.client.incr(self._version_key))
+
+    async def current_version(self) -> int:
+        return int(await self.client.get(self._version_key) or 0)
+
+    async def reap(self) -> bool:
+        """
+        从节点集合中移除哈希已过期的节点（节点异常退出），返回本节点是否移除了节点；
+        多个节点同时清理时只有一个节点的 SREM 生效，由它通知客户端重新同步
+        """
+        expired = [node for node, exists in await self._each_node("exists") if not exists and node != self.node_id]
+        if not expired:
+            return False
+        return bool(await self.client.srem(self._nodes_key, *expired))
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        await self.client.publish(self._channel, json.dumps({"node": self.node_id, "message": message}, default=str))
+
+    @staticmethod
+    def _text(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "node": self.node_id, "local_users": len(self._users), "node_ttl": self.node_ttl}
+
+
+_notify_clients: Dict[str, Any] = {}
+
+
+def internal_token(secret_key: str) -> str:
+    """WebSocket服务内部接口的令牌，由API和WebSocket服务共用的 SECRET_KEY 派生"""
+    return hmac.new(secret_key.encode(), b"ws-internal-notify", hashlib.sha256).hexdigest()
+
+
+def notify_nodes(
+    redis_url: Optional[str],
+    prefix: str,
+    message: Dict[str, Any],
+    service_url: Optional[str] = None,
+    secret_key: str = ""
+) -> bool:
+    """
+    供API进程使用：同步地把消息发送到所有WebSocket节点，返回是否已发送。
+    配置了Redis时发布到频道；否则（单进程内存后端）POST 到 service_url 的 /internal/notify。
+    发送失败时返回False，不影响调用方
+    """
+    try:
+        if redis_url:
+            client = _notify_clients.get(redis_url)
+            if client is None:
+                import redis
+                client = _notify_clients[redis_url] = redis.Redis.from_url(redis_url)
+            client.publish(f"{prefix}:events", json.dumps({"node": "api", "message": message}, default=str))
+            return True
+        if service_url:
+            import httpx
+            response = httpx.post(
+                f"{service_url.rstrip('/')}/internal/notify",
+                json=message,
+                headers={"X-Internal-Token": internal_token(secret_key)},
+                timeout=2.0
+            )
+            response.raise_for_status()
+            return True
+    except Exception as e:
+        logger.error(f"向WebSocket节点发送消息失败: {str(e)}")
+    return False
+
+
+def create_backplane(redis_url: Optional[str] = None, prefix: str = "ws", node_ttl: int = 30):
+    """
+    创建后端：配置了 redis_url 且安装了 redis 包时使用Redis，否则使用进程内实现（只能运行单个WebSocket进程）
+    """
+    if redis_url:
+        try:
+            import redis.asyncio as redis
+            return RedisBackplane(redis.Redis.from_url(redis_url), prefix, node_ttl)
+        except ImportError:
+            logger.warning("未安装redis包，WebSocket服务使用进程内后端")
+    return MemoryBackplane()
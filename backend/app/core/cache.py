@@ -0,0 +1,154 @@
+# backend/app/core/cache.py
+"""
+缓存
+线程安全的进程内 LRU + TTL 缓存，以及接口相同的 Redis 共享缓存（多进程部署时使用）。
+异步代码中使用 aget/aset/adelete：Redis缓存的网络请求在线程池中执行，不阻塞事件循环
+"""
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """容量有限的LRU缓存，条目在 ttl 秒后过期"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (self._timer() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    # 进程内缓存的操作不会阻塞，异步接口直接调用
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        return self.get(key, default)
+
+    async def aset(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl)
+
+    async def adelete(self, key: Hashable) -> None:
+        self.delete(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中统计"""
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0
+        }
+
+
+class RedisCache:
+    """
+    基于Redis（或兼容协议的服务）的共享缓存，接口与 TTLCache 一致
+    值以JSON保存，只适合缓存可JSON序列化的数据
+    """
+
+    def __init__(self, client, namespace: str, ttl: float = 300):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        seconds = max(int(self.ttl if ttl is None else ttl), 1)
+        self.client.set(self._key(key), json.dumps(value, default=str), ex=seconds)
+
+    def delete(self, key: Hashable) -> None:
+        self.client.delete(self._key(key))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.namespace}:*"):
+            self.client.delete(key)
+
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def adelete(self, key: Hashable) -> None:
+        await asyncio.to_thread(self.delete, key)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中统计（仅本进程）"""
+        total = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0
+        }
+
+
+def create_cache(namespace: str, maxsize: int = 10000, ttl: float = 300, redis_url: Optional[str] = None):
+    """
+    创建缓存：配置了 redis_url 且安装了 redis 包时使用共享缓存，否则使用进程内缓存
+    """
+    if redis_url:
+        try:
+            import redis
+            return RedisCache(redis.Redis.from_url(redis_url), namespace, ttl)
+        except ImportError:
+            logger.warning(f"未安装redis包，缓存 {namespace} 使用进程内缓存")
+    return TTLCache(maxsize=maxsize, ttl=ttl)
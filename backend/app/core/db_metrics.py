@@ -0,0 +1,230 @@
+# backend/app/core/db_metrics.py
+"""
+数据库连接池和查询指标
+通过连接池子类和SQLAlchemy事件记录连接获取等待时间、超时次数、连接使用量、慢查询以及每个请求的查询次数
+"""
+import re
+import time
+import logging
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from app.core.config import SLOW_QUERY_MS
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class _CheckoutStats:
+    """连接获取的等待时间和超时统计"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+
+class _TimedPoolMixin:
+    """记录从连接池获取连接的等待时间"""
+
+    def _do_get(self):
+        stats = self.__dict__.setdefault("checkout_stats", _CheckoutStats())
+        started = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            stats.record(time.monotonic() - started, timed_out=True)
+            raise
+        stats.record(time.monotonic() - started)
+        return connection
+
+    def recreate(self):
+        # 连接池重建（如 engine.dispose）时保留累计统计
+        pool = super().recreate()
+        pool.__dict__["checkout_stats"] = self.__dict__.setdefault("checkout_stats", _CheckoutStats())
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class QueryStats:
+    """查询次数、耗时和最近的慢查询"""
+
+    def __init__(self, slow_ms: float, keep: int = 20):
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.total_time = 0.0
+        self.slow_queries = 0
+        self.recent_slow = deque(maxlen=keep)
+
+    def record(self, engine_name: str, statement: str, elapsed: float) -> None:
+        elapsed_ms = elapsed * 1000
+        with self.lock:
+            self.queries += 1
+            self.total_time += elapsed
+            if elapsed_ms < self.slow_ms:
+                return
+            self.slow_queries += 1
+            self.recent_slow.append({
+                "engine": engine_name,
+                "ms": round(elapsed_ms, 2),
+                "statement": statement[:500],
+                "at": time.time()
+            })
+        logger.warning(f"慢查询 ({engine_name}) {elapsed_ms:.0f} ms: {statement[:200]}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "queries": self.queries,
+                "total_ms": round(self.total_time * 1000, 2),
+                "avg_ms": round(self.total_time * 1000 / self.queries, 2) if self.queries else 0,
+                "slow_threshold_ms": self.slow_ms,
+                "slow_queries": self.slow_queries,
+                "recent_slow": list(self.recent_slow)
+            }
+
+
+# 展开的 IN 参数列表（如 (?, ?, ?) 或 (%(id_1_1)s, %(id_1_2)s)）归并为一个占位符，使参数个数不同的同一语句视为相同
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """归一化SQL语句，用于识别同一请求中重复执行的语句"""
+    return _IN_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestQueries:
+    """单个请求（或一段代码）内执行的查询次数和累计耗时，profile 为真时按归一化语句计数"""
+    __slots__ = ("count", "total_time", "statements", "parent")
+
+    def __init__(self, profile: bool = False, parent: Optional["RequestQueries"] = None):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Optional[Counter] = Counter() if profile else None
+        self.parent = parent
+
+    def record(self, statement: str, elapsed: float) -> None:
+        queries = self
+        while queries is not None:
+            queries.count += 1
+            queries.total_time += elapsed
+            if queries.statements is not None:
+                queries.statements[normalize_statement(statement)] += 1
+            queries = queries.parent
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数超过 threshold 的语句（通常是循环中查询导致的 N+1）"""
+        if self.statements is None:
+            return []
+        return [(statement, count) for statement, count in self.statements.most_common() if count > threshold]
+
+
+# 由请求中间件设置；线程池中执行的同步数据库操作会复制上下文，因此计入同一个对象
+_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def track_request_queries(profile: bool = False):
+    """开始统计当前上下文中的查询，返回 (统计对象, 用于 reset 的令牌)；嵌套统计时外层同样计数"""
+    queries = RequestQueries(profile, parent=_request_queries.get())
+    return queries, _request_queries.set(queries)
+
+
+def stop_tracking_request_queries(token) -> None:
+    _request_queries.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """代码块执行的查询数超过预算"""
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "") -> Iterator[RequestQueries]:
+    """
+    限制代码块内的查询次数，超出时抛出 QueryBudgetExceeded，用于脚本或测试中防止接口退化为 N+1，例如：
+
+        with query_budget(3, "GET /api/study/statistics/summary"):
+            client.get("/api/study/statistics/summary", headers=headers)
+    """
+    queries, token = track_request_queries(profile=True)
+    try:
+        yield queries
+    finally:
+        stop_tracking_request_queries(token)
+    if queries.count > max_queries:
+        details = "; ".join(f"{count}x {statement[:200]}" for statement, count in queries.statements.most_common(5))
+        raise QueryBudgetExceeded(f"{label or '代码块'} 执行了 {queries.count} 条查询，预算 {max_queries}: {details}")
+
+
+query_stats = QueryStats(SLOW_QUERY_MS)
+_engines: Dict[str, Any] = {}
+
+
+def instrument_engine(engine, name: str) -> None:
+    """为同步引擎（异步引擎传入 async_engine.sync_engine）注册查询计时事件"""
+    _engines[name] = engine
+
+    # 开始时间保存在本次执行的上下文上，执行失败时随上下文一起丢弃
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.query_started
+        query_stats.record(name, statement, elapsed)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries.record(statement, elapsed)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """各引擎连接池的使用量和等待统计"""
+    result = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        data = {"class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "in_use": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout()
+            })
+        checkout = pool.__dict__.get("checkout_stats")
+        if checkout is not None:
+            with checkout.lock:
+                data.update({
+                    "checkouts": checkout.checkouts,
+                    "checkout_timeouts": checkout.timeouts,
+                    "avg_checkout_wait_ms": round(checkout.total_wait * 1000 / checkout.checkouts, 3) if checkout.checkouts else 0,
+                    "max_checkout_wait_ms": round(checkout.max_wait * 1000, 3)
+                })
+        result[name] = data
+    return result
@@ -0,0 +1,164 @@
+# backend/app/core/fanout.py
+"""
+WebSocket消息扇出
+每个连接有一个容量有限的发送队列和一个写任务：广播只把序列化好的消息放入各连接的队列，不等待发送完成，
+一个慢客户端不会拖慢其他客户端；队列满时按策略丢弃消息（drop）或断开该连接（disconnect）
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 断开慢客户端时使用的关闭码（1013 Try Again Later），客户端会自动重连并重新获取快照
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """单个WebSocket连接的发送队列；所有发送都经过写任务，同一连接上不会并发发送"""
+
+    def __init__(self, websocket, key: Hashable, maxsize: int = 256, policy: str = "disconnect", close_timeout: float = 1.0):
+        self.websocket = websocket
+        self.key = key
+        self.policy = policy
+        self.close_timeout = close_timeout
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        """发送队列中等待发送的消息数"""
+        return self._queue.qsize()
+
+    def start(self) -> "Connection":
+        self._writer = asyncio.create_task(self._write())
+        return self
+
+    def send(self, text: str) -> bool:
+        """把消息放入发送队列，不等待发送；队列已满时按策略丢弃或断开，返回是否已放入"""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.policy == "disconnect":
+                logger.warning(f"连接 {self.key} 的发送队列已满（{self._queue.maxsize}），断开慢客户端")
+                self.abort()
+            return False
+
+    async def _write(self) -> None:
+        while True:
+            text = await self._queue.get()
+            try:
+                await self.websocket.send_text(text)
+                self.sent += 1
+            except Exception as e:
+                # 客户端已断开，由连接处理函数清理
+                logger.info(f"向连接 {self.key} 发送消息失败: {str(e)}")
+                self.closed = True
+                return
+
+    def abort(self) -> None:
+        """停止发送并在后台关闭WebSocket（关闭握手最多等待 close_timeout 秒）"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+        self._closer = asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), self.close_timeout)
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        """连接结束时停止写任务（不关闭WebSocket）"""
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+
+
+class FanOut:
+    """本节点的连接集合，key -> Connection；同一个 key 的新连接替换旧连接"""
+
+    def __init__(self, maxsize: int = 256, policy: str = "disconnect"):
+        self.maxsize = maxsize
+        self.policy = policy
+        self._connections: Dict[Hashable, Connection] = {}
+        self.dropped = 0
+        self.disconnected = 0
+
+    def add(self, key: Hashable, websocket) -> Connection:
+        connection = Connection(websocket, key, self.maxsize, self.policy).start()
+        self._connections[key] = connection
+        return connection
+
+    async def remove(self, connection: Connection) -> bool:
+        """移除连接并停止其写任务，返回它是否仍是该 key 的当前连接（已被新连接替换时为False）"""
+        await connection.close()
+        if self._connections.get(connection.key) is not connection:
+            return False
+        del self._connections[connection.key]
+        return True
+
+    def get(self, key: Hashable) -> Optional[Connection]:
+        return self._connections.get(key)
+
+    def _send(self, connection: Connection, text: str) -> bool:
+        dropped = connection.dropped
+        if connection.send(text):
+            return True
+        if connection.dropped > dropped:
+            # 队列溢出：按 disconnect 策略断开时只会溢出一次（之后 send 直接返回False）
+            self.dropped += 1
+            if connection.closed:
+                self.disconnected += 1
+        return False
+
+    def send(self, key: Hashable, text: str) -> bool:
+        connection = self._connections.get(key)
+        return self._send(connection, text) if connection is not None else False
+
+    def broadcast(self, text: str, exclude: Optional[Hashable] = None) -> int:
+        """把同一条已序列化的消息放入所有连接的队列（不等待发送），返回放入的连接数"""
+        queued = 0
+        for key, connection in list(self._connections.items()):
+            if key != exclude and self._send(connection, text):
+                queued += 1
+        return queued
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._connections
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._connections))
+
+    def items(self):
+        return list(self._connections.items())
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        """连接数、队列深度和累计的丢弃/断开次数；queues 列出队列最深的 top 个连接"""
+        depths = sorted(((connection.depth, key) for key, connection in self._connections.items()), reverse=True)
+        return {
+            "connections": len(self._connections),
+            "queue_size": self.maxsize,
+            "policy": self.policy,
+            "queued": sum(depth for depth, _ in depths),
+            "max_depth": depths[0][0] if depths else 0,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+            "queues": {str(key): depth for depth, key in depths[:top] if depth}
+        }
@@ -0,0 +1,119 @@
+# backend/app/core/metrics.py
+"""
+HTTP请求指标（Prometheus文本格式）
+中间件按路由模板记录请求数、延迟、进行中的请求数以及每个请求的查询次数和查询耗时；
+SQL分析模式下在响应头附带查询次数和耗时，并对同一请求中重复执行的语句（N+1）记录警告；
+设置 PROMETHEUS_MULTIPROC_DIR 时各gunicorn进程的指标写入同一目录，导出时合并
+"""
+import time
+import logging
+from app.core.config import PROMETHEUS_MULTIPROC_DIR, METRICS_TOKEN, SQL_PROFILING, SQL_REPEAT_THRESHOLD
+from app.core.db_metrics import track_request_queries, stop_tracking_request_queries
+from fastapi import Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from starlette.routing import Match
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 未匹配任何路由的请求统一记为一个标签值，避免扫描等请求产生大量时间序列
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total", "请求总数",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "请求处理耗时（秒）",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "正在处理的请求数",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "每个请求执行的SQL语句数",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds", "每个请求的SQL累计耗时（秒）",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+def _route_path(scope) -> str:
+    """返回匹配到的路由模板（如 /api/study/tasks/{task_id}）"""
+    route = scope.get("route")
+    if route is None:
+        # 较早版本的Starlette不在scope中记录路由，按路由表重新匹配
+        for candidate in scope["app"].router.routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """记录HTTP请求指标的ASGI中间件"""
+
+    def __init__(self, app, profile_sql: bool = SQL_PROFILING, repeat_threshold: int = SQL_REPEAT_THRESHOLD):
+        self.app = app
+        self.profile_sql = profile_sql
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        queries, token = track_request_queries(profile=self.profile_sql)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.profile_sql:
+                    # 流式响应在开始发送后执行的查询不计入响应头
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(queries.count).encode()),
+                        (b"x-db-time", f"{queries.total_time * 1000:.2f}".encode())
+                    ]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            stop_tracking_request_queries(token)
+            in_progress.dec()
+            route = _route_path(scope)
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(method, route).observe(queries.count)
+            REQUEST_DB_TIME.labels(method, route).observe(queries.total_time)
+            for statement, count in queries.repeated(self.repeat_threshold):
+                logger.warning(f"疑似N+1查询: {method} {route} 中同一语句执行了 {count} 次: {statement[:300]}")
+
+
+def metrics_response(request: Request) -> Response:
+    """导出文本格式的指标，多进程模式下合并所有进程"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        return Response(status_code=401)
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,75 @@
+# backend/app/core/pagination.py
+"""
+游标（keyset）分页
+按 (排序列, id) 倒序分页，排序值为NULL的行排在最后（与索引的 DESC NULLS LAST 一致），
+下一页从上一页最后一行之后开始，每页代价与页码无关；
+游标对客户端不透明，内容为 base64 编码的 [排序值, id]，排序值为NULL时为 [null, id]
+"""
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Index, desc, or_, tuple_
+
+# 下一页游标通过响应头返回，响应体保持原有的列表格式
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: Optional[datetime], row_id: int) -> str:
+    raw = json.dumps([value.isoformat() if value is not None else None, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """解析游标，格式不正确时返回400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        return (datetime.fromisoformat(value) if value is not None else None), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+def keyset_indexes(name: str, user_column: str, sort_column: str, **kwargs) -> Tuple[Index, Index]:
+    """
+    与 keyset_page 的排序一致的索引 (user_column, sort_column DESC NULLS LAST, id DESC)。
+    SQLite不支持在索引中写 NULLS LAST（其倒序中NULL本来就排在最后），为其他数据库创建普通的倒序索引
+    """
+    return (
+        Index(name, user_column, desc(sort_column).nulls_last(), desc("id"), **kwargs).ddl_if(dialect="postgresql"),
+        Index(name, user_column, desc(sort_column), desc("id"), **kwargs).ddl_if(
+            callable_=lambda ddl, target, bind, dialect, **kw: dialect.name != "postgresql"
+        )
+    )
+
+
+def keyset_page(query, sort_column, id_column, cursor: Optional[str], skip: int, limit: int):
+    """
+    为查询（select 或 Query）添加倒序排序和分页条件，多取一行用于判断是否还有下一页。
+    传入游标时从游标之后开始；未传游标时兼容原有的 skip 偏移分页
+    """
+    query = query.order_by(sort_column.desc().nulls_last(), id_column.desc())
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        if value is None:
+            # 游标位于排序值为NULL的行，之后只剩排序值为NULL且id更小的行
+            query = query.where(sort_column.is_(None), id_column < row_id)
+        else:
+            # 元组比较不会匹配NULL，排在最后的NULL行需要单独包含
+            query = query.where(or_(tuple_(sort_column, id_column) < tuple_(value, row_id), sort_column.is_(None)))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def next_cursor(rows, sort_attr: str, limit: int) -> Optional[str]:
+    """rows 为 keyset_page 查询的结果，多出的一行说明还有下一页；返回游标并就地截掉多取的行"""
+    if len(rows) <= limit:
+        return None
+    del rows[max(limit, 0):]
+    if not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_attr), last.id)
@@ -0,0 +1,23 @@
+# backend/app/core/serialization.py
+"""
+ORM对象列表的JSON序列化
+列表接口直接用 pydantic-core 把ORM对象按响应模型校验并编码为JSON字节，
+避免逐行构造字典、调用 isoformat 以及FastAPI对返回值的二次校验
+"""
+from typing import Iterable, List, Mapping, Optional, Type
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+class ListSerializer:
+    """按响应模型序列化对象列表，每种实体共用一个实例"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.adapter = TypeAdapter(List[model])
+
+    def dump(self, rows: Iterable) -> bytes:
+        return self.adapter.dump_json(self.adapter.validate_python(rows, from_attributes=True))
+
+    def response(self, rows: Iterable, headers: Optional[Mapping[str, str]] = None) -> Response:
+        return Response(content=self.dump(rows), media_type="application/json", headers=headers)
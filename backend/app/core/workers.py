@@ -0,0 +1,77 @@
+# backend/app/core/workers.py
+"""
+有界工作线程池
+把CPU密集的同步调用（如bcrypt）移出事件循环执行，限制并发和排队长度并记录排队指标
+"""
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class PoolBusyError(RuntimeError):
+    """排队任务数已达上限"""
+
+
+class BoundedExecutor:
+    """固定线程数的执行器，超过 max_pending 个未完成任务时拒绝新任务"""
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.pending = 0          # 已提交未完成（排队 + 执行中）
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.total_wait = 0.0     # 累计排队秒数
+        self.max_wait = 0.0
+        self.total_run = 0.0      # 累计执行秒数
+
+    def _call(self, submitted_at: float, fn: Callable[..., Any], args: tuple) -> Any:
+        started_at = time.monotonic()
+        wait = started_at - submitted_at
+        with self._lock:
+            self.running += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.pending -= 1
+                self.completed += 1
+                self.total_run += time.monotonic() - started_at
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """在线程池中执行 fn(*args) 并等待结果，队列已满时抛出 PoolBusyError"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolBusyError(f"{self.name} 排队任务过多")
+            self.pending += 1
+            self.max_queued = max(self.max_queued, self.pending - self.running)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, time.monotonic(), fn, args)
+
+    def stats(self) -> Dict[str, Any]:
+        """并发和排队指标"""
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "max_queued": self.max_queued,
+                "completed": completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait * 1000 / completed, 2) if completed else 0,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "avg_run_ms": round(self.total_run * 1000 / completed, 2) if completed else 0
+            }
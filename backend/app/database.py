@@ -1,16 +1,52 @@
 # backend/app/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .core.config import DATABASE_URL, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW
-
-# 创建数据库引擎，添加连接池配置
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=DATABASE_POOL_SIZE,
-    max_overflow=DATABASE_MAX_OVERFLOW
+from .core.config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_POOL_TIMEOUT,
+    DATABASE_POOL_RECYCLE, DATABASE_POOL_PRE_PING, DATABASE_STATEMENT_TIMEOUT_MS
 )
+from .core.db_metrics import TimedQueuePool, TimedAsyncQueuePool, instrument_engine
+
+# 连接池配置（大小默认按gunicorn进程数推导，见 core/config.py）
+POOL_OPTIONS = {
+    "pool_size": DATABASE_POOL_SIZE,
+    "max_overflow": DATABASE_MAX_OVERFLOW,
+    "pool_timeout": DATABASE_POOL_TIMEOUT,
+    "pool_recycle": DATABASE_POOL_RECYCLE,
+    "pool_pre_ping": DATABASE_POOL_PRE_PING
+}
+
+def _is_postgresql(url: str) -> bool:
+    return make_url(url).get_backend_name() == "postgresql"
+
+# 创建数据库引擎，连接建立时设置语句超时
+sync_connect_args = {}
+if _is_postgresql(DATABASE_URL) and DATABASE_STATEMENT_TIMEOUT_MS:
+    sync_connect_args["options"] = f"-c statement_timeout={DATABASE_STATEMENT_TIMEOUT_MS}"
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, connect_args=sync_connect_args, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# 异步引擎（asyncpg），供API的热点路由使用；脚本和其余路由继续使用同步引擎
+async_connect_args = {}
+if _is_postgresql(ASYNC_DATABASE_URL) and DATABASE_STATEMENT_TIMEOUT_MS:
+    async_connect_args["server_settings"] = {"statement_timeout": str(DATABASE_STATEMENT_TIMEOUT_MS)}
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
+    connect_args=async_connect_args,
+    **POOL_OPTIONS
+)
+# 提交后不过期对象，避免在异步上下文中隐式触发懒加载
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 记录查询耗时和慢查询
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
 Base = declarative_base()
 
 # 定义 get_db 函数
@@ -19,4 +55,16 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# 定义 get_async_db 函数
+# 同步的服务函数（每日汇总、用户统计等）通过 await db.run_sync(fn, ...) 在同一事务中调用
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# 获取支持 ON CONFLICT 的 insert 构造（生产使用PostgreSQL，本地开发可使用SQLite）
+def dialect_insert(db):
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
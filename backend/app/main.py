@@ -1,18 +1,28 @@
 # backend/app/main.py
 import pytz
 import os
-from fastapi import FastAPI, WebSocket, Depends
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, Depends, Request
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from .routers import tasks, plans, achievements, auth, statistics, users, avatar
+from .routers import tasks, plans, achievements, auth, statistics, users, avatar, admin
 from .database import get_db
-from .database import engine, Base
+from .database import engine, Base, SessionLocal
+from .core.metrics import PrometheusMiddleware, metrics_response
+from .services.idempotency import purge_expired
 from .core.config import (
     ENVIRONMENT, FRONTEND_URL, APP_NAME, APP_DESCRIPTION, APP_VERSION,
     CORS_ORIGINS, CORS_ALLOW_CREDENTIALS, CORS_ALLOW_METHODS, CORS_ALLOW_HEADERS,
-    TIMEZONE
+    TIMEZONE, IDEMPOTENCY_PURGE_INTERVAL
 )
 
+# 配置日志
+logger = logging.getLogger(__name__)
+
 # 设置默认时区为中国时区
 os.environ['TZ'] = TIMEZONE
 try:
@@ -24,11 +34,41 @@ except Exception:
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
 
+# 清理过期的幂等键
+def purge_idempotency_keys() -> int:
+    db = SessionLocal()
+    try:
+        deleted = purge_expired(db)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+async def purge_idempotency_keys_periodically():
+    """后台定期清理过期的幂等键（多个进程各自运行，重复删除无影响）"""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL)
+        try:
+            deleted = await run_in_threadpool(purge_idempotency_keys)
+            if deleted:
+                logger.info(f"已清理 {deleted} 个过期的幂等键")
+        except Exception as e:
+            logger.error(f"清理过期幂等键失败: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    purge_task = asyncio.create_task(purge_idempotency_keys_periodically()) if IDEMPOTENCY_PURGE_INTERVAL > 0 else None
+    yield
+    if purge_task is not None:
+        purge_task.cancel()
+
 # 创建FastAPI应用
 app = FastAPI(
     title=APP_NAME,
     description=APP_DESCRIPTION,
-    version=APP_VERSION
+    version=APP_VERSION,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # 使用orjson编码响应
 )
 
 # 配置 CORS 中间件
@@ -41,6 +81,9 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# 请求指标中间件（按路由记录请求数、延迟和查询次数）
+app.add_middleware(PrometheusMiddleware)
+
 # 健康检查路由
 @app.get("/api/health")
 def health_check():
@@ -51,6 +94,11 @@ def health_check():
         "environment": ENVIRONMENT
     }
 
+# 指标导出路由（Prometheus文本格式）
+@app.get("/api/metrics", include_in_schema=False)
+def metrics(request: Request):
+    return metrics_response(request)
+
 # 注册路由
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 
@@ -72,4 +120,7 @@ app.include_router(achievements.router, prefix="/api/study/achievements", tags=[
 # 注册统计路由
 app.include_router(statistics.router, prefix="/api/study/statistics", tags=["statistics"])
 
+# 注册管理路由
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+
 # WebSocket路由已移至独立服务
@@ -4,5 +4,8 @@
 from app.modules.study.models.task import Task
 from app.modules.study.models.plan import Plan
 from app.modules.study.models.achievement import Achievement
+from app.modules.study.models.user_stats import UserStats
+from app.modules.study.models.daily_rollup import DailyRollup
+from app.modules.study.models.idempotency_key import IdempotencyKey
 
-__all__ = ['Task', 'Plan', 'Achievement']
+__all__ = ['Task', 'Plan', 'Achievement', 'UserStats', 'DailyRollup', 'IdempotencyKey']
@@ -1,5 +1,5 @@
 # backend/app/modules/study/models/achievement.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 from sqlalchemy.sql import func
@@ -7,6 +7,10 @@ from app.core.config import TABLE_PREFIX
 
 class Achievement(Base):
     __tablename__ = f"{TABLE_PREFIX['STUDY']}achievements"
+    __table_args__ = (
+        # 每个用户每种成就只保留一行（记录当前最高等级），保证并发upsert安全
+        UniqueConstraint("user_id", "type", name=f"uq_{TABLE_PREFIX['STUDY']}achievements_user_type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey(f"{TABLE_PREFIX['COMMON']}users.id"))
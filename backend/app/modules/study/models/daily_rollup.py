@@ -0,0 +1,20 @@
+# backend/app/modules/study/models/daily_rollup.py
+from sqlalchemy import Column, Integer, Date, ForeignKey, JSON
+from sqlalchemy.orm import relationship
+from app.database import Base
+from app.core.config import TABLE_PREFIX
+
+class DailyRollup(Base):
+    """用户每日学习汇总（按本地日期），由任务写入时增量维护，统计接口从这里读取"""
+    __tablename__ = f"{TABLE_PREFIX['STUDY']}daily_rollup"
+
+    user_id = Column(Integer, ForeignKey(f"{TABLE_PREFIX['COMMON']}users.id", ondelete="CASCADE"), primary_key=True)
+    local_date = Column(Date, primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    total_minutes = Column(Integer, nullable=False, default=0)
+    hourly_counts = Column(JSON, nullable=False)   # 24个元素，按开始小时统计的任务数
+    hourly_minutes = Column(JSON, nullable=False)  # 24个元素，按开始小时统计的学习分钟数
+
+    # 建立关系
+    user = relationship("User")
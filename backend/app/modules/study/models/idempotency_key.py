@@ -0,0 +1,21 @@
+# backend/app/modules/study/models/idempotency_key.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from app.database import Base
+from app.core.config import TABLE_PREFIX
+
+class IdempotencyKey(Base):
+    """写接口的幂等键及首次执行的响应，客户端重试时直接返回保存的响应；过期记录由定时任务清理"""
+    __tablename__ = f"{TABLE_PREFIX['STUDY']}idempotency_keys"
+    __table_args__ = (
+        # 按过期时间批量清理
+        Index(f"ix_{TABLE_PREFIX['STUDY']}idempotency_keys_expires_at", "expires_at"),
+    )
+
+    user_id = Column(Integer, ForeignKey(f"{TABLE_PREFIX['COMMON']}users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    endpoint = Column(String(64), primary_key=True)        # 同一个键在不同接口上互不影响
+    request_hash = Column(String(64), nullable=False)      # 请求参数摘要，同一个键用于不同请求时拒绝
+    status_code = Column(Integer, nullable=True)           # 为空表示首次请求仍在执行
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -4,13 +4,18 @@ from sqlalchemy.orm import relationship
 from app.database import Base
 from sqlalchemy.sql import func
 from app.core.config import TABLE_PREFIX
+from app.core.pagination import keyset_indexes
 
 class Plan(Base):
     __tablename__ = f"{TABLE_PREFIX['STUDY']}plans"
+    __table_args__ = (
+        # 按用户查询计划列表（按 (创建时间, id) 倒序游标分页）
+        *keyset_indexes(f"ix_{TABLE_PREFIX['STUDY']}plans_user_created_id", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey(f"{TABLE_PREFIX['COMMON']}users.id"))
-    text = Column(String, index=True)
+    text = Column(String)
     completed = Column(Boolean, default=False)
     started = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
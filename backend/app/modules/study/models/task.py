@@ -1,18 +1,27 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.core.config import TABLE_PREFIX
+from app.core.pagination import keyset_indexes
 
 class Task(Base):
     __tablename__ = f"{TABLE_PREFIX['STUDY']}tasks"
+    __table_args__ = (
+        # 按用户+开始时间范围查询并倒序排列（没有开始时间的任务排在最后），id 作为游标分页的第二排序键；
+        # PostgreSQL上附带duration，时长汇总可走仅索引扫描
+        *keyset_indexes(f"ix_{TABLE_PREFIX['STUDY']}tasks_user_start_id", "user_id", "start", postgresql_include=["duration"]),
+        # 批量同步时客户端生成的幂等键，同一用户内唯一（NULL不参与唯一性判断）
+        Index(f"uq_{TABLE_PREFIX['STUDY']}tasks_user_client_key", "user_id", "client_key", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
+    name = Column(String)
     duration = Column(Integer)
     start = Column(DateTime)
     end = Column(DateTime)
     completed = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey(f"{TABLE_PREFIX['COMMON']}users.id"))
+    client_key = Column(String(64), nullable=True)  # 离线同步的幂等键，单个创建的任务为空
 
     user = relationship("User", back_populates="tasks")
@@ -0,0 +1,39 @@
+# backend/app/modules/study/models/user_stats.py
+from sqlalchemy import Column, Integer, BigInteger, Date, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base
+from sqlalchemy.sql import func
+from app.core.config import TABLE_PREFIX
+
+class UserStats(Base):
+    """用户学习统计汇总（每个用户一行），由任务/计划写入时增量维护，用于成就判断"""
+    __tablename__ = f"{TABLE_PREFIX['STUDY']}user_stats"
+
+    user_id = Column(Integer, ForeignKey(f"{TABLE_PREFIX['COMMON']}users.id", ondelete="CASCADE"), primary_key=True)
+
+    # 任务计数
+    total_tasks = Column(Integer, nullable=False, default=0)
+    total_minutes = Column(Integer, nullable=False, default=0)
+    long_tasks = Column(Integer, nullable=False, default=0)
+    night_tasks = Column(Integer, nullable=False, default=0)
+    early_tasks = Column(Integer, nullable=False, default=0)
+    weekend_tasks = Column(Integer, nullable=False, default=0)
+
+    # 按日期派生的数据
+    max_daily_tasks = Column(Integer, nullable=False, default=0)
+    longest_streak = Column(Integer, nullable=False, default=0)
+    current_streak = Column(Integer, nullable=False, default=0)  # 以 last_study_date 结尾的连续天数
+    last_study_date = Column(Date, nullable=True)
+    last_day_tasks = Column(Integer, nullable=False, default=0)  # last_study_date 当天的任务数
+
+    # 计划计数
+    total_plans = Column(Integer, nullable=False, default=0)
+    completed_plans = Column(Integer, nullable=False, default=0)
+
+    # 数据版本：用户的任务/计划/成就写入时更新，用于统计和成就接口的ETag
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    # 建立关系
+    user = relationship("User")
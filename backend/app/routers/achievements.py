@@ -1,21 +1,22 @@
 # backend/app/routers/achievements.py
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, distinct
-from datetime import datetime, time, timedelta
-from app.modules.study.models import Achievement, Task, Plan
-from app.modules.common.models import User
+from app.modules.study.models import Achievement
 from app.schemas.achievement import AchievementCreate, AchievementUpdate, AchievementResponse
-from app.auth import get_current_superuser, get_current_active_user
+from app.auth import CurrentUser, get_current_superuser, get_current_active_user
 from app.database import get_db
-from app.achievements_definitions import ACHIEVEMENTS, get_achievement_by_id
-from typing import List, Dict, Any
+from app.achievements_definitions import ACHIEVEMENTS
+from app.services.user_stats import get_user_stats_record, stats_to_dict
+from app.services.achievements import ACHIEVEMENT_RULES, diff_achievements, apply_achievement_diff
+from app.services.data_version import conditional_user_data, bump_data_version
+from sqlalchemy.exc import IntegrityError
+from typing import List, Dict, Any, Optional, Tuple
 
 router = APIRouter()
 
 # 获取所有成就（仅管理员）
 @router.get("/admin", response_model=List[AchievementResponse])
-def read_achievements(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), _: User = Depends(get_current_superuser)):
+def read_achievements(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), _: CurrentUser = Depends(get_current_superuser)):
     achievements = db.query(Achievement).offset(skip).limit(limit).all()
 
     # 转换日期时间为字符串
@@ -27,10 +28,15 @@ def read_achievements(skip: int = 0, limit: int = 100, db: Session = Depends(get
 
 # 创建新成就（仅管理员）
 @router.post("/admin", response_model=AchievementResponse)
-def create_achievement(achievement: AchievementCreate, db: Session = Depends(get_db), admin: User = Depends(get_current_superuser)):
+def create_achievement(achievement: AchievementCreate, db: Session = Depends(get_db), admin: CurrentUser = Depends(get_current_superuser)):
     db_achievement = Achievement(**achievement.model_dump(), user_id=admin.id)
     db.add(db_achievement)
-    db.commit()
+    bump_data_version(db, admin.id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Achievement of this type already exists for this user")
     db.refresh(db_achievement)
 
     # 转换日期时间为字符串
@@ -41,7 +47,7 @@ def create_achievement(achievement: AchievementCreate, db: Session = Depends(get
 
 # 更新成就（仅管理员）
 @router.put("/admin/{achievement_id}", response_model=AchievementResponse)
-def update_achievement(achievement_id: int, achievement: AchievementUpdate, db: Session = Depends(get_db), _: User = Depends(get_current_superuser)):
+def update_achievement(achievement_id: int, achievement: AchievementUpdate, db: Session = Depends(get_db), _: CurrentUser = Depends(get_current_superuser)):
     db_achievement = db.query(Achievement).filter(Achievement.id == achievement_id).first()
     if not db_achievement:
         raise HTTPException(status_code=404, detail="Achievement not found")
@@ -49,7 +55,12 @@ def update_achievement(achievement_id: int, achievement: AchievementUpdate, db:
         db_achievement.type = achievement.type
     if achievement.level is not None:
         db_achievement.level = achievement.level
-    db.commit()
+    bump_data_version(db, db_achievement.user_id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Achievement of this type already exists for this user")
     db.refresh(db_achievement)
 
     # 转换日期时间为字符串
@@ -60,25 +71,25 @@ def update_achievement(achievement_id: int, achievement: AchievementUpdate, db:
 
 # 删除成就（仅管理员）
 @router.delete("/admin/{achievement_id}")
-def delete_achievement(achievement_id: int, db: Session = Depends(get_db), _: User = Depends(get_current_superuser)):
+def delete_achievement(achievement_id: int, db: Session = Depends(get_db), _: CurrentUser = Depends(get_current_superuser)):
     db_achievement = db.query(Achievement).filter(Achievement.id == achievement_id).first()
     if not db_achievement:
         raise HTTPException(status_code=404, detail="Achievement not found")
     db.delete(db_achievement)
+    bump_data_version(db, db_achievement.user_id)
     db.commit()
     return {"message": "Achievement deleted successfully"}
 
 # 获取用户统计数据
-def get_user_stats(user_id: int, db: Session) -> Dict[str, Any]:
-    """获取用户的统计数据，用于成就解锁判断"""
-    # 获取用户的所有任务
-    tasks = db.query(Task).filter(Task.user_id == user_id).all()
-
-    # 获取用户的所有计划
-    plans = db.query(Plan).filter(Plan.user_id == user_id).all()
+def get_user_stats(user_id: int, db: Session, achievements: Optional[List[Achievement]] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    获取用户的统计数据，用于成就解锁判断（读取增量维护的统计记录，不扫描历史任务）；
+    返回（统计数据, 统计记录是否刚重建）
+    """
+    stats, rebuilt = get_user_stats_record(db, user_id)
 
-    # 获取用户已解锁的成就
-    achievements = db.query(Achievement).filter(Achievement.user_id == user_id).all()
+    if achievements is None:
+        achievements = db.query(Achievement).filter(Achievement.user_id == user_id).all()
 
     # 计算已解锁的成就类型数量（每种成就只计算一次）
     unlocked_achievement_types = set()
@@ -86,115 +97,24 @@ def get_user_stats(user_id: int, db: Session) -> Dict[str, Any]:
         achievement_type = achievement.type.split('_')[1] if '_' in achievement.type else achievement.type
         unlocked_achievement_types.add(achievement_type)
 
-    # 初始化统计数据
-    stats = {
-        "total_tasks": len(tasks),
-        "total_minutes": sum(task.duration for task in tasks if task.duration),
-        "night_tasks": 0,
-        "early_tasks": 0,
-        "streak_days": 0,
-        "total_plans": len(plans),
-        "completed_plans": len([plan for plan in plans if plan.completed]),
-        "long_tasks": len([task for task in tasks if task.duration and task.duration >= 25]),
-        "weekend_tasks": 0,
-        "max_daily_tasks": 0,
-        "unlocked_achievements": len(unlocked_achievement_types)
-    }
-
-    # 计算夜间任务数量（晚上10点后）
-    night_time = time(22, 0)
-    stats["night_tasks"] = len([
-        task for task in tasks
-        if task.start and task.start.time() >= night_time
-    ])
-
-    # 计算早起任务数量（早上6点前）
-    early_time = time(6, 0)
-    stats["early_tasks"] = len([
-        task for task in tasks
-        if task.start and task.start.time() < early_time
-    ])
-
-    # 计算周末任务数量
-    stats["weekend_tasks"] = len([
-        task for task in tasks
-        if task.start and task.start.weekday() >= 5  # 5=Saturday, 6=Sunday
-    ])
-
-    # 计算单日最大任务数量
-    if tasks:
-        # 按日期分组任务
-        daily_tasks = {}
-        for task in tasks:
-            if task.start:
-                date_str = task.start.date().isoformat()
-                if date_str in daily_tasks:
-                    daily_tasks[date_str] += 1
-                else:
-                    daily_tasks[date_str] = 1
+    return stats_to_dict(stats, len(unlocked_achievement_types)), rebuilt
 
-        # 获取单日最大任务数量
-        if daily_tasks:
-            stats["max_daily_tasks"] = max(daily_tasks.values())
-
-    # 计算连续学习天数
-    if tasks:
-        # 获取所有有任务的日期
-        task_dates = sorted(set(task.start.date() for task in tasks if task.start))
-
-        if task_dates:
-            # 计算最长连续天数
-            max_streak = current_streak = 1
-            for i in range(1, len(task_dates)):
-                if (task_dates[i] - task_dates[i-1]).days == 1:
-                    current_streak += 1
-                else:
-                    max_streak = max(max_streak, current_streak)
-                    current_streak = 1
-
-            stats["streak_days"] = max(max_streak, current_streak)
-
-    return stats
-
-# 获取所有成就定义（不包含条件函数）
+# 获取所有成就定义（不包含解锁规则）
 @router.get("/definitions", response_model=None)
 def get_achievement_definitions():
-    """获取所有成就的定义，包括名称、描述和等级信息"""
-    definitions = []
-    for achievement in ACHIEVEMENTS:
-        # 创建不包含条件函数的成就定义副本
-        achievement_def = {
-            "id": achievement["id"],
-            "name": achievement["name"],
-            "description": achievement["description"],
-            "levels": []
-        }
-
-        # 添加每个等级的信息，但不包含条件函数
-        for level in achievement["levels"]:
-            level_def = {
-                "level": level["level"],
-                "description": level["description"]
-            }
-            achievement_def["levels"].append(level_def)
-
-        definitions.append(achievement_def)
-
-    return {
-        "status": "success",
-        "achievements": definitions
-    }
+    """获取所有成就的定义，包括名称、描述和等级信息（启动时预计算）"""
+    return ACHIEVEMENT_RULES.definitions_payload
 
-# 获取用户的成就
-@router.get("/", response_model=None)
-def get_user_achievements(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+# 获取用户的成就（数据未变化时按ETag返回304）
+@router.get("/", response_model=None, dependencies=[Depends(conditional_user_data("achievements"))])
+def get_user_achievements(db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_active_user)):
     try:
-        # 获取用户的统计数据
-        user_stats = get_user_stats(current_user.id, db)
-
-        # 获取用户已解锁的成就
+        # 获取用户已解锁的成就（唯一约束保证每种成就一行）
         user_achievements = db.query(Achievement).filter(Achievement.user_id == current_user.id).all()
 
+        # 获取用户的统计数据
+        user_stats, stats_rebuilt = get_user_stats(current_user.id, db, user_achievements)
+
         # 将已解锁的成就转换为字典，方便查找
         unlocked_achievements = {}
         for achievement in user_achievements:
@@ -206,102 +126,51 @@ def get_user_achievements(db: Session = Depends(get_db), current_user: User = De
                     "unlocked_at": achievement.unlocked_at.isoformat() if achievement.unlocked_at else None
                 }
 
-        # 检查所有成就的解锁状态
+        # 用编译后的规则计算每个成就的最高解锁等级
+        targets = ACHIEVEMENT_RULES.evaluate(user_stats)
+
+        # 计算与数据库记录的差异，一次性写入解锁和回收
+        stored_levels = {achievement_type: record["level"] for achievement_type, record in unlocked_achievements.items()}
+        upserts, deletes = diff_achievements(current_user.id, targets, stored_levels)
+        # 统计记录刚重建时即使成就没有变化也要提交
+        if upserts or deletes or stats_rebuilt:
+            written = apply_achievement_diff(db, upserts, deletes)
+            db.commit()
+
+            # 更新解锁记录
+            for (_, achievement_type), row in written.items():
+                unlocked_achievements[achievement_type] = {
+                    "id": row.id,
+                    "type": achievement_type,
+                    "level": row.level,
+                    "unlocked_at": row.unlocked_at.isoformat() if row.unlocked_at else None
+                }
+            for _, achievement_type in deletes:
+                unlocked_achievements.pop(achievement_type, None)
+
+        # 构建成就状态
         achievements_status = []
-        for achievement_def in ACHIEVEMENTS:
-            achievement_id = achievement_def["id"]
-            achievement_type = f"achievement_{achievement_id}"
+        for achievement_def, compiled in zip(ACHIEVEMENTS, ACHIEVEMENT_RULES.achievements):
+            highest_unlocked_level = targets[compiled.type]
+            unlocked_at = unlocked_achievements.get(compiled.type, {}).get("unlocked_at")
 
-            # 检查每个等级的解锁状态
             levels_status = []
-            highest_unlocked_level = 0
-
             for level_def in achievement_def["levels"]:
-                level = level_def["level"]
-                # 检查是否满足解锁条件
-                is_unlocked = level_def["condition"](user_stats)
-
-                # 如果已解锁但数据库中没有记录，则添加记录
-                if is_unlocked and (achievement_type not in unlocked_achievements or unlocked_achievements[achievement_type]["level"] < level):
-                    # 创建或更新成就记录
-                    db_achievement = db.query(Achievement).filter(
-                        Achievement.user_id == current_user.id,
-                        Achievement.type == achievement_type
-                    ).first()
-
-                    if db_achievement:
-                        db_achievement.level = level
-                    else:
-                        db_achievement = Achievement(
-                            user_id=current_user.id,
-                            type=achievement_type,
-                            level=level
-                        )
-                        db.add(db_achievement)
-
-                    db.commit()
-                    db.refresh(db_achievement)
-
-                    # 更新解锁记录
-                    if achievement_type not in unlocked_achievements or unlocked_achievements[achievement_type]["level"] < level:
-                        unlocked_achievements[achievement_type] = {
-                            "id": db_achievement.id,
-                            "type": achievement_type,
-                            "level": level,
-                            "unlocked_at": db_achievement.unlocked_at.isoformat() if db_achievement.unlocked_at else None
-                        }
-
-                # 如果数据库中有记录但不满足条件，则删除记录（成就回收）
-                if not is_unlocked and achievement_type in unlocked_achievements and unlocked_achievements[achievement_type]["level"] >= level:
-                    db_achievement = db.query(Achievement).filter(
-                        Achievement.user_id == current_user.id,
-                        Achievement.type == achievement_type,
-                        Achievement.level == level
-                    ).first()
-
-                    if db_achievement:
-                        db.delete(db_achievement)
-                        db.commit()
-
-                        # 更新解锁记录
-                        if level == unlocked_achievements[achievement_type]["level"]:
-                            # 查找是否有更低级别的成就
-                            lower_achievement = db.query(Achievement).filter(
-                                Achievement.user_id == current_user.id,
-                                Achievement.type == achievement_type
-                            ).order_by(Achievement.level.desc()).first()
-
-                            if lower_achievement:
-                                unlocked_achievements[achievement_type] = {
-                                    "id": lower_achievement.id,
-                                    "type": achievement_type,
-                                    "level": lower_achievement.level,
-                                    "unlocked_at": lower_achievement.unlocked_at.isoformat() if lower_achievement.unlocked_at else None
-                                }
-                            else:
-                                unlocked_achievements.pop(achievement_type, None)
-
-                # 记录解锁状态
-                level_status = {
-                    "level": level,
+                is_unlocked = 0 < level_def["level"] <= highest_unlocked_level
+                levels_status.append({
+                    "level": level_def["level"],
                     "unlocked": is_unlocked,
-                    "unlocked_at": unlocked_achievements.get(achievement_type, {}).get("unlocked_at") if is_unlocked else None
-                }
-                levels_status.append(level_status)
-
-                if is_unlocked:
-                    highest_unlocked_level = max(highest_unlocked_level, level)
+                    "unlocked_at": unlocked_at if is_unlocked else None
+                })
 
-            # 添加成就状态
-            achievement_status = {
-                "id": achievement_id,
+            achievements_status.append({
+                "id": achievement_def["id"],
                 "name": achievement_def["name"],
                 "description": achievement_def["description"],
                 "highest_level": highest_unlocked_level,
                 "is_unlocked": highest_unlocked_level > 0,
                 "levels": levels_status
-            }
-            achievements_status.append(achievement_status)
+            })
 
         return {
             "status": "success",
@@ -309,5 +178,6 @@ def get_user_achievements(db: Session = Depends(get_db), current_user: User = De
             "user_stats": user_stats
         }
     except Exception as e:
+        db.rollback()
         print(f"Error in get_user_achievements: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to get achievements: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get achievements: {str(e)}")
@@ -0,0 +1,22 @@
+# backend/app/routers/admin.py
+from fastapi import APIRouter, Depends
+from app.auth import CurrentUser, get_current_superuser, password_hasher, user_cache_stats
+from app.core.db_metrics import pool_stats, query_stats
+from app.services.streaks import streak_cache_stats
+from app.services.statistics_cache import statistics_cache_stats
+
+router = APIRouter()
+
+@router.get("/metrics")
+def get_metrics(current_user: CurrentUser = Depends(get_current_superuser)):
+    """运行指标（仅管理员）：连接池、查询耗时、密码哈希线程池和缓存命中，数据只反映当前进程"""
+    return {
+        "database_pools": pool_stats(),
+        "queries": query_stats.stats(),
+        "password_hashing": password_hasher.stats(),
+        "caches": {
+            "auth": user_cache_stats(),
+            "streaks": streak_cache_stats(),
+            "statistics": statistics_cache_stats()
+        }
+    }
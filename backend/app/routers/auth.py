@@ -1,12 +1,14 @@
 # backend/app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.common.models import User
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, UserResponse
-from app.auth import verify_password, create_access_token, get_current_active_user, get_password_hash
-from app.database import get_db
+from app.auth import verify_password_async, create_access_token, get_current_user_record, get_password_hash_async
+from app.database import get_async_db
 from datetime import timedelta
 from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
 from jose import jwt, JWTError
@@ -21,14 +23,19 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 按条件查找用户
+async def _find_user(db: AsyncSession, *criteria):
+    result = await db.execute(select(User).where(*criteria))
+    return result.scalars().first()
+
 @router.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """用户登录接口，返回JWT令牌"""
     # 查找用户
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await _find_user(db, User.username == form_data.username)
 
-    # 验证用户名和密码
-    if not user or not verify_password(form_data.password, user.password):
+    # 验证用户名和密码（bcrypt在密码哈希线程池中执行）
+    if not user or not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码不正确",
@@ -54,7 +61,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     # 创建访问令牌
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires
     )
 
     # 返回令牌和用户信息
@@ -73,7 +80,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     }
 
 @router.get("/me", response_model=dict)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(current_user: User = Depends(get_current_user_record)):
     """获取当前登录用户信息"""
     return {
         "id": current_user.id,
@@ -87,10 +94,10 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
     }
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """用户注册接口"""
     # 检查用户名是否已存在
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = await _find_user(db, User.username == user_data.username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -99,7 +106,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
 
     # 检查邮箱是否已存在
     if user_data.email:
-        existing_email = db.query(User).filter(User.email == user_data.email).first()
+        existing_email = await _find_user(db, User.email == user_data.email)
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -107,7 +114,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             )
 
     # 创建新用户
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # 生成默认头像（只在没有提供头像时）
     avatar_data = None
@@ -138,15 +145,16 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     # 发送验证邮件
     email_sent = False
     if user_data.email:
         try:
             # 直接发送邮件，而不是使用后台任务，以便捕获错误
-            email_sent = send_verification_email(
+            email_sent = await run_in_threadpool(
+                send_verification_email,
                 user_email=new_user.email,
                 username=new_user.username,
                 user_id=new_user.id
@@ -163,7 +171,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     return new_user
 
 @router.post("/verify-email")
-async def verify_email(token_data: dict, db: Session = Depends(get_db)):
+async def verify_email(token_data: dict, db: AsyncSession = Depends(get_async_db)):
     """邮箱验证接口"""
     try:
         # 验证令牌
@@ -190,7 +198,7 @@ async def verify_email(token_data: dict, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="无效的验证令牌")
 
         # 更新用户邮箱验证状态
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await _find_user(db, User.id == int(user_id))
         if not user:
             logger.warning(f"用户不存在: {user_id}")
             raise HTTPException(status_code=404, detail="用户不存在")
@@ -201,7 +209,7 @@ async def verify_email(token_data: dict, db: Session = Depends(get_db)):
 
         # 更新验证状态
         user.email_verified = True
-        db.commit()
+        await db.commit()
         logger.info(f"用户 {user.username} (ID: {user.id}) 邮箱验证成功")
 
         return {"status": "success", "message": "邮箱验证成功"}
@@ -210,10 +218,10 @@ async def verify_email(token_data: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="验证过程中出错，请稍后再试")
 
 @router.post("/resend-verification")
-async def resend_verification(email: str = Body(...), db: Session = Depends(get_db)):
+async def resend_verification(email: str = Body(...), db: AsyncSession = Depends(get_async_db)):
     """重新发送邮箱验证邮件"""
     # 查找用户
-    user = db.query(User).filter(User.email == email).first()
+    user = await _find_user(db, User.email == email)
 
     # 不管用户是否存在，都返回相同的消息，避免泄露用户信息
     if not user:
@@ -227,7 +235,8 @@ async def resend_verification(email: str = Body(...), db: Session = Depends(get_
 
     # 直接发送验证邮件
     try:
-        email_sent = send_verification_email(
+        email_sent = await run_in_threadpool(
+            send_verification_email,
             user_email=user.email,
             username=user.username,
             user_id=user.id
@@ -1,10 +1,14 @@
 # backend/app/routers/avatar.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
 import httpx
 from typing import Optional
 from urllib.parse import urlencode
 import base64
+from app.database import get_db
+from app.modules.common.models import User
+from app.services.avatars import AVATAR_CACHE_CONTROL, avatar_digest, decode_avatar
 
 router = APIRouter()
 
@@ -53,4 +57,26 @@ async def generate_avatar(
         raise HTTPException(
             status_code=500,
             detail=f"生成头像时发生错误: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/{user_id}/{digest}")
+def get_user_avatar(user_id: int, digest: str, db: Session = Depends(get_db)):
+    """
+    按内容哈希返回用户头像（在线用户列表等只下发此地址，不再内嵌头像数据）
+
+    - 哈希与当前头像不一致时返回404，地址不可枚举，内容可以长期缓存
+    """
+    row = db.query(User.avatar).filter(User.id == user_id).first()
+    avatar = row.avatar if row else None
+    decoded = decode_avatar(avatar) if avatar and avatar_digest(avatar) == digest else None
+    if decoded is None or not decoded[0].startswith("image/"):
+        raise HTTPException(status_code=404, detail="头像不存在")
+
+    media_type, content = decoded
+    return Response(content=content, media_type=media_type, headers={
+        "Cache-Control": AVATAR_CACHE_CONTROL,
+        "ETag": f'"{digest}"',
+        # SVG可能包含脚本，禁止直接打开时执行
+        "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; sandbox",
+        "X-Content-Type-Options": "nosniff"
+    })
@@ -2,76 +2,77 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.modules.study.models import Plan
-from app.modules.common.models import User
-from app.schemas.plan import PlanCreate, PlanUpdate, PlanResponse
-from app.auth import get_current_active_user
+from app.schemas.plan import PlanCreate, PlanUpdate, PlanResponse, plan_list_serializer
+from app.auth import CurrentUser, get_current_active_user
 from datetime import datetime, timezone
 from app.database import get_db
-from typing import List
+from app.services.study_events import record_plan_change
+from app.core.pagination import NEXT_CURSOR_HEADER, keyset_page, next_cursor
+from app.services.idempotency import idempotency_key_header, reserve_key, store_response, replay_response
+from typing import List, Optional
 
 router = APIRouter()
 
 # 获取用户的所有计划
 @router.get("/", response_model=List[PlanResponse])
-def read_plans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    plans = db.query(Plan).filter(Plan.user_id == current_user.id).offset(skip).limit(limit).all()
-
-    # 转换日期时间为字符串
-    for plan in plans:
-        if plan.created_at:
-            plan.created_at = plan.created_at.isoformat()
-        if plan.start_time:
-            plan.start_time = plan.start_time.isoformat()
-        if plan.end_time:
-            plan.end_time = plan.end_time.isoformat()
-
-    return plans
+def read_plans(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    # 按 (创建时间, id) 降序排序，分页结果稳定；传入 cursor 时按游标分页，否则兼容 skip 偏移
+    plans = keyset_page(db.query(Plan).filter(Plan.user_id == current_user.id), Plan.created_at, Plan.id, cursor, skip, limit).all()
+    cursor_value = next_cursor(plans, "created_at", limit)
+
+    return plan_list_serializer.response(plans, headers={NEXT_CURSOR_HEADER: cursor_value} if cursor_value else None)
 
 # 创建新计划
 @router.post("/", response_model=PlanResponse)
-def create_plan(plan: PlanCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def create_plan(plan: PlanCreate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_active_user)):
     db_plan = Plan(**plan.model_dump(), user_id=current_user.id)
     db.add(db_plan)
+    db.flush()
+    record_plan_change(db, current_user.id, None, bool(db_plan.completed))
     db.commit()
     db.refresh(db_plan)
 
-    # 转换日期时间为字符串
-    if db_plan.created_at:
-        db_plan.created_at = db_plan.created_at.isoformat()
-    if db_plan.start_time:
-        db_plan.start_time = db_plan.start_time.isoformat()
-    if db_plan.end_time:
-        db_plan.end_time = db_plan.end_time.isoformat()
-
     return db_plan
 
 # 更新计划
 @router.put("/{plan_id}", response_model=PlanResponse)
-def update_plan(plan_id: int, plan: PlanUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def update_plan(plan_id: int, plan: PlanUpdate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_active_user)):
     db_plan = db.query(Plan).filter(Plan.id == plan_id, Plan.user_id == current_user.id).first()
     if not db_plan:
         raise HTTPException(status_code=404, detail="计划未找到")
 
+    was_completed = bool(db_plan.completed)
     plan_data = plan.model_dump(exclude_unset=True)
     for key, value in plan_data.items():
         setattr(db_plan, key, value)
 
+    db.flush()
+    record_plan_change(db, current_user.id, was_completed, bool(db_plan.completed))
     db.commit()
     db.refresh(db_plan)
 
-    # 转换日期时间为字符串
-    if db_plan.created_at:
-        db_plan.created_at = db_plan.created_at.isoformat()
-    if db_plan.start_time:
-        db_plan.start_time = db_plan.start_time.isoformat()
-    if db_plan.end_time:
-        db_plan.end_time = db_plan.end_time.isoformat()
-
     return db_plan
 
 # 开始计划
 @router.post("/{plan_id}/start", response_model=PlanResponse)
-def start_plan(plan_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def start_plan(
+    plan_id: int,
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    # 重试的请求返回首次执行的结果，而不是“计划已经开始”
+    if idempotency_key:
+        stored = reserve_key(db, current_user.id, idempotency_key, "start_plan", {"plan_id": plan_id})
+        if stored is not None:
+            return replay_response(stored)
+
     db_plan = db.query(Plan).filter(Plan.id == plan_id, Plan.user_id == current_user.id).first()
     if not db_plan:
         raise HTTPException(status_code=404, detail="计划未找到")
@@ -80,51 +81,59 @@ def start_plan(plan_id: int, db: Session = Depends(get_db), current_user: User =
 
     db_plan.started = True
     db_plan.start_time = datetime.now(timezone.utc)
+    if idempotency_key:
+        # 保存的响应与正常返回一致（时间字段为数据库中读回的值）
+        db.flush()
+        db.refresh(db_plan)
+        store_response(db, current_user.id, idempotency_key, "start_plan", PlanResponse.model_validate(db_plan).model_dump(mode="json"))
     db.commit()
     db.refresh(db_plan)
 
-    # 转换日期时间为字符串
-    if db_plan.created_at:
-        db_plan.created_at = db_plan.created_at.isoformat()
-    if db_plan.start_time:
-        db_plan.start_time = db_plan.start_time.isoformat()
-    if db_plan.end_time:
-        db_plan.end_time = db_plan.end_time.isoformat()
-
     return db_plan
 
 # 完成计划
 @router.post("/{plan_id}/complete", response_model=PlanResponse)
-def complete_plan(plan_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def complete_plan(
+    plan_id: int,
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    if idempotency_key:
+        stored = reserve_key(db, current_user.id, idempotency_key, "complete_plan", {"plan_id": plan_id})
+        if stored is not None:
+            return replay_response(stored)
+
     db_plan = db.query(Plan).filter(Plan.id == plan_id, Plan.user_id == current_user.id).first()
     if not db_plan:
         raise HTTPException(status_code=404, detail="计划未找到")
     if not db_plan.started:
         raise HTTPException(status_code=400, detail="计划尚未开始")
 
+    was_completed = bool(db_plan.completed)
     db_plan.completed = True
     db_plan.end_time = datetime.now(timezone.utc)
+    db.flush()
+    record_plan_change(db, current_user.id, was_completed, True)
+    if idempotency_key:
+        db.refresh(db_plan)
+        store_response(db, current_user.id, idempotency_key, "complete_plan", PlanResponse.model_validate(db_plan).model_dump(mode="json"))
     db.commit()
     db.refresh(db_plan)
 
-    # 转换日期时间为字符串
-    if db_plan.created_at:
-        db_plan.created_at = db_plan.created_at.isoformat()
-    if db_plan.start_time:
-        db_plan.start_time = db_plan.start_time.isoformat()
-    if db_plan.end_time:
-        db_plan.end_time = db_plan.end_time.isoformat()
-
     return db_plan
 
 # 删除计划
 @router.delete("/{plan_id}")
-def delete_plan(plan_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def delete_plan(plan_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_active_user)):
     db_plan = db.query(Plan).filter(Plan.id == plan_id, Plan.user_id == current_user.id).first()
     if not db_plan:
         raise HTTPException(status_code=404, detail="计划未找到")
 
+    was_completed = bool(db_plan.completed)
     db.delete(db_plan)
+    db.flush()
+    record_plan_change(db, current_user.id, was_completed, None)
     db.commit()
 
     return {"message": "计划删除成功"}
\ No newline at end of file
@@ -1,44 +1,34 @@
 # backend/app/routers/statistics.py
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date, timedelta
-from app.modules.study.models import Task
-from app.modules.common.models import User
-from app.auth import get_current_active_user
-from app.database import get_db
+from app.auth import CurrentUser, get_current_active_user
+from app.database import get_async_db
+from app.services.daily_rollup import get_rollups, rollup_totals, empty_hours
+from app.services.statistics_summary import SUMMARY_SECTIONS, compute_summary
+from app.services.streaks import get_streaks
+from app.services.statistics_cache import cached_statistics, statistics_version
 import pytz
 from app.core.config import TIMEZONE
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-router = APIRouter()
+# 所有统计接口都只依赖用户自己的数据，数据版本未变化时按ETag返回304；@cached_statistics 在服务端缓存结果
+router = APIRouter(dependencies=[Depends(statistics_version)])
 
 # 获取用户基本统计数据（根路径）
 @router.get("/", response_model=Dict[str, Any])
-def get_basic_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@cached_statistics
+async def get_basic_stats(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     # 获取今天的日期范围（中国时区）
     china_tz = pytz.timezone(TIMEZONE)
     now = datetime.now(china_tz)
     today = now.date()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
-
-    # 查询今日任务总时长
-    daily_duration = db.query(func.sum(Task.duration)).filter(
-        Task.user_id == current_user.id,
-        Task.start >= today_start,
-        Task.start <= today_end
-    ).scalar() or 0
-
-    # 查询所有任务总时长
-    total_minutes = db.query(func.sum(Task.duration)).filter(
-        Task.user_id == current_user.id
-    ).scalar() or 0
-
-    # 查询总任务数
-    total_tasks = db.query(func.count(Task.id)).filter(
-        Task.user_id == current_user.id
-    ).scalar() or 0
+
+    # 今日任务总时长
+    _, daily_duration, _ = await db.run_sync(rollup_totals, current_user.id, today, today)
+
+    # 所有任务总时长和总任务数
+    total_tasks, total_minutes, _ = await db.run_sync(rollup_totals, current_user.id)
 
     # 转换为小时
     total_hours = round(total_minutes / 60, 1)
@@ -50,18 +40,34 @@ def get_basic_stats(db: Session = Depends(get_db), current_user: User = Depends(
         "total_tasks": total_tasks
     }
 
+# 获取仪表盘汇总数据（一次查询返回所需的全部分区）
+@router.get("/summary", response_model=Dict[str, Any])
+@cached_statistics
+async def get_summary_stats(
+    sections: Optional[str] = Query(None, description=f"逗号分隔的分区，可选: {','.join(SUMMARY_SECTIONS)}，默认全部"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    # 解析请求的分区
+    requested = SUMMARY_SECTIONS
+    if sections:
+        requested = [section.strip() for section in sections.split(",") if section.strip()]
+        unknown = [section for section in requested if section not in SUMMARY_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知的统计分区: {', '.join(unknown)}")
+
+    # 获取今天的日期（中国时区）
+    china_tz = pytz.timezone(TIMEZONE)
+    today = datetime.now(china_tz).date()
+
+    return await db.run_sync(compute_summary, current_user.id, today, requested)
+
 # 获取用户总计统计数据
 @router.get("/total", response_model=Dict[str, Any])
-def get_total_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    # 查询所有任务总时长
-    total_minutes = db.query(func.sum(Task.duration)).filter(
-        Task.user_id == current_user.id
-    ).scalar() or 0
-
-    # 查询总任务数
-    total_tasks = db.query(func.count(Task.id)).filter(
-        Task.user_id == current_user.id
-    ).scalar() or 0
+@cached_statistics
+async def get_total_stats(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
+    # 汇总所有每日数据
+    total_tasks, total_minutes, _ = await db.run_sync(rollup_totals, current_user.id)
 
     # 转换为小时
     total_hours = round(total_minutes / 60, 1)
@@ -74,40 +80,28 @@ def get_total_stats(db: Session = Depends(get_db), current_user: User = Depends(
 
 # 获取用户每日统计数据
 @router.get("/daily", response_model=Dict[str, Any])
-def get_daily_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@cached_statistics
+async def get_daily_stats(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     # 获取今天的日期范围（中国时区）
     china_tz = pytz.timezone(TIMEZONE)
     now = datetime.now(china_tz)
     today = now.date()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
-
-    # 查询今日任务总时长
-    total_duration = db.query(func.sum(Task.duration)).filter(
-        Task.user_id == current_user.id,
-        Task.start >= today_start,
-        Task.start <= today_end
-    ).scalar() or 0
-
-    # 查询每小时的任务时长
-    hourly_stats = db.query(
-        func.extract('hour', Task.start).label('hour'),
-        func.sum(Task.duration).label('duration')
-    ).filter(
-        Task.user_id == current_user.id,
-        Task.start >= today_start,
-        Task.start <= today_end
-    ).group_by(func.extract('hour', Task.start)).all()
 
-    # 转换为前端期望的格式
+    # 读取今日汇总
+    rollups = await db.run_sync(get_rollups, current_user.id, today, today)
+    total_duration = rollups[0].total_minutes if rollups else 0
+    hourly_counts = rollups[0].hourly_counts if rollups else empty_hours()
+    hourly_minutes = rollups[0].hourly_minutes if rollups else empty_hours()
+
+    # 转换为前端期望的格式（只包含有任务的小时）
     hourly_data = []
-    for stat in hourly_stats:
-        hour = int(stat.hour)
-        hour_str = f"{hour:02d}:00"
-        hourly_data.append({
-            "time": hour_str,
-            "duration": stat.duration
-        })
+    for hour in range(24):
+        if hourly_counts[hour] > 0:
+            hour_str = f"{hour:02d}:00"
+            hourly_data.append({
+                "time": hour_str,
+                "duration": hourly_minutes[hour]
+            })
 
     return {
         "duration": total_duration,
@@ -116,7 +110,8 @@ def get_daily_stats(db: Session = Depends(get_db), current_user: User = Depends(
 
 # 获取用户每周统计数据
 @router.get("/weekly", response_model=Dict[str, Any])
-def get_weekly_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@cached_statistics
+async def get_weekly_stats(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     # 获取本周的日期范围（中国时区）
     china_tz = pytz.timezone(TIMEZONE)
     now = datetime.now(china_tz)
@@ -126,35 +121,19 @@ def get_weekly_stats(db: Session = Depends(get_db), current_user: User = Depends
     start_of_week = today - timedelta(days=today.weekday())
     end_of_week = start_of_week + timedelta(days=6)
 
-    week_start = datetime.combine(start_of_week, datetime.min.time())
-    week_end = datetime.combine(end_of_week, datetime.max.time())
-
-    # 查询本周任务总时长
-    total_duration = db.query(func.sum(Task.duration)).filter(
-        Task.user_id == current_user.id,
-        Task.start >= week_start,
-        Task.start <= week_end
-    ).scalar() or 0
-
-    # 按日期分组查询每天的任务时长
-    daily_stats = db.query(
-        func.date(Task.start).label('date'),
-        func.sum(Task.duration).label('duration')
-    ).filter(
-        Task.user_id == current_user.id,
-        Task.start >= week_start,
-        Task.start <= week_end
-    ).group_by(func.date(Task.start)).all()
+    # 读取本周每日汇总
+    rollups = await db.run_sync(get_rollups, current_user.id, start_of_week, end_of_week)
+    total_duration = sum(rollup.total_minutes for rollup in rollups)
 
     # 转换为字典列表
     daily_data = []
-    for stat in daily_stats:
+    for rollup in rollups:
         # 获取星期几的名称
-        day_name = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"][stat.date.weekday()]
+        day_name = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"][rollup.local_date.weekday()]
         daily_data.append({
-            "date": stat.date.isoformat(),
+            "date": rollup.local_date.isoformat(),
             "day": day_name,
-            "duration": stat.duration
+            "duration": rollup.total_minutes
         })
 
     return {
@@ -166,7 +145,8 @@ def get_weekly_stats(db: Session = Depends(get_db), current_user: User = Depends
 
 # 获取用户每月统计数据
 @router.get("/monthly", response_model=Dict[str, Any])
-def get_monthly_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@cached_statistics
+async def get_monthly_stats(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     # 获取本月的日期范围（中国时区）
     china_tz = pytz.timezone(TIMEZONE)
     now = datetime.now(china_tz)
@@ -182,35 +162,19 @@ def get_monthly_stats(db: Session = Depends(get_db), current_user: User = Depend
     else:
         last_day = date(year, month + 1, 1) - timedelta(days=1)
 
-    month_start = datetime.combine(first_day, datetime.min.time())
-    month_end = datetime.combine(last_day, datetime.max.time())
-
-    # 查询本月任务总时长
-    total_duration = db.query(func.sum(Task.duration)).filter(
-        Task.user_id == current_user.id,
-        Task.start >= month_start,
-        Task.start <= month_end
-    ).scalar() or 0
-
-    # 按日期分组查询每天的任务时长
-    daily_stats = db.query(
-        func.date(Task.start).label('date'),
-        func.sum(Task.duration).label('duration')
-    ).filter(
-        Task.user_id == current_user.id,
-        Task.start >= month_start,
-        Task.start <= month_end
-    ).group_by(func.date(Task.start)).all()
+    # 读取本月每日汇总
+    rollups = await db.run_sync(get_rollups, current_user.id, first_day, last_day)
+    total_duration = sum(rollup.total_minutes for rollup in rollups)
 
     # 转换为字典列表
     daily_data = []
-    for stat in daily_stats:
+    for rollup in rollups:
         # 获取日期的天数
-        day = stat.date.day
+        day = rollup.local_date.day
         daily_data.append({
-            "date": stat.date.isoformat(),
+            "date": rollup.local_date.isoformat(),
             "day": f"{day}日",
-            "duration": stat.duration
+            "duration": rollup.total_minutes
         })
 
     return {
@@ -222,7 +186,8 @@ def get_monthly_stats(db: Session = Depends(get_db), current_user: User = Depend
 
 # 获取热力图数据
 @router.get("/heatmap", response_model=List[Dict[str, Any]])
-def get_heatmap_data(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@cached_statistics
+async def get_heatmap_data(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     # 获取中国时区
     china_tz = pytz.timezone(TIMEZONE)
     now = datetime.now(china_tz)
@@ -239,54 +204,45 @@ def get_heatmap_data(db: Session = Depends(get_db), current_user: User = Depends
     if end_date < today:
         end_date = today
 
-    # 查询从注册日期到结束日期的每天任务总时长
-    daily_stats = db.query(
-        func.date(Task.start).label('date'),
-        func.sum(Task.duration).label('duration')
-    ).filter(
-        Task.user_id == current_user.id,
-        Task.start >= datetime.combine(registration_date, datetime.min.time()),
-        Task.start <= datetime.combine(end_date, datetime.max.time())
-    ).group_by(func.date(Task.start)).all()
+    # 读取从注册日期到结束日期的每日汇总
+    rollups = await db.run_sync(get_rollups, current_user.id, registration_date, end_date)
 
     # 转换为前端期望的格式
     heatmap_data = []
-    for stat in daily_stats:
+    for rollup in rollups:
         heatmap_data.append({
-            "date": stat.date.isoformat(),
-            "duration": stat.duration  # 直接使用时长，不再转换为单位
+            "date": rollup.local_date.isoformat(),
+            "duration": rollup.total_minutes  # 直接使用时长，不再转换为单位
         })
 
     return heatmap_data
 
 # 获取时间分布数据
 @router.get("/time-distribution", response_model=Dict[str, List[Dict[str, Any]]])
-def get_time_distribution(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@cached_statistics
+async def get_time_distribution(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     # 获取过去90天的日期范围
     china_tz = pytz.timezone(TIMEZONE)
     now = datetime.now(china_tz)
     today = now.date()
     past_90_days = today - timedelta(days=90)
 
-    # 查询每小时的任务时长
-    hourly_stats = db.query(
-        func.extract('hour', Task.start).label('hour'),
-        func.sum(Task.duration).label('duration'),
-        func.count(Task.id).label('count')
-    ).filter(
-        Task.user_id == current_user.id,
-        Task.start >= datetime.combine(past_90_days, datetime.min.time()),
-        Task.start <= datetime.combine(today, datetime.max.time())
-    ).group_by(func.extract('hour', Task.start)).all()
+    # 累加每日汇总中的小时分布
+    hourly_counts = empty_hours()
+    hourly_minutes = empty_hours()
+    rollups = await db.run_sync(get_rollups, current_user.id, past_90_days, today)
+    for rollup in rollups:
+        for hour in range(24):
+            hourly_counts[hour] += rollup.hourly_counts[hour]
+            hourly_minutes[hour] += rollup.hourly_minutes[hour]
 
     # 转换为前端期望的格式，确保所有24小时都有数据
     hourly_data = []
     for hour in range(24):
-        stat = next((s for s in hourly_stats if int(s.hour) == hour), None)
         hourly_data.append({
             "hour": hour,
-            "duration": stat.duration if stat else 0,
-            "count": stat.count if stat else 0,
+            "duration": hourly_minutes[hour],
+            "count": hourly_counts[hour],
             "time": f"{hour:02d}:00"  # 添加时间字符串格式
         })
 
@@ -294,14 +250,13 @@ def get_time_distribution(db: Session = Depends(get_db), current_user: User = De
 
 # 获取用户统计数据
 @router.get("/user", response_model=Dict[str, Any])
-def get_user_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    # 获取用户的任务统计
-    total_tasks = db.query(func.count(Task.id)).filter(Task.user_id == current_user.id).scalar() or 0
-    total_duration = db.query(func.sum(Task.duration)).filter(Task.user_id == current_user.id).scalar() or 0
-    completed_tasks = db.query(func.count(Task.id)).filter(Task.user_id == current_user.id, Task.completed == True).scalar() or 0
+@cached_statistics
+async def get_user_stats(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
+    # 汇总用户的任务统计
+    total_tasks, total_duration, completed_tasks = await db.run_sync(rollup_totals, current_user.id)
 
     # 计算连续学习天数
-    streak_days = calculate_streak_days(db, current_user.id)
+    streak_days = (await db.run_sync(get_streaks, current_user.id)).current
 
     return {
         "total_tasks": total_tasks,
@@ -312,53 +267,3 @@ def get_user_stats(db: Session = Depends(get_db), current_user: User = Depends(g
         "streak_days": streak_days,
         "created_at": current_user.created_at.isoformat() if current_user.created_at else None
     }
-
-# 辅助函数：计算连续学习天数
-def calculate_streak_days(db: Session, user_id: int) -> int:
-    # 获取中国时区
-    china_tz = pytz.timezone(TIMEZONE)
-    now = datetime.now(china_tz)
-    today = now.date()
-
-    # 查询过去90天每天是否有学习记录
-    day_records = db.query(
-        func.date(Task.start).label('date')
-    ).filter(
-        Task.user_id == user_id,
-        Task.start >= datetime.combine(today - timedelta(days=90), datetime.min.time()),
-        Task.start <= datetime.combine(today, datetime.max.time())
-    ).group_by(func.date(Task.start)).all()
-
-    # 提取日期列表并排序
-    study_dates = sorted([record.date for record in day_records], reverse=True)
-
-    # 如果没有学习记录，返回0
-    if not study_dates:
-        return 0
-
-    # 检查今天是否有学习记录
-    has_today = today in study_dates
-
-    # 计算连续学习天数
-    streak = 1 if has_today else 0  # 如果今天有记录，从1开始计数
-
-    # 如果今天没有记录但昨天有，从昨天开始计算
-    start_idx = 0 if has_today else (1 if today - timedelta(days=1) in study_dates else -1)
-
-    # 如果没有可计算的起始日期，返回0
-    if start_idx == -1:
-        return 0
-
-    # 从起始日期开始向前检查连续性
-    current_date = study_dates[start_idx]
-
-    for i in range(start_idx + 1, len(study_dates)):
-        # 如果下一个日期与当前日期相差1天，则连续
-        if (current_date - study_dates[i]).days == 1:
-            streak += 1
-            current_date = study_dates[i]
-        else:
-            # 连续性中断
-            break
-
-    return streak
@@ -1,46 +1,62 @@
 # backend/app/routers/tasks.py
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.study.models import Task
-from app.modules.common.models import User
-from app.schemas.task import TaskCreate, TaskUpdate
-from app.auth import get_current_active_user
-from app.database import get_db
+from app.schemas.task import (
+    TaskCreate, TaskUpdate, TaskResponse, TodayTaskResponse, TaskBulkItem, TaskBulkResponse,
+    task_list_serializer, today_task_list_serializer
+)
+from app.auth import CurrentUser, get_current_active_user
+from app.database import get_async_db
+from app.core.pagination import NEXT_CURSOR_HEADER, keyset_page, next_cursor
+from app.services.study_events import TaskFacts, record_task_change
+from app.services.task_ingest import ingest_tasks
+from app.services.idempotency import idempotency_key_header, reserve_key, store_response, replay_response
 from datetime import datetime
 import pytz
-from app.core.config import TIMEZONE
+from app.core.config import TIMEZONE, BULK_TASK_MAX_ITEMS
 
 router = APIRouter()
 
+# 查找属于当前用户的任务
+async def _get_user_task(db: AsyncSession, task_id: int, user_id: int):
+    result = await db.execute(select(Task).where(Task.id == task_id, Task.user_id == user_id))
+    return result.scalars().first()
+
 # 获取用户的所有任务
-@router.get("/", response_model=None)  # 移除响应模型限制
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/", response_model=List[TaskResponse])
+async def read_tasks(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
     try:
-        # 查询任务，按开始时间降序排序（最新的在前面）
-        tasks = db.query(Task).filter(Task.user_id == current_user.id).order_by(Task.start.desc()).offset(skip).limit(limit).all()
-
-        # 将每个任务转换为字典
-        result_tasks = []
-        for task in tasks:
-            task_dict = {
-                "id": task.id,
-                "name": task.name,
-                "duration": task.duration,
-                "user_id": task.user_id,
-                "start": task.start.isoformat() if task.start else None,
-                "end": task.end.isoformat() if task.end else None,
-                "completed": task.completed
-            }
-            result_tasks.append(task_dict)
-
-        return result_tasks
+        # 查询任务，按 (开始时间, id) 降序排序（最新的在前面）；传入 cursor 时按游标分页，否则兼容 skip 偏移
+        result = await db.execute(
+            keyset_page(select(Task).where(Task.user_id == current_user.id), Task.start, Task.id, cursor, skip, limit)
+        )
+        tasks = result.scalars().all()
+        cursor_value = next_cursor(tasks, "start", limit)
+
+        return task_list_serializer.response(tasks, headers={NEXT_CURSOR_HEADER: cursor_value} if cursor_value else None)
+    except HTTPException:
+        raise
     except Exception as e:
         # 重新抛出异常，让FastAPI处理
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # 创建新任务
-@router.post("/", response_model=None)
-def create_task(task: TaskCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.post("/", response_model=TaskResponse)
+async def create_task(
+    task: TaskCreate,
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
     try:
         # 确保任务是已完成的
         if not task.completed:
@@ -50,6 +66,12 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db), current_user: U
         if not task.end:
             raise HTTPException(status_code=400, detail="已完成的任务必须有结束时间")
 
+        # 客户端超时重试时返回首次创建的结果，不再重复创建
+        if idempotency_key:
+            stored = await db.run_sync(reserve_key, current_user.id, idempotency_key, "create_task", task.model_dump(mode="json"))
+            if stored is not None:
+                return replay_response(stored)
+
         # 创建新任务对象
         db_task = Task(
             name=task.name,
@@ -62,114 +84,131 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db), current_user: U
         
         # 保存到数据库
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
+        await db.flush()
+
+        # 增量更新统计数据
+        await db.run_sync(record_task_change, current_user.id, None, TaskFacts.of(db_task))
+        if idempotency_key:
+            body = TaskResponse.model_validate(db_task).model_dump(mode="json")
+            await db.run_sync(store_response, current_user.id, idempotency_key, "create_task", body)
+        await db.commit()
+        await db.refresh(db_task)
         
         # 返回创建的任务
-        return {
-            "id": db_task.id,
-            "name": db_task.name,
-            "duration": db_task.duration,
-            "user_id": db_task.user_id,
-            "start": db_task.start.isoformat() if db_task.start else None,
-            "end": db_task.end.isoformat() if db_task.end else None,
-            "completed": db_task.completed
-        }
+        return db_task
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create task: {str(e)}")
 
+# 批量创建任务（离线番茄钟同步）
+@router.post("/bulk", response_model=TaskBulkResponse)
+async def create_tasks_bulk(tasks: List[TaskBulkItem], db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
+    if len(tasks) > BULK_TASK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"单次最多提交 {BULK_TASK_MAX_ITEMS} 个任务")
+    try:
+        # 逐条校验、一次写入，已同步过的幂等键返回 duplicate；统计数据整批更新一次
+        result = await db.run_sync(ingest_tasks, current_user.id, tasks)
+        await db.commit()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create tasks: {str(e)}")
+
 # 更新任务
-@router.put("/{task_id}", response_model=None)
-def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.put("/{task_id}", response_model=TaskResponse)
+async def update_task(task_id: int, task: TaskUpdate, db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     try:
         # 查找任务
-        db_task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+        db_task = await _get_user_task(db, task_id, current_user.id)
         if not db_task:
             raise HTTPException(status_code=404, detail="Task not found")
         
+        old_facts = TaskFacts.of(db_task)
+
         # 更新任务属性
         for key, value in task.dict(exclude_unset=True).items():
             setattr(db_task, key, value)
-        
+        await db.flush()
+
+        # 增量更新统计数据
+        await db.run_sync(record_task_change, current_user.id, old_facts, TaskFacts.of(db_task))
+
         # 保存更改
-        db.commit()
-        db.refresh(db_task)
+        await db.commit()
+        await db.refresh(db_task)
         
         # 返回更新后的任务
-        return {
-            "id": db_task.id,
-            "name": db_task.name,
-            "duration": db_task.duration,
-            "user_id": db_task.user_id,
-            "start": db_task.start.isoformat() if db_task.start else None,
-            "end": db_task.end.isoformat() if db_task.end else None,
-            "completed": db_task.completed
-        }
+        return db_task
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update task: {str(e)}")
 
 # 完成任务
-@router.post("/{task_id}/complete", response_model=None)
-def complete_task(task_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.post("/{task_id}/complete", response_model=TaskResponse)
+async def complete_task(task_id: int, db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     try:
         # 查找任务
-        db_task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+        db_task = await _get_user_task(db, task_id, current_user.id)
         if not db_task:
             raise HTTPException(status_code=404, detail="Task not found")
         
+        old_facts = TaskFacts.of(db_task)
+
         # 设置任务完成状态
         db_task.completed = True
-        db_task.end = datetime.now(pytz.timezone(TIMEZONE))
-        
+        db_task.end = datetime.now(pytz.timezone(TIMEZONE)).replace(tzinfo=None)
+        await db.flush()
+
+        # 增量更新统计数据
+        await db.run_sync(record_task_change, current_user.id, old_facts, TaskFacts.of(db_task))
+
         # 保存更改
-        db.commit()
-        db.refresh(db_task)
+        await db.commit()
+        await db.refresh(db_task)
         
         # 返回更新后的任务
-        return {
-            "id": db_task.id,
-            "name": db_task.name,
-            "duration": db_task.duration,
-            "user_id": db_task.user_id,
-            "start": db_task.start.isoformat() if db_task.start else None,
-            "end": db_task.end.isoformat() if db_task.end else None,
-            "completed": db_task.completed
-        }
+        return db_task
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to complete task: {str(e)}")
 
 # 删除任务
 @router.delete("/{task_id}")
-def delete_task(task_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     try:
         # 查找任务
-        db_task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+        db_task = await _get_user_task(db, task_id, current_user.id)
         if not db_task:
             raise HTTPException(status_code=404, detail="Task not found")
         
+        old_facts = TaskFacts.of(db_task)
+
         # 删除任务
-        db.delete(db_task)
-        db.commit()
+        await db.delete(db_task)
+        await db.flush()
+
+        # 增量更新统计数据
+        await db.run_sync(record_task_change, current_user.id, old_facts, None)
+        await db.commit()
         
         return {"message": "Task deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete task: {str(e)}")
 
 # 获取今日任务
-@router.get("/today", response_model=None)
-def get_today_tasks(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/today", response_model=List[TodayTaskResponse])
+async def get_today_tasks(db: AsyncSession = Depends(get_async_db), current_user: CurrentUser = Depends(get_current_active_user)):
     try:
         # 获取今天的日期范围（中国时区）
         china_tz = pytz.timezone(TIMEZONE)
@@ -179,27 +218,15 @@ def get_today_tasks(db: Session = Depends(get_db), current_user: User = Depends(
         today_end = datetime.combine(today, datetime.max.time())
 
         # 查询今日任务，按开始时间降序排序（最新的在前面）
-        tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.start >= today_start,
-            Task.start <= today_end
-        ).order_by(Task.start.desc()).all()
-
-        # 将任务转换为字典
-        result_tasks = []
-        for task in tasks:
-            task_dict = {
-                "id": task.id,
-                "name": task.name,
-                "duration": task.duration,
-                "user_id": task.user_id,
-                "start": task.start.isoformat() if task.start else None,
-                "end": task.end.isoformat() if task.end else None,
-                "category": "学习"  # 默认分类，实际应用中可以从数据库获取
-            }
-            result_tasks.append(task_dict)
-
-        return result_tasks
+        result = await db.execute(
+            select(Task).where(
+                Task.user_id == current_user.id,
+                Task.start >= today_start,
+                Task.start <= today_end
+            ).order_by(Task.start.desc())
+        )
+
+        return today_task_list_serializer.response(result.scalars().all())
     except Exception as e:
         # 重新抛出异常
         raise HTTPException(status_code=500, detail=f"Failed to get today's tasks: {str(e)}")
@@ -1,27 +1,53 @@
 # backend/app/routers/users.py
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.modules.common.models import User
 from app.schemas.user import UserUpdate, UserResponse
-from app.auth import get_current_active_user, get_password_hash
+from app.auth import CurrentUser, get_current_active_user, get_current_user_record, get_password_hash_async, invalidate_user_cache
 from app.database import get_db
+from app.core.backplane import notify_nodes
+from app.core.config import SECRET_KEY, WS_BACKPLANE_URL, WS_BACKPLANE_PREFIX, WS_SERVICE_URL
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserResponse)
-async def read_user_me(current_user: User = Depends(get_current_active_user)):
+async def read_user_me(current_user: User = Depends(get_current_user_record)):
     """获取当前登录用户的详细信息"""
     return current_user
 
 @router.put("/me", response_model=UserResponse)
 async def update_user_me(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """更新当前登录用户的信息"""
+    # 新密码在密码哈希线程池中计算，数据库操作在线程池中执行，均不阻塞事件循环
+    hashed_password = None
+    if user_update.password is not None:
+        hashed_password = await get_password_hash_async(user_update.password)
+
+    user = await run_in_threadpool(_apply_user_update, db, current_user.id, user_update, hashed_password)
+
+    # 用户名等信息可能已变化，清除认证缓存
+    await run_in_threadpool(invalidate_user_cache, user.id)
+    if user_update.username is not None or user_update.avatar is not None:
+        await run_in_threadpool(notify_profile_changed, user.id)
+
+    return user
+
+def notify_profile_changed(user_id: int) -> None:
+    """通知WebSocket节点刷新用户资料（用户名、头像）"""
+    notify_nodes(
+        WS_BACKPLANE_URL, WS_BACKPLANE_PREFIX, {"type": "profile_changed", "user_id": user_id},
+        service_url=WS_SERVICE_URL, secret_key=SECRET_KEY
+    )
+
+def _apply_user_update(db: Session, user_id: int, user_update: UserUpdate, hashed_password: Optional[str]) -> User:
     # 获取当前用户
-    user = db.query(User).filter(User.id == current_user.id).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
 
@@ -32,7 +58,7 @@ async def update_user_me(
     if user_update.username is not None:
         # 检查用户名是否已存在
         existing_user = db.query(User).filter(User.username == user_update.username).first()
-        if existing_user and existing_user.id != current_user.id:
+        if existing_user and existing_user.id != user_id:
             raise HTTPException(status_code=400, detail="用户名已被使用")
         user.username = user_update.username
 
@@ -40,7 +66,7 @@ async def update_user_me(
     if user_update.email is not None and user_update.email != user.email:
         # 检查邮箱是否已存在
         existing_email = db.query(User).filter(User.email == user_update.email).first()
-        if existing_email and existing_email.id != current_user.id:
+        if existing_email and existing_email.id != user_id:
             raise HTTPException(status_code=400, detail="邮箱已被使用")
         user.email = user_update.email
         # 只有当邮箱实际改变时才重置验证状态
@@ -50,8 +76,8 @@ async def update_user_me(
         user.email_verified = current_email_verified
 
     # 更新密码
-    if user_update.password is not None:
-        user.password = get_password_hash(user_update.password)
+    if hashed_password is not None:
+        user.password = hashed_password
 
     # 更新头像
     if user_update.avatar is not None:
@@ -60,13 +86,12 @@ async def update_user_me(
     # 提交更改
     db.commit()
     db.refresh(user)
-
     return user
 
 @router.put("/me/avatar", response_model=UserResponse)
-async def update_user_avatar(
+def update_user_avatar(
     avatar_data: dict,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """更新用户头像"""
@@ -81,13 +106,14 @@ async def update_user_avatar(
         user.avatar = avatar_data["avatar"]
         db.commit()
         db.refresh(user)
+        notify_profile_changed(user.id)
         return user
     else:
         raise HTTPException(status_code=400, detail="未提供有效的头像数据")
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user_me(
-    current_user: User = Depends(get_current_active_user),
+def delete_user_me(
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """删除当前登录用户的账号"""
@@ -100,4 +126,7 @@ async def delete_user_me(
     db.delete(user)
     db.commit()
 
+    # 清除认证缓存，已签发的令牌随即失效
+    invalidate_user_cache(current_user.id)
+
     return {"status": "success", "message": "用户已删除"}
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field
+from app.core.serialization import ListSerializer
 
 class PlanBase(BaseModel):
     text: str
@@ -24,3 +25,6 @@ class PlanResponse(PlanBase):
 
     class Config:
         from_attributes = True
+
+# 计划列表接口共用的序列化器
+plan_list_serializer = ListSerializer(PlanResponse)
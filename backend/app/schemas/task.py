@@ -1,6 +1,17 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import List, Optional
+import pytz
+from pydantic import BaseModel, Field, field_validator
+from app.core.config import TIMEZONE
+from app.core.serialization import ListSerializer
+
+
+def _naive_local(value: Optional[datetime]) -> Optional[datetime]:
+    # 任务时间列保存不带时区的 TIMEZONE 本地时间（按日期/小时汇总、今日任务等都按此读取）；
+    # 带偏移量的时间（如前端 toISOString() 发送的UTC时间）先换算为本地时间再去掉时区
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(pytz.timezone(TIMEZONE)).replace(tzinfo=None)
 
 class TaskBase(BaseModel):
     name: str
@@ -9,6 +20,8 @@ class TaskBase(BaseModel):
     end: Optional[datetime] = None  # 允许为空，但在业务逻辑中处理
     completed: Optional[bool] = False
 
+    _naive_times = field_validator("start", "end")(_naive_local)
+
 class TaskCreate(TaskBase):
     pass
 
@@ -19,9 +32,38 @@ class TaskUpdate(BaseModel):
     end: Optional[datetime] = None  # 允许为空，但在业务逻辑中处理
     completed: Optional[bool] = None
 
-class TaskResponse(TaskBase):
+    _naive_times = field_validator("start", "end")(_naive_local)
+
+class TaskResponse(BaseModel):
     id: int
-    user_id: int
+    name: Optional[str] = None
+    duration: Optional[int] = None
+    user_id: Optional[int] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    completed: Optional[bool] = None
 
     class Config:
         from_attributes = True
+
+class TodayTaskResponse(TaskResponse):
+    category: str = "学习"  # 默认分类，实际应用中可以从数据库获取
+
+class TaskBulkItem(TaskCreate):
+    client_key: str = Field(..., min_length=1, max_length=64)  # 客户端生成的幂等键，重复提交同一任务时不会重复创建
+
+class TaskBulkResult(BaseModel):
+    client_key: str
+    status: str               # created / duplicate / invalid
+    id: Optional[int] = None  # created 和 duplicate 时为任务ID
+    error: Optional[str] = None
+
+class TaskBulkResponse(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: List[TaskBulkResult]  # 与请求中的任务顺序一致
+
+# 任务列表接口共用的序列化器
+task_list_serializer = ListSerializer(TaskResponse)
+today_task_list_serializer = ListSerializer(TodayTaskResponse)
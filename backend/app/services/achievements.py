@@ -0,0 +1,169 @@
+# backend/app/services/achievements.py
+"""
+成就服务
+- 将 ACHIEVEMENTS 中的声明式规则编译为按指标排序的阈值数组，用二分查找求最高解锁等级
+- 根据目标等级与已存储的成就记录计算差异，并以一次批量upsert/delete写入
+"""
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from app.achievements_definitions import ACHIEVEMENTS
+from app.database import dialect_insert
+from app.modules.study.models import Achievement
+from app.services.data_version import bump_data_version
+
+# 规则运算符 -> 在升序阈值数组中统计已满足阈值个数的二分函数
+RULE_OPERATORS = {
+    ">=": bisect_right,  # 阈值 <= 指标值 的个数
+    ">": bisect_left,    # 阈值 < 指标值 的个数
+}
+
+
+def get_achievement_type(achievement_id: int) -> str:
+    """成就定义ID对应的成就记录类型"""
+    return f"achievement_{achievement_id}"
+
+
+class CompiledAchievement(NamedTuple):
+    """编译后的成就：单一指标上按阈值升序排列的等级"""
+    id: int
+    type: str
+    metric: str
+    operator: str
+    thresholds: Tuple[int, ...]
+    levels: Tuple[int, ...]
+
+    def unlocked_count(self, value) -> int:
+        """指标值为 value 时已解锁的等级数"""
+        return RULE_OPERATORS[self.operator](self.thresholds, value)
+
+    def highest_level(self, value) -> int:
+        """指标值为 value 时的最高解锁等级（0表示未解锁）"""
+        count = self.unlocked_count(value)
+        return self.levels[count - 1] if count else 0
+
+
+class AchievementRules:
+    """编译后的成就规则表"""
+
+    def __init__(self, definitions: List[Dict[str, Any]]):
+        self.achievements = [self._compile(definition) for definition in definitions]
+
+        # 每个指标关联的成就，便于批量任务只计算需要的指标
+        self.by_metric: Dict[str, List[CompiledAchievement]] = {}
+        for compiled in self.achievements:
+            self.by_metric.setdefault(compiled.metric, []).append(compiled)
+
+        # /definitions 接口的预计算响应
+        self.definitions_payload = {
+            "status": "success",
+            "achievements": [
+                {
+                    "id": definition["id"],
+                    "name": definition["name"],
+                    "description": definition["description"],
+                    "levels": [
+                        {"level": level["level"], "description": level["description"]}
+                        for level in definition["levels"]
+                    ]
+                }
+                for definition in definitions
+            ]
+        }
+
+    @staticmethod
+    def _compile(definition: Dict[str, Any]) -> CompiledAchievement:
+        rules = sorted(
+            ((level["rule"], level["level"]) for level in definition["levels"]),
+            key=lambda item: item[1]
+        )
+        metrics = {metric for (metric, _, _), _ in rules}
+        operators = {operator for (_, operator, _), _ in rules}
+        thresholds = tuple(threshold for (_, _, threshold), _ in rules)
+
+        if len(metrics) != 1 or len(operators) != 1:
+            raise ValueError(f"成就 {definition['id']} 的所有等级必须使用同一指标和运算符")
+        operator = operators.pop()
+        if operator not in RULE_OPERATORS:
+            raise ValueError(f"成就 {definition['id']} 使用了不支持的运算符: {operator}")
+        if list(thresholds) != sorted(thresholds):
+            raise ValueError(f"成就 {definition['id']} 的阈值必须随等级递增")
+
+        return CompiledAchievement(
+            id=definition["id"],
+            type=get_achievement_type(definition["id"]),
+            metric=metrics.pop(),
+            operator=operator,
+            thresholds=thresholds,
+            levels=tuple(level for _, level in rules)
+        )
+
+    def evaluate(self, user_stats: Mapping[str, Any]) -> Dict[str, int]:
+        """计算一个用户每种成就的最高解锁等级（成就类型 -> 等级，0表示未解锁）"""
+        return {
+            compiled.type: compiled.highest_level(user_stats.get(compiled.metric, 0) or 0)
+            for compiled in self.achievements
+        }
+
+    def evaluate_many(self, stats_by_user: Mapping[int, Mapping[str, Any]]) -> Dict[int, Dict[str, int]]:
+        """批量计算多个用户的最高解锁等级（user_id -> 成就类型 -> 等级）"""
+        return {user_id: self.evaluate(user_stats) for user_id, user_stats in stats_by_user.items()}
+
+
+def diff_achievements(
+    user_id: int,
+    targets: Dict[str, int],
+    stored_levels: Dict[str, int]
+) -> Tuple[List[Dict[str, int]], List[Tuple[int, str]]]:
+    """
+    计算目标等级与已存储等级之间的差异
+
+    targets: 成就类型 -> 应达到的最高等级（0表示未解锁）
+    stored_levels: 成就类型 -> 数据库中记录的等级
+    返回 (需要upsert的行, 需要删除的 (user_id, type))
+    """
+    upserts = []
+    deletes = []
+    for type_name, target in targets.items():
+        stored = stored_levels.get(type_name)
+        if target > 0 and stored != target:
+            upserts.append({"user_id": user_id, "type": type_name, "level": target})
+        elif target == 0 and stored is not None:
+            deletes.append((user_id, type_name))
+    return upserts, deletes
+
+
+def apply_achievement_diff(
+    db: Session,
+    upserts: List[Dict[str, int]],
+    deletes: Iterable[Tuple[int, str]]
+) -> Dict[Tuple[int, str], Any]:
+    """
+    以一条 INSERT ... ON CONFLICT (user_id, type) DO UPDATE 和一条 DELETE 应用差异并更新相关用户的数据版本，不提交事务
+
+    返回upsert后的行（(user_id, type) -> 行数据，含id和unlocked_at）
+    """
+    written = {}
+    if upserts:
+        insert = dialect_insert(db)
+        stmt = insert(Achievement).values(upserts)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Achievement.user_id, Achievement.type],
+            set_={"level": stmt.excluded.level}
+        ).returning(Achievement.id, Achievement.user_id, Achievement.type, Achievement.level, Achievement.unlocked_at)
+        for row in db.execute(stmt):
+            written[(row.user_id, row.type)] = row
+
+    deletes = list(deletes)
+    if deletes:
+        db.query(Achievement).filter(
+            tuple_(Achievement.user_id, Achievement.type).in_(deletes)
+        ).delete(synchronize_session=False)
+
+    bump_data_version(db, *{row["user_id"] for row in upserts}, *{user_id for user_id, _ in deletes})
+    return written
+
+
+# 模块加载时编译一次
+ACHIEVEMENT_RULES = AchievementRules(ACHIEVEMENTS)
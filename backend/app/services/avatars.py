@@ -0,0 +1,41 @@
+# backend/app/services/avatars.py
+"""
+头像引用
+头像通常以 data URL（base64编码的SVG）保存在用户表中，体积为几KB。
+在线用户列表等需要频繁下发的场景只发送按内容哈希生成的地址，浏览器按地址长期缓存头像
+"""
+import base64
+import hashlib
+import binascii
+from urllib.parse import unquote_to_bytes
+from typing import Optional, Tuple
+
+# 头像内容按哈希寻址，内容变化后地址随之变化，可以长期缓存
+AVATAR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def avatar_digest(avatar: str) -> str:
+    """头像内容的哈希"""
+    return hashlib.sha256(avatar.encode("utf-8")).hexdigest()[:16]
+
+
+def avatar_ref(user_id: int, avatar: Optional[str]) -> Optional[str]:
+    """
+    头像的引用：data URL 转换为 /api/avatar/{user_id}/{哈希} 地址，其他地址（如DiceBear URL）原样返回
+    """
+    if not avatar or not avatar.startswith("data:"):
+        return avatar or None
+    return f"/api/avatar/{user_id}/{avatar_digest(avatar)}"
+
+
+def decode_avatar(avatar: str) -> Optional[Tuple[str, bytes]]:
+    """解析 data URL，返回 (媒体类型, 内容)；格式不正确时返回None"""
+    header, separator, data = avatar.partition(",")
+    if not separator or not header.startswith("data:"):
+        return None
+    media_type, *params = header[len("data:"):].split(";")
+    try:
+        content = base64.b64decode(data, validate=True) if "base64" in params else unquote_to_bytes(data)
+    except (binascii.Error, ValueError):
+        return None
+    return media_type or "text/plain", content
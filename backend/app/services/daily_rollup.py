@@ -0,0 +1,149 @@
+# backend/app/services/daily_rollup.py
+"""
+每日学习汇总服务
+在任务写入时增量维护 study_daily_rollup，统计接口按天读取汇总而不再扫描任务表
+"""
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.modules.study.models import Task, DailyRollup
+from app.services.study_metrics import TaskFacts, task_date
+
+HOURS_PER_DAY = 24
+
+
+def empty_hours() -> List[int]:
+    return [0] * HOURS_PER_DAY
+
+
+def _ensure_rows(db: Session, user_id: int, days: Sequence[date]) -> Dict[date, DailyRollup]:
+    """确保指定日期的汇总行存在（并发安全），并加行锁返回"""
+    insert = dialect_insert(db)
+    stmt = insert(DailyRollup).values([
+        {
+            "user_id": user_id,
+            "local_date": day,
+            "task_count": 0,
+            "completed_count": 0,
+            "total_minutes": 0,
+            "hourly_counts": empty_hours(),
+            "hourly_minutes": empty_hours()
+        }
+        for day in days
+    ]).on_conflict_do_nothing(index_elements=[DailyRollup.user_id, DailyRollup.local_date])
+    db.execute(stmt)
+
+    rows = db.query(DailyRollup).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.local_date.in_(days)
+    ).with_for_update().populate_existing().all()
+    return {row.local_date: row for row in rows}
+
+
+def apply_task_change(db: Session, user_id: int, old: Optional[TaskFacts], new: Optional[TaskFacts]) -> None:
+    """在任务创建（old=None）、更新或删除（new=None）后增量更新每日汇总"""
+    apply_task_changes(db, user_id, [(old, new)])
+
+
+def apply_task_changes(db: Session, user_id: int, changes: Sequence[Tuple[Optional[TaskFacts], Optional[TaskFacts]]]) -> None:
+    """批量应用同一用户的多个任务改动 (old, new)，所有日期的汇总行一次加锁、一次更新"""
+    # 按日期合并本次改动的增量
+    deltas = {}
+    signed = [(facts, sign) for old, new in changes if old != new for facts, sign in ((old, -1), (new, 1))]
+    for facts, sign in signed:
+        if facts is None or facts.start is None:
+            continue
+        delta = deltas.setdefault(facts.start.date(), {
+            "task_count": 0, "completed_count": 0, "total_minutes": 0,
+            "hourly_counts": empty_hours(), "hourly_minutes": empty_hours()
+        })
+        minutes = facts.duration or 0
+        hour = facts.start.hour
+        delta["task_count"] += sign
+        delta["completed_count"] += sign if facts.completed else 0
+        delta["total_minutes"] += sign * minutes
+        delta["hourly_counts"][hour] += sign
+        delta["hourly_minutes"][hour] += sign * minutes
+
+    if not deltas:
+        return
+
+    rows = _ensure_rows(db, user_id, sorted(deltas))
+    for day, delta in deltas.items():
+        row = rows[day]
+        row.task_count += delta["task_count"]
+        row.completed_count += delta["completed_count"]
+        row.total_minutes += delta["total_minutes"]
+        # JSON列需要整体赋值才会被标记为已修改
+        row.hourly_counts = [a + b for a, b in zip(row.hourly_counts, delta["hourly_counts"])]
+        row.hourly_minutes = [a + b for a, b in zip(row.hourly_minutes, delta["hourly_minutes"])]
+        if row.task_count <= 0:
+            db.delete(row)
+
+
+def _filter_range(query, user_id: int, start_date: Optional[date], end_date: Optional[date]):
+    query = query.filter(DailyRollup.user_id == user_id)
+    if start_date is not None:
+        query = query.filter(DailyRollup.local_date >= start_date)
+    if end_date is not None:
+        query = query.filter(DailyRollup.local_date <= end_date)
+    return query
+
+
+def get_rollups(db: Session, user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[DailyRollup]:
+    """按日期升序读取用户在 [start_date, end_date] 内的每日汇总"""
+    query = _filter_range(db.query(DailyRollup), user_id, start_date, end_date)
+    return query.order_by(DailyRollup.local_date).all()
+
+
+def rollup_totals(db: Session, user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Tuple[int, int, int]:
+    """汇总 [start_date, end_date] 内的 (任务数, 学习分钟数, 已完成任务数)"""
+    query = _filter_range(db.query(
+        func.coalesce(func.sum(DailyRollup.task_count), 0),
+        func.coalesce(func.sum(DailyRollup.total_minutes), 0),
+        func.coalesce(func.sum(DailyRollup.completed_count), 0)
+    ), user_id, start_date, end_date)
+    return tuple(int(value) for value in query.one())
+
+
+def rebuild_daily_rollup(db: Session, user_ids: Sequence[int]) -> int:
+    """从任务表重建一批用户的每日汇总（不提交事务），返回写入的行数"""
+    db.query(DailyRollup).filter(DailyRollup.user_id.in_(user_ids)).delete(synchronize_session=False)
+
+    day = task_date()
+    hour = func.extract("hour", Task.start)
+    grouped = db.query(
+        Task.user_id,
+        day.label("day"),
+        hour.label("hour"),
+        func.count(Task.id),
+        func.count(Task.id).filter(Task.completed == True),
+        func.coalesce(func.sum(Task.duration), 0)
+    ).filter(
+        Task.user_id.in_(user_ids),
+        Task.start.isnot(None)
+    ).group_by(Task.user_id, day, hour)
+
+    rows = {}
+    for user_id, local_date, start_hour, count, completed, minutes in grouped:
+        row = rows.setdefault((user_id, local_date), {
+            "user_id": user_id,
+            "local_date": local_date,
+            "task_count": 0,
+            "completed_count": 0,
+            "total_minutes": 0,
+            "hourly_counts": empty_hours(),
+            "hourly_minutes": empty_hours()
+        })
+        start_hour = int(start_hour)
+        row["task_count"] += count
+        row["completed_count"] += completed
+        row["total_minutes"] += int(minutes)
+        row["hourly_counts"][start_hour] += count
+        row["hourly_minutes"][start_hour] += int(minutes)
+
+    if rows:
+        db.execute(DailyRollup.__table__.insert(), list(rows.values()))
+    return len(rows)
@@ -0,0 +1,87 @@
+# backend/app/services/data_version.py
+"""
+用户数据版本与条件请求
+任务/计划/成就写入时在同一事务中更新用户统计行上的 data_version，统计和成就接口据此返回弱ETag；
+请求头 If-None-Match 与当前ETag一致时直接返回304，不再执行汇总查询
+"""
+import time
+import hashlib
+from datetime import date
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.auth import CurrentUser, get_current_active_user
+from app.database import get_async_db
+from app.modules.study.models import UserStats
+from app.services.streaks import local_today
+from app.core.config import APP_VERSION
+
+# 客户端每次都需要用ETag向服务器确认，且响应只能由客户端缓存
+CACHE_CONTROL = "private, no-cache"
+
+
+def new_data_version() -> int:
+    """基于时间的版本号（微秒），统计记录重建后也不会与之前发出的版本重复"""
+    return time.time_ns() // 1000
+
+
+def bump_data_version(db: Session, *user_ids: int) -> None:
+    """用户数据写入后更新版本号，不提交事务；统计记录不存在时跳过（重建时会生成新版本）"""
+    if not user_ids:
+        return
+    version = new_data_version()
+    db.query(UserStats).filter(UserStats.user_id.in_(set(user_ids))).update(
+        {UserStats.data_version: case(
+            (UserStats.data_version >= version, UserStats.data_version + 1),
+            else_=version
+        )},
+        synchronize_session=False
+    )
+
+
+def weak_etag(scope: str, user_id: int, version: int, today: date) -> str:
+    """
+    按接口、用户、数据版本和本地日期生成弱ETag。
+    统计结果与“今天”相关，跨过本地零点后即使没有写入也会变化；APP_VERSION 区分不同版本的响应格式
+    """
+    raw = f"{scope}:{user_id}:{version}:{today.isoformat()}:{APP_VERSION}"
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """按弱比较判断 If-None-Match 是否包含当前ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def conditional_user_data(scope: str):
+    """
+    生成接口依赖：为响应设置ETag，If-None-Match 命中时返回304，否则返回当前数据版本（统计记录不存在时为None）。
+    只读取统计行的版本号（一次主键查询），汇总查询留给接口本身
+    """
+    async def dependency(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_active_user)
+    ) -> Optional[int]:
+        result = await db.execute(select(UserStats.data_version).where(UserStats.user_id == current_user.id))
+        version = result.scalar_one_or_none()
+        if version is None:
+            # 统计记录尚未建立，无法保证版本号覆盖所有写入，不返回ETag
+            return None
+
+        etag = weak_etag(scope, current_user.id, version, local_today())
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return version
+
+    return dependency
@@ -0,0 +1,92 @@
+# backend/app/services/idempotency.py
+"""
+写接口的幂等键（Idempotency-Key 请求头）
+首次请求在同一事务中预留键并保存响应，客户端超时重试时直接返回保存的响应而不再执行；
+并发的重复请求在预留时等待首个请求的事务结束（唯一键冲突），因此不会重复执行
+"""
+import json
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple, Optional
+from fastapi import Header, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.modules.study.models import IdempotencyKey
+from app.core.config import IDEMPOTENCY_KEY_TTL
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: Any
+
+
+def idempotency_key_header(idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64)) -> Optional[str]:
+    """读取可选的 Idempotency-Key 请求头"""
+    return idempotency_key or None
+
+
+def _request_hash(params: Any) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def reserve_key(db: Session, user_id: int, key: str, endpoint: str, params: Any) -> Optional[StoredResponse]:
+    """
+    预留幂等键，返回None表示首次请求，调用方执行后需调用 store_response 并在同一事务中提交；
+    已有保存的响应时返回该响应。同一个键用于参数不同的请求时返回422
+    """
+    now = datetime.utcnow()
+    request_hash = _request_hash(params)
+    insert = dialect_insert(db)
+    stmt = insert(IdempotencyKey).values(
+        user_id=user_id,
+        key=key,
+        endpoint=endpoint,
+        request_hash=request_hash,
+        created_at=now,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+    ).on_conflict_do_nothing(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key, IdempotencyKey.endpoint]
+    ).returning(IdempotencyKey.key)
+    if db.execute(stmt).first() is not None:
+        return None
+
+    record = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.endpoint == endpoint
+    ).populate_existing().first()
+    if record is None or record.expires_at <= now:
+        # 记录已过期（尚未清理）或刚被清理，按新请求处理
+        if record is not None:
+            db.delete(record)
+            db.flush()
+        return reserve_key(db, user_id, key, endpoint, params)
+    if record.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key 已用于参数不同的请求")
+    if record.status_code is None:
+        raise HTTPException(status_code=409, detail="相同 Idempotency-Key 的请求正在处理，请稍后重试")
+    return StoredResponse(record.status_code, record.response)
+
+
+def store_response(db: Session, user_id: int, key: str, endpoint: str, body: Any, status_code: int = 200) -> None:
+    """保存首次执行的响应（JSON可序列化），与业务写入在同一事务中提交"""
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.endpoint == endpoint
+    ).update({"status_code": status_code, "response": body}, synchronize_session=False)
+
+
+def replay_response(stored: StoredResponse) -> ORJSONResponse:
+    """返回保存的响应，并用响应头标明是重放结果"""
+    return ORJSONResponse(content=stored.body, status_code=stored.status_code, headers={REPLAYED_HEADER: "true"})
+
+
+def purge_expired(db: Session) -> int:
+    """删除过期的幂等键，返回删除数量，不提交事务"""
+    return db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at < datetime.utcnow()
+    ).delete(synchronize_session=False)
@@ -0,0 +1,94 @@
+# backend/app/services/statistics_cache.py
+"""
+统计结果缓存
+每个接口结果单独一个缓存项，键为 (用户, 数据版本, 本地日期, 接口路径和查询参数)：
+任务写入时数据版本随之更新，跨过本地零点时日期变化，旧的缓存项不会再被读到，随过期时间淘汰。
+Redis缓存的读写在线程池中执行，不阻塞事件循环。统计接口用 @cached_statistics 装饰
+"""
+import inspect
+import functools
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import Depends, Request
+from app.auth import CurrentUser, get_current_active_user
+from app.core.cache import create_cache
+from app.core.config import CACHE_REDIS_URL, STATISTICS_CACHE_SIZE, STATISTICS_CACHE_TTL
+from app.services.data_version import conditional_user_data
+from app.services.streaks import local_today
+
+# 统计接口共用的ETag依赖（同一请求内只执行一次），返回当前数据版本
+statistics_version = conditional_user_data("statistics")
+
+_cache = create_cache("statistics", maxsize=STATISTICS_CACHE_SIZE, ttl=STATISTICS_CACHE_TTL, redis_url=CACHE_REDIS_URL)
+_counters = {"hits": 0, "misses": 0}
+
+
+class CachedStatistics:
+    """单次请求对应的缓存项：get() 命中时返回缓存的结果，未命中时由接口计算后 set()"""
+
+    def __init__(self, user_id: int, version: Optional[int], today: date, endpoint: str):
+        self.version = version
+        self.key = f"{user_id}:{version}:{today.isoformat()}:{endpoint}"
+
+    async def get(self) -> Optional[Any]:
+        if self.version is None:
+            return None
+        result = await _cache.aget(self.key)
+        _counters["hits" if result is not None else "misses"] += 1
+        return result
+
+    async def set(self, result: Any) -> Any:
+        """保存结果并原样返回；统计记录尚未建立（没有版本号）时不缓存"""
+        if self.version is not None:
+            await _cache.aset(self.key, result)
+        return result
+
+
+async def statistics_cache(
+    request: Request,
+    version: Optional[int] = Depends(statistics_version),
+    current_user: CurrentUser = Depends(get_current_active_user)
+) -> CachedStatistics:
+    """
+    统计接口的缓存依赖，按 (用户, 数据版本, 本地日期, 接口路径和查询参数) 定位结果。
+    版本和日期在计算之前取得：计算期间发生的写入或跨零点只会让结果写入旧的缓存项，不会被读到
+    """
+    endpoint = request.url.path
+    if request.url.query:
+        endpoint = f"{endpoint}?{request.url.query}"
+    return CachedStatistics(current_user.id, version, local_today(), endpoint)
+
+
+def cached_statistics(endpoint: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    统计接口的装饰器：数据版本和日期未变化时直接返回缓存的结果，否则执行接口并缓存其返回值。
+    在接口签名中追加 statistics_cache 依赖，FastAPI 照常解析接口原有的参数
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, cached_result: CachedStatistics, **kwargs):
+        result = await cached_result.get()
+        if result is not None:
+            return result
+        return await cached_result.set(await endpoint(*args, **kwargs))
+
+    signature = inspect.signature(endpoint)
+    wrapper.__signature__ = signature.replace(parameters=[
+        *signature.parameters.values(),
+        inspect.Parameter(
+            "cached_result", inspect.Parameter.KEYWORD_ONLY,
+            default=Depends(statistics_cache), annotation=CachedStatistics
+        )
+    ])
+    return wrapper
+
+
+def statistics_cache_stats() -> Dict[str, Any]:
+    """缓存命中统计：backend 为底层缓存的统计，hits/misses 按接口结果计数"""
+    hits, misses = _counters["hits"], _counters["misses"]
+    total = hits + misses
+    return {
+        **_cache.stats(),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0
+    }
@@ -0,0 +1,102 @@
+# backend/app/services/statistics_summary.py
+"""
+仪表盘统计汇总
+用一条带条件聚合（FILTER）的SQL从每日汇总表计算今日/本周/本月/累计/完成率，连续天数来自带缓存的连续天数服务
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.modules.study.models import DailyRollup
+from app.services.streaks import get_streaks
+
+SUMMARY_SECTIONS = ("today", "week", "month", "lifetime", "completion", "streak")
+
+
+def _period_columns(prefix: str, condition=None) -> List[Any]:
+    """某个日期区间（condition=None 表示全部）内的任务数、学习分钟数、已完成任务数"""
+    columns = []
+    for name, column in (("tasks", DailyRollup.task_count), ("minutes", DailyRollup.total_minutes), ("completed", DailyRollup.completed_count)):
+        total = func.sum(column)
+        if condition is not None:
+            total = total.filter(condition)
+        columns.append(func.coalesce(total, 0).label(f"{prefix}_{name}"))
+    return columns
+
+
+def month_range(today: date):
+    """本月的第一天和最后一天"""
+    first_day = today.replace(day=1)
+    next_month = (first_day + timedelta(days=32)).replace(day=1)
+    return first_day, next_month - timedelta(days=1)
+
+
+def compute_summary(db: Session, user_id: int, today: date, sections: Iterable[str] = SUMMARY_SECTIONS) -> Dict[str, Any]:
+    """一次查询计算所请求的统计分区（连续天数命中缓存时不查询）"""
+    sections = set(sections)
+    start_of_week = today - timedelta(days=today.weekday())
+    end_of_week = start_of_week + timedelta(days=6)
+    first_day, last_day = month_range(today)
+
+    # 始终带一个聚合列，保证查询返回且只返回一行
+    columns = [func.count().label("study_days")]
+    if "today" in sections:
+        columns += _period_columns("today", DailyRollup.local_date == today)
+    if "week" in sections:
+        columns += _period_columns("week", DailyRollup.local_date.between(start_of_week, end_of_week))
+    if "month" in sections:
+        columns += _period_columns("month", DailyRollup.local_date.between(first_day, last_day))
+    if sections & {"lifetime", "completion"}:
+        columns += _period_columns("lifetime")
+
+    row = None
+    if sections - {"streak"}:
+        row = db.query(*columns).filter(DailyRollup.user_id == user_id).one()._mapping
+
+    summary = {}
+    if "today" in sections:
+        summary["today"] = {
+            "date": today.isoformat(),
+            "tasks": int(row["today_tasks"]),
+            "duration": int(row["today_minutes"]),
+            "completed_tasks": int(row["today_completed"])
+        }
+    if "week" in sections:
+        summary["week"] = {
+            "week_start": start_of_week.isoformat(),
+            "week_end": end_of_week.isoformat(),
+            "tasks": int(row["week_tasks"]),
+            "duration": int(row["week_minutes"]),
+            "completed_tasks": int(row["week_completed"])
+        }
+    if "month" in sections:
+        summary["month"] = {
+            "month_start": first_day.isoformat(),
+            "month_end": last_day.isoformat(),
+            "tasks": int(row["month_tasks"]),
+            "duration": int(row["month_minutes"]),
+            "completed_tasks": int(row["month_completed"])
+        }
+    if "lifetime" in sections:
+        total_minutes = int(row["lifetime_minutes"])
+        summary["lifetime"] = {
+            "total_tasks": int(row["lifetime_tasks"]),
+            "total_minutes": total_minutes,
+            "total_hours": round(total_minutes / 60, 1),
+            "study_days": int(row["study_days"])
+        }
+    if "completion" in sections:
+        total_tasks = int(row["lifetime_tasks"])
+        completed_tasks = int(row["lifetime_completed"])
+        summary["completion"] = {
+            "total_tasks": total_tasks,
+            "completed_tasks": completed_tasks,
+            "completion_rate": round(completed_tasks / total_tasks * 100, 1) if total_tasks > 0 else 0
+        }
+    if "streak" in sections:
+        streaks = get_streaks(db, user_id, today)
+        summary["streak"] = {
+            "current": streaks.current,
+            "longest": streaks.longest
+        }
+    return summary
@@ -0,0 +1,85 @@
+# backend/app/services/streaks.py
+"""
+连续学习天数服务
+用一条窗口函数查询（日期减行号分组，gaps-and-islands）在完整历史上计算当前/最长连续天数，
+结果按用户缓存，用户写入任务后失效
+"""
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+import pytz
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import TIMEZONE, STREAK_CACHE_SIZE, STREAK_CACHE_TTL
+from app.modules.study.models import DailyRollup
+from app.services.study_metrics import day_number
+
+
+class Streaks(NamedTuple):
+    """用户的连续学习天数"""
+    current: int                # 截止今天（今天没学习则截止昨天）的连续天数
+    longest: int                # 历史最长连续天数
+    last_run: int               # 以最近一个学习日结尾的连续天数
+    last_day: Optional[date]    # 最近一个学习日
+
+
+_cache = TTLCache(maxsize=STREAK_CACHE_SIZE, ttl=STREAK_CACHE_TTL)
+
+
+def local_today() -> date:
+    """配置时区下的今天"""
+    return datetime.now(pytz.timezone(TIMEZONE)).date()
+
+
+def compute_streaks(db: Session, user_id: int, today: date) -> Streaks:
+    """一次查询计算用户的连续学习天数"""
+    islands = db.query(
+        DailyRollup.local_date.label("day"),
+        (day_number(db, DailyRollup.local_date) - func.row_number().over(
+            order_by=DailyRollup.local_date
+        )).label("island")
+    ).filter(DailyRollup.user_id == user_id).subquery()
+
+    # 每段连续学习的长度、起止日期，以及截止今天的天数（不计未来日期）
+    runs = db.query(
+        func.count().label("length"),
+        func.count().filter(islands.c.day <= today).label("length_to_today"),
+        func.min(islands.c.day).label("first_day"),
+        func.max(islands.c.day).label("last_day")
+    ).group_by(islands.c.island).cte("runs")
+
+    last_day = db.query(func.max(runs.c.last_day)).scalar_subquery()
+    row = db.query(
+        func.coalesce(func.max(runs.c.length_to_today).filter(
+            runs.c.first_day <= today,
+            runs.c.last_day >= today - timedelta(days=1)
+        ), 0),
+        func.coalesce(func.max(runs.c.length), 0),
+        func.coalesce(func.max(runs.c.length).filter(runs.c.last_day == last_day), 0),
+        func.max(runs.c.last_day)
+    ).one()
+
+    current, longest, last_run, last_study_day = row
+    return Streaks(int(current), int(longest), int(last_run), last_study_day)
+
+
+def get_streaks(db: Session, user_id: int, today: Optional[date] = None) -> Streaks:
+    """读取用户的连续学习天数（优先使用缓存，跨天后自动重算）"""
+    today = today or local_today()
+    cached = _cache.get(user_id)
+    if cached is not None and cached[0] == today:
+        return cached[1]
+
+    streaks = compute_streaks(db, user_id, today)
+    _cache.set(user_id, (today, streaks))
+    return streaks
+
+
+def invalidate_streaks(user_id: int) -> None:
+    """用户任务数据变化后清除其缓存"""
+    _cache.delete(user_id)
+
+
+def streak_cache_stats():
+    """缓存命中统计"""
+    return _cache.stats()
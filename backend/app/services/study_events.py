@@ -0,0 +1,55 @@
+# backend/app/services/study_events.py
+"""
+学习数据写入事件
+任务/计划写入接口在flush之后调用这里，由这里统一更新所有派生数据（每日汇总、用户统计、数据版本）并失效相关缓存
+"""
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.services import daily_rollup, user_stats, streaks
+from app.services.study_metrics import TaskFacts
+from app.services.data_version import bump_data_version
+
+
+def _invalidate_task_caches(user_id: int) -> None:
+    """清除依赖用户任务数据的缓存（统计结果缓存按数据版本定位，不需要清除）"""
+    streaks.invalidate_streaks(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # 提交后再清除一次，避免并发请求在提交前把旧数据重新写入缓存
+    for user_id in session.info.pop("task_changed_users", ()):
+        _invalidate_task_caches(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop("task_changed_users", None)
+
+
+def record_task_change(db: Session, user_id: int, old: Optional[TaskFacts], new: Optional[TaskFacts]) -> None:
+    """任务创建（old=None）、更新或删除（new=None）后更新派生数据，不提交事务"""
+    record_task_changes(db, user_id, [(old, new)])
+
+
+def record_task_changes(db: Session, user_id: int, changes: Sequence[Tuple[Optional[TaskFacts], Optional[TaskFacts]]]) -> None:
+    """同一用户的一批任务改动 (old, new) 写入后更新派生数据，每种派生数据只更新一次，不提交事务"""
+    changes = [(old, new) for old, new in changes if old != new]
+    if not changes:
+        return
+    # 用户统计的日期字段从每日汇总重算，必须先更新每日汇总
+    daily_rollup.apply_task_changes(db, user_id, changes)
+    user_stats.apply_task_changes(db, user_id, changes)
+    bump_data_version(db, user_id)
+
+    _invalidate_task_caches(user_id)
+    db.info.setdefault("task_changed_users", set()).add(user_id)
+
+
+def record_plan_change(db: Session, user_id: int, old_completed: Optional[bool], new_completed: Optional[bool]) -> None:
+    """计划创建（old_completed=None）、更新或删除（new_completed=None）后更新派生数据，不提交事务"""
+    if old_completed == new_completed:
+        return
+    user_stats.apply_plan_change(db, user_id, old_completed, new_completed)
+    bump_data_version(db, user_id)
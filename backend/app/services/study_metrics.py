@@ -0,0 +1,129 @@
+# backend/app/services/study_metrics.py
+"""
+学习统计指标的集合式SQL计算
+按 user_id 分组一次性计算多个用户的成就指标，供批量任务使用，不把任务行加载到内存
+"""
+from datetime import date, time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from sqlalchemy import Date, Integer, cast, func, literal
+from sqlalchemy.orm import Session
+from app.modules.study.models import Task, Plan, DailyRollup
+
+# 成就判断所用的时间边界
+NIGHT_START = time(22, 0)   # 晚上10点后算夜间任务
+EARLY_END = time(6, 0)      # 早上6点前算早起任务
+LONG_TASK_MINUTES = 25      # 25分钟及以上算长任务
+
+TASK_COUNTERS = ("total_tasks", "total_minutes", "long_tasks", "night_tasks", "early_tasks", "weekend_tasks")
+PLAN_COUNTERS = ("total_plans", "completed_plans")
+
+
+class TaskFacts(NamedTuple):
+    """任务中影响统计的字段快照"""
+    start: Any
+    duration: Optional[int]
+    completed: Optional[bool] = None
+
+    @classmethod
+    def of(cls, task: Task) -> "TaskFacts":
+        return cls(start=task.start, duration=task.duration, completed=task.completed)
+
+
+def task_date():
+    """任务开始时间对应的日期表达式"""
+    return func.date(Task.start, type_=Date)
+
+
+def day_number(db: Session, date_expr):
+    """把日期表达式转换为连续的整数天数，用于 gaps-and-islands 分组"""
+    if db.get_bind().dialect.name == "sqlite":
+        return cast(func.julianday(date_expr), Integer)
+    return date_expr - literal(date(2000, 1, 1), Date)
+
+
+def task_counter_columns() -> List[Any]:
+    """任务计数类指标的聚合列（与 TASK_COUNTERS 顺序一致）"""
+    minute_of_day = func.extract("hour", Task.start) * 60 + func.extract("minute", Task.start)
+    weekday = func.extract("dow", Task.start)  # 0=Sunday, 6=Saturday
+    return [
+        func.count(Task.id).label("total_tasks"),
+        func.coalesce(func.sum(Task.duration), 0).label("total_minutes"),
+        func.count(Task.id).filter(Task.duration >= LONG_TASK_MINUTES).label("long_tasks"),
+        func.count(Task.id).filter(minute_of_day >= NIGHT_START.hour * 60 + NIGHT_START.minute).label("night_tasks"),
+        func.count(Task.id).filter(minute_of_day < EARLY_END.hour * 60 + EARLY_END.minute).label("early_tasks"),
+        func.count(Task.id).filter(weekday.in_([0, 6])).label("weekend_tasks"),
+    ]
+
+
+def plan_counter_columns() -> List[Any]:
+    """计划计数类指标的聚合列（与 PLAN_COUNTERS 顺序一致）"""
+    return [
+        func.count(Plan.id).label("total_plans"),
+        func.count(Plan.id).filter(Plan.completed == True).label("completed_plans"),
+    ]
+
+
+def _daily_metrics(db: Session, user_ids: Sequence[int]) -> Dict[int, Dict[str, int]]:
+    """按用户计算单日最大任务数和最长连续学习天数（基于每日汇总表）"""
+    days = db.query(
+        DailyRollup.user_id.label("user_id"),
+        DailyRollup.local_date.label("day"),
+        DailyRollup.task_count.label("tasks")
+    ).filter(DailyRollup.user_id.in_(user_ids)).subquery()
+
+    # 连续日期减去行号后相同的属于同一段连续学习（gaps-and-islands）
+    islands = db.query(
+        days.c.user_id,
+        days.c.tasks,
+        (day_number(db, days.c.day) - func.row_number().over(
+            partition_by=days.c.user_id, order_by=days.c.day
+        )).label("island")
+    ).subquery()
+
+    streaks = db.query(
+        islands.c.user_id,
+        func.count().label("streak"),
+        func.max(islands.c.tasks).label("max_tasks")
+    ).group_by(islands.c.user_id, islands.c.island).subquery()
+
+    rows = db.query(
+        streaks.c.user_id,
+        func.max(streaks.c.max_tasks),
+        func.max(streaks.c.streak)
+    ).group_by(streaks.c.user_id)
+
+    return {
+        user_id: {"max_daily_tasks": int(max_tasks or 0), "streak_days": int(streak or 0)}
+        for user_id, max_tasks, streak in rows
+    }
+
+
+def compute_user_metrics(db: Session, user_ids: Sequence[int]) -> Dict[int, Dict[str, int]]:
+    """
+    用几条按 user_id 分组的聚合查询计算一批用户的成就指标
+
+    返回 user_id -> 指标字典（键与 user_stats.stats_to_dict 一致，不含 unlocked_achievements）
+    """
+    metrics = {
+        user_id: dict.fromkeys(TASK_COUNTERS + PLAN_COUNTERS + ("max_daily_tasks", "streak_days"), 0)
+        for user_id in user_ids
+    }
+    if not metrics:
+        return metrics
+
+    task_rows = db.query(Task.user_id, *task_counter_columns()).filter(
+        Task.user_id.in_(user_ids)
+    ).group_by(Task.user_id)
+    for user_id, *values in task_rows:
+        metrics[user_id].update(zip(TASK_COUNTERS, (int(value or 0) for value in values)))
+
+    plan_rows = db.query(Plan.user_id, *plan_counter_columns()).filter(
+        Plan.user_id.in_(user_ids)
+    ).group_by(Plan.user_id)
+    for user_id, *values in plan_rows:
+        metrics[user_id].update(zip(PLAN_COUNTERS, (int(value or 0) for value in values)))
+
+    for user_id, daily in _daily_metrics(db, user_ids).items():
+        metrics[user_id].update(daily)
+
+    return metrics
@@ -0,0 +1,86 @@
+# backend/app/services/task_ingest.py
+"""
+任务批量写入
+离线同步的客户端一次提交多个已完成任务：逐条校验后用一条 INSERT ... ON CONFLICT DO NOTHING 写入，
+已存在的幂等键视为重复提交，派生数据（每日汇总、用户统计）整批只更新一次
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.modules.study.models import Task
+from app.schemas.task import TaskBulkItem
+from app.services.study_events import record_task_changes
+from app.services.study_metrics import TaskFacts
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+
+def _validate(item: TaskBulkItem) -> Optional[str]:
+    """与单个创建任务接口相同的业务校验，返回错误信息"""
+    if not item.completed:
+        return "只能创建已完成的任务"
+    if not item.end:
+        return "已完成的任务必须有结束时间"
+    return None
+
+
+def ingest_tasks(db: Session, user_id: int, items: Sequence[TaskBulkItem]) -> Dict[str, Any]:
+    """批量写入任务并返回逐条结果，不提交事务"""
+    results: List[Dict[str, Any]] = []
+    pending: Dict[str, TaskBulkItem] = {}
+    for item in items:
+        error = _validate(item)
+        if error:
+            results.append({"client_key": item.client_key, "status": INVALID, "error": error})
+        elif item.client_key in pending:
+            # 同一批中重复的幂等键以第一条为准
+            results.append({"client_key": item.client_key, "status": DUPLICATE})
+        else:
+            pending[item.client_key] = item
+            results.append({"client_key": item.client_key, "status": CREATED})
+
+    created_ids: Dict[str, int] = {}
+    if pending:
+        insert = dialect_insert(db)
+        stmt = insert(Task).values([
+            {
+                "name": item.name,
+                "duration": item.duration,
+                "start": item.start,
+                "end": item.end,
+                "completed": True,
+                "user_id": user_id,
+                "client_key": client_key
+            }
+            for client_key, item in pending.items()
+        ]).on_conflict_do_nothing(index_elements=[Task.user_id, Task.client_key]).returning(Task.client_key, Task.id)
+        created_ids = dict(db.execute(stmt).all())
+
+    # 未插入的幂等键此前已同步过，返回已有任务的ID
+    task_ids = dict(created_ids)
+    missing = [client_key for client_key in pending if client_key not in created_ids]
+    if missing:
+        task_ids.update(
+            db.query(Task.client_key, Task.id).filter(Task.user_id == user_id, Task.client_key.in_(missing)).all()
+        )
+
+    for result in results:
+        if result["status"] == INVALID:
+            continue
+        if result["status"] == CREATED and result["client_key"] not in created_ids:
+            result["status"] = DUPLICATE
+        result["id"] = task_ids.get(result["client_key"])
+
+    created = [pending[result["client_key"]] for result in results if result["status"] == CREATED]
+    record_task_changes(db, user_id, [
+        (None, TaskFacts(start=item.start, duration=item.duration, completed=True)) for item in created
+    ])
+
+    return {
+        "created": len(created),
+        "duplicates": sum(1 for result in results if result["status"] == DUPLICATE),
+        "invalid": sum(1 for result in results if result["status"] == INVALID),
+        "results": results
+    }
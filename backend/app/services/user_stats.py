@@ -0,0 +1,212 @@
+# backend/app/services/user_stats.py
+"""
+用户统计汇总服务
+在任务/计划写入时增量维护 study_user_stats，成就接口只读取这一行而不再扫描历史记录
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.modules.study.models import Task, Plan, UserStats, DailyRollup
+from app.services.study_metrics import (
+    NIGHT_START, EARLY_END, LONG_TASK_MINUTES, TASK_COUNTERS, PLAN_COUNTERS,
+    TaskFacts, task_counter_columns, plan_counter_columns
+)
+from app.services.streaks import compute_streaks, local_today
+from app.services.data_version import new_data_version
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = (
+    "total_tasks", "total_minutes", "long_tasks", "night_tasks", "early_tasks", "weekend_tasks",
+    "max_daily_tasks", "longest_streak", "current_streak", "last_day_tasks",
+    "total_plans", "completed_plans",
+)
+
+
+def _insert_stats(db: Session, user_id: int) -> bool:
+    """插入计数全为0的统计行（并发安全），返回是否由本事务插入；已存在时不做改动"""
+    insert = dialect_insert(db)
+    stmt = insert(UserStats).values(
+        user_id=user_id,
+        last_study_date=None,
+        data_version=new_data_version(),
+        **{field: 0 for field in COUNTER_FIELDS}
+    ).on_conflict_do_nothing(index_elements=[UserStats.user_id])
+    return db.execute(stmt).rowcount == 1
+
+
+def _lock_stats(db: Session, user_id: int) -> UserStats:
+    """对已存在的统计行加锁并读取最新的值"""
+    return db.query(UserStats).filter(UserStats.user_id == user_id).with_for_update().populate_existing().one()
+
+
+def _refresh_daily_fields(db: Session, stats: UserStats) -> None:
+    """重新计算依赖日期分布的字段（单日最大任务数、连续天数），需先更新每日汇总"""
+    db.flush()
+    streaks = compute_streaks(db, stats.user_id, local_today())
+    max_daily, last_day_tasks = db.query(
+        func.max(DailyRollup.task_count),
+        func.max(DailyRollup.task_count).filter(DailyRollup.local_date == streaks.last_day)
+    ).filter(DailyRollup.user_id == stats.user_id).one()
+
+    stats.max_daily_tasks = int(max_daily or 0)
+    stats.longest_streak = streaks.longest
+    stats.current_streak = streaks.last_run
+    stats.last_study_date = streaks.last_day
+    stats.last_day_tasks = int(last_day_tasks or 0)
+
+
+def rebuild_user_stats(db: Session, user_id: int) -> UserStats:
+    """从历史记录完整重建用户统计（用于回填和数据修复）"""
+    # 先确保统计行存在再加锁：行不存在时 FOR UPDATE 锁不住任何行，并发的首次写入会重复插入
+    _insert_stats(db, user_id)
+    stats = _lock_stats(db, user_id)
+    stats.data_version = max(stats.data_version + 1, new_data_version())
+
+    totals = db.query(*task_counter_columns()).filter(Task.user_id == user_id).one()
+    for field, value in zip(TASK_COUNTERS, totals):
+        setattr(stats, field, int(value or 0))
+
+    plan_totals = db.query(*plan_counter_columns()).filter(Plan.user_id == user_id).one()
+    for field, value in zip(PLAN_COUNTERS, plan_totals):
+        setattr(stats, field, int(value or 0))
+
+    _refresh_daily_fields(db, stats)
+    return stats
+
+
+def _load_stats(db: Session, user_id: int, for_update: bool = False) -> Tuple[UserStats, bool]:
+    """加载用户统计记录，返回（记录, 是否刚从历史记录重建）"""
+    query = db.query(UserStats).filter(UserStats.user_id == user_id)
+    if for_update:
+        query = query.with_for_update()
+    stats = query.first()
+    if stats is not None:
+        return stats, False
+    if not _insert_stats(db, user_id):
+        # 并发的请求刚建立了统计记录（插入会等待其提交），直接读取
+        return _lock_stats(db, user_id), False
+
+    logger.info(f"用户 {user_id} 没有统计记录，正在从历史记录重建")
+    return rebuild_user_stats(db, user_id), True
+
+
+def get_user_stats_record(db: Session, user_id: int) -> Tuple[UserStats, bool]:
+    """获取用户统计记录，不存在时从历史记录重建一次；返回（记录, 是否刚重建），重建后需由调用方提交"""
+    return _load_stats(db, user_id)
+
+
+def _add_task(stats: UserStats, facts: TaskFacts, sign: int) -> None:
+    """累加（sign=1）或扣减（sign=-1）单个任务对计数字段的贡献"""
+    duration = facts.duration or 0
+    stats.total_tasks += sign
+    stats.total_minutes += sign * duration
+    if duration >= LONG_TASK_MINUTES:
+        stats.long_tasks += sign
+
+    if facts.start is None:
+        return
+    start_time = facts.start.time()
+    if start_time >= NIGHT_START:
+        stats.night_tasks += sign
+    if start_time < EARLY_END:
+        stats.early_tasks += sign
+    if facts.start.weekday() >= 5:  # 5=Saturday, 6=Sunday
+        stats.weekend_tasks += sign
+
+
+def _append_day(stats: UserStats, day: date) -> bool:
+    """新任务落在最近学习日或之后时以O(1)更新日期字段，否则返回False表示需要重算"""
+    last = stats.last_study_date
+    if last is None or day > last:
+        stats.current_streak = stats.current_streak + 1 if last is not None and day - last == timedelta(days=1) else 1
+        stats.last_study_date = day
+        stats.last_day_tasks = 1
+    elif day == last:
+        stats.last_day_tasks += 1
+    else:
+        return False
+
+    stats.max_daily_tasks = max(stats.max_daily_tasks, stats.last_day_tasks)
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    return True
+
+
+def apply_task_change(db: Session, user_id: int, old: Optional[TaskFacts], new: Optional[TaskFacts]) -> None:
+    """
+    在任务创建（old=None）、更新或删除（new=None）后增量更新统计，需在任务改动flush之后调用
+
+    常规路径（新增当天或之后的任务）为O(1)；删除任务或写入更早日期的任务会影响
+    单日最大值和连续天数，此时按日期重新汇总一次。
+    """
+    apply_task_changes(db, user_id, [(old, new)])
+
+
+def apply_task_changes(db: Session, user_id: int, changes: Sequence[Tuple[Optional[TaskFacts], Optional[TaskFacts]]]) -> None:
+    """批量应用同一用户的多个任务改动 (old, new)，统计行只加锁、更新一次，日期字段最多重算一次"""
+    # 只有开始时间和时长影响这里的统计
+    changes = [
+        (old, new) for old, new in changes
+        if old is None or new is None or (old.start, old.duration) != (new.start, new.duration)
+    ]
+    if not changes:
+        return
+
+    stats, rebuilt = _load_stats(db, user_id, for_update=True)
+    if rebuilt:
+        # 重建时已包含本次改动
+        return
+
+    needs_daily_refresh = False
+    for old, _ in changes:
+        if old is not None:
+            _add_task(stats, old, -1)
+            needs_daily_refresh = needs_daily_refresh or old.start is not None
+    # 新任务按开始时间顺序追加，离线同步的一批任务通常都在最近学习日之后
+    added = sorted((new for _, new in changes if new is not None), key=lambda facts: facts.start or datetime.min)
+    for new in added:
+        _add_task(stats, new, 1)
+        if new.start is not None and not needs_daily_refresh:
+            needs_daily_refresh = not _append_day(stats, new.start.date())
+
+    if needs_daily_refresh:
+        _refresh_daily_fields(db, stats)
+
+
+def apply_plan_change(db: Session, user_id: int, old_completed: Optional[bool], new_completed: Optional[bool]) -> None:
+    """
+    在计划创建（old_completed=None）、更新或删除（new_completed=None）后增量更新统计，需在计划改动flush之后调用
+    """
+    if old_completed == new_completed:
+        return
+
+    stats, rebuilt = _load_stats(db, user_id, for_update=True)
+    if rebuilt:
+        return
+    if old_completed is not None:
+        stats.total_plans -= 1
+        stats.completed_plans -= 1 if old_completed else 0
+    if new_completed is not None:
+        stats.total_plans += 1
+        stats.completed_plans += 1 if new_completed else 0
+
+
+def stats_to_dict(stats: UserStats, unlocked_achievements: int = 0) -> Dict[str, Any]:
+    """转换为成就条件使用的统计字典"""
+    return {
+        "total_tasks": stats.total_tasks,
+        "total_minutes": stats.total_minutes,
+        "night_tasks": stats.night_tasks,
+        "early_tasks": stats.early_tasks,
+        "streak_days": stats.longest_streak,
+        "total_plans": stats.total_plans,
+        "completed_plans": stats.completed_plans,
+        "long_tasks": stats.long_tasks,
+        "weekend_tasks": stats.weekend_tasks,
+        "max_daily_tasks": stats.max_daily_tasks,
+        "unlocked_achievements": unlocked_achievements
+    }
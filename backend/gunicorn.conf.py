@@ -0,0 +1,26 @@
+# backend/gunicorn.conf.py
+"""
+gunicorn配置
+启动方式: gunicorn -c gunicorn.conf.py app.main:app
+"""
+import os
+import shutil
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))  # 与连接池推导使用同一个变量（见 app/core/config.py）
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    """启动前清空多进程指标目录，避免沿用上次运行残留的指标文件"""
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """工作进程退出后清理其进行中请求数等实时指标"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+任务列表序列化基准测试脚本
+用内存中的任务对象（不访问数据库）对比每1000个任务的序列化耗时：
+原实现（逐行构造字典 + jsonable_encoder + json）、响应模型 + orjson、共用序列化器（pydantic-core直接输出JSON）
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.modules.common.models import User  # noqa: F401  注册 Task.user 关系引用的模型
+from app.modules.study.models import Task
+from app.schemas.task import task_list_serializer
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def make_tasks(count):
+    """生成未保存的任务对象"""
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    return [
+        Task(
+            id=i + 1,
+            name=f"task {i}",
+            duration=25 + i % 30,
+            start=base + timedelta(minutes=40 * i),
+            end=base + timedelta(minutes=40 * i + 25, seconds=i % 60, microseconds=i),
+            completed=True,
+            user_id=1
+        )
+        for i in range(count)
+    ]
+
+def legacy_dicts(tasks):
+    """原实现：逐行构造字典并调用 isoformat，返回值再经 jsonable_encoder 和标准库json编码"""
+    result_tasks = []
+    for task in tasks:
+        result_tasks.append({
+            "id": task.id,
+            "name": task.name,
+            "duration": task.duration,
+            "user_id": task.user_id,
+            "start": task.start.isoformat() if task.start else None,
+            "end": task.end.isoformat() if task.end else None,
+            "completed": task.completed
+        })
+    return JSONResponse(content=jsonable_encoder(result_tasks)).body
+
+def response_model_orjson(tasks):
+    """返回ORM对象由FastAPI按响应模型校验（from_attributes），再用orjson编码"""
+    adapter = task_list_serializer.adapter
+    content = adapter.dump_python(adapter.validate_python(tasks, from_attributes=True), mode="json")
+    return ORJSONResponse(content=content).body
+
+def shared_serializer(tasks):
+    """共用序列化器：pydantic-core直接把ORM对象编码为JSON字节"""
+    return task_list_serializer.dump(tasks)
+
+def benchmark(count=1000, repeat=200):
+    """执行基准测试，输出每种方式每1000个任务的平均耗时"""
+    tasks = make_tasks(count)
+    methods = {
+        "原实现 (dict + json)": legacy_dicts,
+        "响应模型 + orjson": response_model_orjson,
+        "共用序列化器": shared_serializer,
+    }
+
+    # 确认三种方式输出的内容一致
+    expected = json.loads(legacy_dicts(tasks))
+    for name, method in methods.items():
+        if json.loads(method(tasks)) != expected:
+            logger.error(f"{name} 的输出与原实现不一致")
+            return False
+
+    timings = {}
+    for name, method in methods.items():
+        method(tasks)  # 预热
+        started = time.perf_counter()
+        for _ in range(repeat):
+            method(tasks)
+        timings[name] = (time.perf_counter() - started) * 1000 / repeat * 1000 / count
+
+    baseline = timings["原实现 (dict + json)"]
+    logger.info(f"每1000个任务的平均序列化耗时（{count} 个任务，重复 {repeat} 次）:")
+    for name, elapsed in timings.items():
+        logger.info(f"  {name}: {elapsed:.2f} ms ({baseline / elapsed:.1f}x)")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="任务列表序列化基准测试工具")
+    parser.add_argument("--count", type=int, default=1000, help="任务数量")
+    parser.add_argument("--repeat", type=int, default=200, help="重复次数")
+
+    args = parser.parse_args()
+
+    if not benchmark(count=args.count, repeat=args.repeat):
+        sys.exit(1)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+任务/计划索引基准测试脚本
+在独立的schema中生成测试数据，分别在无索引和添加复合索引后执行常用查询（包括偏移分页和游标分页的深分页），
+输出 EXPLAIN 执行计划和耗时对比（仅支持PostgreSQL，不会修改业务表）
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import date, datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+# 导入数据库配置
+from app.database import engine
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SCHEMA = "bench_indexes"
+
+# 与迁移 add_keyset_pagination_indexes 保持一致
+INDEXES = [
+    "CREATE INDEX ix_study_tasks_user_start_id ON study_tasks (user_id, start DESC NULLS LAST, id DESC) INCLUDE (duration)",
+    "CREATE INDEX ix_study_plans_user_created_id ON study_plans (user_id, created_at DESC NULLS LAST, id DESC)",
+]
+
+# 与接口中实际使用的查询保持一致（:user_id、:day、:deep_offset、:cursor_start 由脚本填充）
+QUERIES = {
+    "任务列表 (read_tasks)": """
+        SELECT * FROM study_tasks WHERE user_id = :user_id
+        ORDER BY start DESC NULLS LAST, id DESC LIMIT 101
+    """,
+    "任务列表深分页 (skip)": """
+        SELECT * FROM study_tasks WHERE user_id = :user_id
+        ORDER BY start DESC NULLS LAST, id DESC OFFSET :deep_offset LIMIT 101
+    """,
+    "任务列表深分页 (cursor)": """
+        SELECT * FROM study_tasks WHERE user_id = :user_id
+          AND ((start, id) < (:cursor_start, 2147483647) OR start IS NULL)
+        ORDER BY start DESC NULLS LAST, id DESC LIMIT 101
+    """,
+    "今日任务 (get_today_tasks)": """
+        SELECT * FROM study_tasks WHERE user_id = :user_id
+          AND start >= :day AND start < :day + interval '1 day'
+        ORDER BY start DESC
+    """,
+    "月度时长汇总": """
+        SELECT count(*), coalesce(sum(duration), 0) FROM study_tasks
+        WHERE user_id = :user_id AND start >= :day - interval '30 days' AND start < :day + interval '1 day'
+    """,
+    "计划列表 (read_plans)": """
+        SELECT * FROM study_plans WHERE user_id = :user_id
+        ORDER BY created_at DESC NULLS LAST, id DESC LIMIT 101
+    """,
+}
+
+def seed(conn, users, tasks_per_user, plans_per_user, days):
+    """在基准schema中创建无索引的表并生成测试数据"""
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"SET search_path TO {SCHEMA}"))
+    conn.execute(text("""
+        CREATE TABLE study_tasks (
+            id serial PRIMARY KEY, name varchar, duration integer, start timestamp,
+            "end" timestamp, completed boolean, user_id integer
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE study_plans (
+            id serial PRIMARY KEY, user_id integer, text varchar, completed boolean,
+            started boolean, created_at timestamp, start_time timestamp, end_time timestamp
+        )
+    """))
+
+    logger.info(f"生成测试数据: {users} 个用户，每人 {tasks_per_user} 个任务、{plans_per_user} 个计划")
+    conn.execute(text("""
+        INSERT INTO study_tasks (name, duration, start, "end", completed, user_id)
+        SELECT 'task ' || n, 10 + (n % 50), ts, ts + interval '25 minutes', true, u
+        FROM generate_series(1, :users) AS u,
+             generate_series(1, :per_user) AS n,
+             LATERAL (SELECT now()::timestamp - (random() * :days) * interval '1 day' AS ts) AS t
+    """), {"users": users, "per_user": tasks_per_user, "days": days})
+    conn.execute(text("""
+        INSERT INTO study_plans (user_id, text, completed, started, created_at)
+        SELECT u, 'plan ' || n, n % 2 = 0, true, now()::timestamp - (random() * :days) * interval '1 day'
+        FROM generate_series(1, :users) AS u, generate_series(1, :per_user) AS n
+    """), {"users": users, "per_user": plans_per_user, "days": days})
+    vacuum(conn)
+
+def vacuum(conn):
+    """更新统计信息和可见性映射（仅索引扫描依赖可见性映射）"""
+    conn.execute(text("VACUUM ANALYZE study_tasks"))
+    conn.execute(text("VACUUM ANALYZE study_plans"))
+
+def run_queries(conn, label, params, repeat):
+    """输出每个查询的执行计划，并返回平均耗时（毫秒）"""
+    timings = {}
+    for name, sql in QUERIES.items():
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars().all()
+        logger.info(f"[{label}] {name} 执行计划:\n    " + "\n    ".join(plan))
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(text(sql), params).fetchall()
+        timings[name] = (time.perf_counter() - started) * 1000 / repeat
+    return timings
+
+def benchmark(users=1000, tasks_per_user=500, plans_per_user=50, days=365, repeat=50, keep=False):
+    """执行基准测试并输出索引前后的耗时对比"""
+    if engine.dialect.name != "postgresql":
+        logger.error("基准测试仅支持PostgreSQL")
+        return False
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            seed(conn, users, tasks_per_user, plans_per_user, days)
+            # 深分页取该用户约80%处的位置，偏移分页和游标分页读取同一页
+            params = {
+                "user_id": users // 2,
+                "day": date.today() - timedelta(days=1),
+                "deep_offset": tasks_per_user * 4 // 5,
+                "cursor_start": datetime.now() - timedelta(days=days * 0.8)
+            }
+
+            before = run_queries(conn, "无索引", params, repeat)
+
+            logger.info("创建复合索引")
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            vacuum(conn)
+
+            after = run_queries(conn, "复合索引", params, repeat)
+
+            logger.info("耗时对比（平均每次查询）:")
+            for name in QUERIES:
+                speedup = before[name] / after[name] if after[name] > 0 else 0
+                logger.info(f"  {name}: {before[name]:.2f} ms -> {after[name]:.2f} ms ({speedup:.1f}x)")
+            return True
+
+        except Exception as e:
+            logger.error(f"基准测试出错: {str(e)}")
+            return False
+
+        finally:
+            if not keep:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="任务/计划索引基准测试工具")
+    parser.add_argument("--users", type=int, default=1000, help="生成的用户数")
+    parser.add_argument("--tasks-per-user", type=int, default=500, help="每个用户的任务数")
+    parser.add_argument("--plans-per-user", type=int, default=50, help="每个用户的计划数")
+    parser.add_argument("--days", type=int, default=365, help="任务时间分布的天数")
+    parser.add_argument("--repeat", type=int, default=50, help="每个查询重复执行的次数")
+    parser.add_argument("--keep", action="store_true", help=f"保留 {SCHEMA} schema 及测试数据")
+
+    args = parser.parse_args()
+
+    benchmark(
+        users=args.users,
+        tasks_per_user=args.tasks_per_user,
+        plans_per_user=args.plans_per_user,
+        days=args.days,
+        repeat=args.repeat,
+        keep=args.keep
+    )
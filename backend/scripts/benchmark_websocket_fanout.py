@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+WebSocket广播基准测试脚本
+用模拟客户端（不建立真实连接）对比两种广播方式下正常客户端收到消息的延迟：
+原实现（逐个 await send）与按连接排队的扇出（app.core.fanout）。
+模拟客户端中可以混入接收很慢的客户端和完全不接收的客户端
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import statistics
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.fanout import FanOut
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger("app.core.fanout").setLevel(logging.ERROR)
+
+class SimulatedClient:
+    """模拟的WebSocket：记录每条消息的到达时间；delay 为每条消息的发送耗时，stuck 表示发送永远不完成"""
+
+    def __init__(self, delay=0.0, stuck=False):
+        self.delay = delay
+        self.stuck = stuck
+        self.arrivals = []
+        self.close_code = None
+
+    async def send_text(self, text):
+        if self.stuck:
+            await asyncio.Event().wait()
+        # 正常客户端也让出一次事件循环，与真实的socket写入相同
+        await asyncio.sleep(self.delay)
+        self.arrivals.append(time.perf_counter())
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+def make_clients(count, slow, stuck, slow_delay):
+    clients = [SimulatedClient(slow_delay) for _ in range(slow)]
+    clients += [SimulatedClient(stuck=True) for _ in range(stuck)]
+    clients += [SimulatedClient() for _ in range(count - slow - stuck)]
+    return clients
+
+def make_message(seq):
+    return json.dumps({"type": "task_update", "action": "started", "task": {"id": seq, "name": "benchmark", "duration": 25},
+                       "sender_id": 0, "timestamp": int(time.time())}, separators=(",", ":"))
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def report(name, clients, sent_at, call_times):
+    """按正常客户端统计从开始广播到收到消息的延迟（毫秒）"""
+    fast = [client for client in clients if not client.delay and not client.stuck]
+    latencies = [
+        (arrival - sent_at[seq]) * 1000
+        for client in fast
+        for seq, arrival in enumerate(client.arrivals)
+    ]
+    missing = sum(len(sent_at) - len(client.arrivals) for client in fast)
+    logger.info(
+        f"{name}: 广播调用 中位数 {statistics.median(call_times) * 1000:.2f}ms / 最大 {max(call_times) * 1000:.2f}ms，"
+        f"正常客户端延迟 p50 {percentile(latencies, 50):.2f}ms / p99 {percentile(latencies, 99):.2f}ms / "
+        f"最大 {max(latencies, default=0):.2f}ms，未收到 {missing} 条"
+    )
+    return latencies
+
+async def run_serial(clients, messages, interval):
+    """原实现：每条消息依次 await 每个客户端的发送"""
+    sent_at, call_times = [], []
+    for seq in range(messages):
+        text = make_message(seq)
+        sent_at.append(time.perf_counter())
+        for client in clients:
+            await client.send_text(text)
+        call_times.append(time.perf_counter() - sent_at[-1])
+        await asyncio.sleep(interval)
+    return sent_at, call_times
+
+async def run_fanout(clients, messages, interval, queue_size, policy):
+    """扇出：消息只序列化一次并放入各连接的队列，由每个连接的写任务发送"""
+    fanout = FanOut(maxsize=queue_size, policy=policy)
+    connections = [fanout.add(index, client) for index, client in enumerate(clients)]
+    max_depth = 0
+    sent_at, call_times = [], []
+    for seq in range(messages):
+        text = make_message(seq)
+        sent_at.append(time.perf_counter())
+        fanout.broadcast(text)
+        call_times.append(time.perf_counter() - sent_at[-1])
+        await asyncio.sleep(interval)
+        max_depth = max(max_depth, max(connection.depth for connection in connections))
+    # 等待正常客户端的队列发送完
+    await asyncio.sleep(max(interval, 0.2))
+    stats = fanout.stats()
+    for connection in connections:
+        await fanout.remove(connection)
+    return sent_at, call_times, stats, max_depth
+
+async def benchmark(clients_count, slow, stuck, slow_delay, messages, serial_messages, interval, queue_size, policy):
+    logger.info(f"模拟 {clients_count} 个客户端，其中 {slow} 个每条消息耗时 {slow_delay * 1000:.0f}ms，{stuck} 个不接收")
+
+    # 原实现遇到不接收的客户端会一直阻塞，只对比慢客户端
+    clients = make_clients(clients_count, slow, 0, slow_delay)
+    sent_at, call_times = await run_serial(clients, serial_messages, interval)
+    report(f"逐个发送（{serial_messages} 条消息，不含不接收的客户端）", clients, sent_at, call_times)
+
+    clients = make_clients(clients_count, slow, stuck, slow_delay)
+    sent_at, call_times, stats, max_depth = await run_fanout(clients, messages, interval, queue_size, policy)
+    report(f"按连接排队（{messages} 条消息）", clients, sent_at, call_times)
+    disconnected = sum(1 for client in clients if client.close_code is not None)
+    logger.info(
+        f"队列长度 {queue_size}，策略 {policy}：最大队列深度 {max_depth}，丢弃 {stats['dropped']} 条，"
+        f"断开 {disconnected} 个客户端"
+    )
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WebSocket广播基准测试工具")
+    parser.add_argument("--clients", type=int, default=5000, help="模拟客户端数")
+    parser.add_argument("--slow", type=int, default=50, help="接收很慢的客户端数")
+    parser.add_argument("--stuck", type=int, default=10, help="完全不接收的客户端数（只用于扇出）")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="慢客户端每条消息的发送秒数")
+    parser.add_argument("--messages", type=int, default=300, help="扇出广播的消息数（超过队列长度时不接收的客户端会溢出）")
+    parser.add_argument("--serial-messages", type=int, default=5, help="逐个发送的消息数（每条都要等待所有慢客户端）")
+    parser.add_argument("--interval", type=float, default=0.05, help="两次广播之间的秒数")
+    parser.add_argument("--queue-size", type=int, default=256, help="每个连接的发送队列长度")
+    parser.add_argument("--policy", choices=["disconnect", "drop"], default="disconnect", help="队列满时的处理方式")
+
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(
+        args.clients, args.slow, args.stuck, args.slow_delay, args.messages, args.serial_messages,
+        args.interval, args.queue_size, args.policy
+    ))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+接口查询预算检查脚本
+依次请求各GET接口，读取响应头 X-DB-Queries / X-DB-Time，与每个接口的查询预算比较，
+用于发现退化为循环查询（N+1）的接口。服务端需开启 SQL_PROFILING=true
+"""
+
+import sys
+import logging
+
+import requests
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 每个接口允许的最大查询数（认证用户已缓存时），新增或修改接口后同步调整
+QUERY_BUDGETS = {
+    "/api/study/tasks/": 2,
+    "/api/study/tasks/today": 2,
+    "/api/study/plans/": 2,
+    "/api/study/achievements/": 10,
+    "/api/study/achievements/definitions": 0,
+    "/api/study/statistics/": 3,
+    "/api/study/statistics/summary": 3,
+    "/api/study/statistics/total": 2,
+    "/api/study/statistics/daily": 2,
+    "/api/study/statistics/weekly": 2,
+    "/api/study/statistics/monthly": 2,
+    "/api/study/statistics/heatmap": 2,
+    "/api/study/statistics/time-distribution": 2,
+    "/api/study/statistics/user": 2,
+    "/api/users/me": 1,
+    "/api/auth/me": 1
+}
+
+def check_query_budgets(base_url, username, password):
+    """检查所有接口的查询次数，全部在预算内返回True"""
+    response = requests.post(f"{base_url}/api/auth/login", data={"username": username, "password": password})
+    if response.status_code != 200:
+        logger.error(f"登录失败，请检查账号: {response.status_code} {response.text}")
+        return False
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    # 预热认证缓存，避免第一个接口多计一次用户查询
+    session.get(f"{base_url}/api/users/me")
+
+    passed = True
+    for path, budget in QUERY_BUDGETS.items():
+        response = session.get(f"{base_url}{path}")
+        queries = response.headers.get("X-DB-Queries")
+        if queries is None:
+            logger.error("响应缺少 X-DB-Queries 头，请在服务端设置 SQL_PROFILING=true")
+            return False
+        if response.status_code != 200:
+            logger.error(f"{path}: 请求失败 {response.status_code}")
+            passed = False
+        elif int(queries) > budget:
+            logger.error(f"{path}: {queries} 条查询, {response.headers.get('X-DB-Time')} ms，超出预算 {budget}")
+            passed = False
+        else:
+            logger.info(f"{path}: {queries} 条查询, {response.headers.get('X-DB-Time')} ms (预算 {budget})")
+
+    if passed:
+        logger.info("所有接口均在查询预算内")
+    return passed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="接口查询预算检查工具")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="服务地址")
+    parser.add_argument("--username", required=True, help="检查使用的账号")
+    parser.add_argument("--password", required=True, help="检查使用的密码")
+
+    args = parser.parse_args()
+
+    if not check_query_budgets(args.base_url.rstrip("/"), args.username, args.password):
+        sys.exit(1)
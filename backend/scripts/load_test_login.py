@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+登录压测脚本
+对运行中的服务并发发起登录请求，同时持续请求其他接口，对比两类请求的延迟分位数，
+用于确认bcrypt不再阻塞事件循环（登录高峰时其他接口的p99应基本不变）
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def percentile(values, p):
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+def summarize(name, latencies, errors, elapsed):
+    """输出一类请求的吞吐量和延迟分位数（毫秒）"""
+    ms = [latency * 1000 for latency in latencies]
+    logger.info(
+        f"{name}: {len(ms)} 次成功, {errors} 次失败, {len(ms) / elapsed:.1f} 次/秒, "
+        f"p50 {percentile(ms, 50):.1f} ms, p95 {percentile(ms, 95):.1f} ms, "
+        f"p99 {percentile(ms, 99):.1f} ms, max {max(ms, default=0):.1f} ms"
+    )
+
+def worker(stop, request, latencies, errors, lock):
+    """循环发送请求直到 stop 被设置"""
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            ok = request(session)
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+
+def run_phase(requests_by_name, duration):
+    """并发运行若干类请求 duration 秒，返回每类的 (延迟列表, 失败数)"""
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {name: ([], [0]) for name in requests_by_name}
+    total_workers = sum(concurrency for _, concurrency in requests_by_name.values())
+
+    with ThreadPoolExecutor(max_workers=total_workers) as executor:
+        for name, (request, concurrency) in requests_by_name.items():
+            latencies, errors = results[name]
+            for _ in range(concurrency):
+                executor.submit(worker, stop, request, latencies, errors, lock)
+        time.sleep(duration)
+        stop.set()
+
+    return {name: (latencies, errors[0]) for name, (latencies, errors) in results.items()}
+
+def load_test(base_url, username, password, login_concurrency=20, probe_concurrency=5, duration=30):
+    """先单独压测探测接口作为基线，再与并发登录同时运行"""
+    login_url = f"{base_url}/api/auth/login"
+    response = requests.post(login_url, data={"username": username, "password": password})
+    if response.status_code != 200:
+        logger.error(f"登录失败，请检查账号: {response.status_code} {response.text}")
+        return False
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def login(session):
+        return session.post(login_url, data={"username": username, "password": password}).status_code == 200
+
+    def probe(session):
+        return session.get(f"{base_url}/api/study/statistics/summary", headers=headers).status_code == 200
+
+    logger.info(f"阶段1: 仅探测接口，并发 {probe_concurrency}，持续 {duration} 秒")
+    baseline = run_phase({"探测接口": (probe, probe_concurrency)}, duration)
+    summarize("探测接口（基线）", *baseline["探测接口"], duration)
+
+    logger.info(f"阶段2: 登录并发 {login_concurrency} + 探测接口并发 {probe_concurrency}，持续 {duration} 秒")
+    mixed = run_phase({"登录": (login, login_concurrency), "探测接口": (probe, probe_concurrency)}, duration)
+    summarize("登录", *mixed["登录"], duration)
+    summarize("探测接口（登录高峰）", *mixed["探测接口"], duration)
+
+    # 线程池指标只对管理员开放
+    response = requests.get(f"{base_url}/api/admin/metrics", headers=headers)
+    if response.status_code == 200:
+        logger.info(f"密码哈希线程池: {response.json().get('password_hashing')}")
+    else:
+        logger.info(f"无法读取密码哈希线程池指标（{response.status_code}），需要使用管理员账号")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="登录压测工具")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="服务地址")
+    parser.add_argument("--username", required=True, help="压测使用的账号")
+    parser.add_argument("--password", required=True, help="压测使用的密码")
+    parser.add_argument("--login-concurrency", type=int, default=20, help="并发登录数")
+    parser.add_argument("--probe-concurrency", type=int, default=5, help="并发请求其他接口的数量")
+    parser.add_argument("--duration", type=int, default=30, help="每个阶段持续的秒数")
+
+    args = parser.parse_args()
+
+    load_test(
+        args.base_url.rstrip("/"),
+        args.username,
+        args.password,
+        login_concurrency=args.login_concurrency,
+        probe_concurrency=args.probe_concurrency,
+        duration=args.duration
+    )
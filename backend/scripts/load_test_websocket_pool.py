@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+WebSocket连接池压测脚本
+用很小的数据库连接池（默认 DATABASE_POOL_SIZE=2、DATABASE_MAX_OVERFLOW=0）启动WebSocket服务，分批建立并保持大量连接，
+每批之后读取服务的 /stats，确认数据库连接只在认证和读取资料时短暂占用：使用中的连接数不随WebSocket连接数增长，
+也没有获取连接超时
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import subprocess
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import websockets
+
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.modules.common.models import User
+from app.modules.study.models import Task  # noqa: F401  注册 User 关系引用的模型
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SERVICE_DIR = Path(__file__).resolve().parents[2] / "scripts"
+
+def start_service(port, pool_size, max_overflow):
+    """用指定的连接池大小启动单个WebSocket服务进程"""
+    env = dict(os.environ, DATABASE_POOL_SIZE=str(pool_size), DATABASE_MAX_OVERFLOW=str(max_overflow))
+    env.pop("WS_BACKPLANE_URL", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "websocket_service:app", "--app-dir", str(SERVICE_DIR),
+         "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def fetch_pool(base_url):
+    """服务异步引擎连接池的统计（WebSocket服务只使用异步引擎）"""
+    return requests.get(f"{base_url}/stats", timeout=5).json()["database_pools"].get("async", {})
+
+async def open_client(url, token, timeout):
+    """连接、认证并等待在线用户快照，之后在后台持续读取消息（避免服务端发送队列溢出）"""
+    client = await websockets.connect(url, open_timeout=timeout, max_queue=None)
+    await client.send(json.dumps({"type": "authenticate", "token": token}))
+    message = json.loads(await asyncio.wait_for(client.recv(), timeout))
+    if message.get("action") != "online_users_updated":
+        await client.close()
+        raise RuntimeError(f"认证后收到意外的消息: {message}")
+
+    async def drain():
+        try:
+            async for _ in client:
+                pass
+        except websockets.ConnectionClosed:
+            pass
+
+    return client, asyncio.create_task(drain())
+
+async def sample_pool(base_url, peak, stop):
+    """连接过程中持续采样使用中的连接数，记录峰值"""
+    while not stop.is_set():
+        try:
+            pool = await asyncio.to_thread(fetch_pool, base_url)
+            peak[0] = max(peak[0], pool.get("in_use", 0))
+        except requests.RequestException:
+            pass
+        await asyncio.sleep(0.05)
+
+async def run_load(port, tokens, connections, batch, timeout, pool_limit):
+    url = f"ws://127.0.0.1:{port}/ws"
+    base_url = f"http://127.0.0.1:{port}"
+    clients, failures = [], 0
+    peak, stop = [0], asyncio.Event()
+    sampler = asyncio.create_task(sample_pool(base_url, peak, stop))
+    passed = True
+
+    try:
+        for start in range(0, connections, batch):
+            count = min(batch, connections - start)
+            results = await asyncio.gather(
+                *(open_client(url, tokens[(start + index) % len(tokens)], timeout) for index in range(count)),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    failures += 1
+                else:
+                    clients.append(result)
+            pool = await asyncio.to_thread(fetch_pool, base_url)
+            logger.info(
+                f"WebSocket连接 {len(clients)} 个（失败 {failures}），数据库连接使用中 {pool.get('in_use')}，"
+                f"峰值 {peak[0]}，池中空闲 {pool.get('checked_in')}，累计获取 {pool.get('checkouts')} 次，"
+                f"获取超时 {pool.get('checkout_timeouts')} 次"
+            )
+    finally:
+        stop.set()
+        await sampler
+
+    pool = await asyncio.to_thread(fetch_pool, base_url)
+    if failures:
+        logger.error(f"{failures} 个WebSocket连接没有完成认证")
+        passed = False
+    if peak[0] > pool_limit or pool.get("checkout_timeouts"):
+        logger.error(f"数据库连接使用峰值 {peak[0]}（上限 {pool_limit}），获取超时 {pool.get('checkout_timeouts')} 次")
+        passed = False
+    if pool.get("in_use"):
+        logger.error(f"保持 {len(clients)} 个WebSocket连接时仍有 {pool.get('in_use')} 个数据库连接未归还")
+        passed = False
+
+    for client, reader in clients:
+        await client.close()
+        reader.cancel()
+    return passed
+
+def load_test(usernames, connections, batch, port, pool_size, max_overflow, timeout):
+    """启动服务、执行压测，结束后停止服务"""
+    db = SessionLocal()
+    try:
+        query = db.query(User.username).filter(User.is_active == True)
+        if usernames:
+            query = query.filter(User.username.in_(usernames))
+        names = [row.username for row in query.order_by(User.id).limit(connections)]
+    finally:
+        db.close()
+    if not names:
+        logger.error("没有可用的已激活用户，请用 --users 指定")
+        return False
+    # 用户数少于连接数时轮流使用（同一用户的新连接替换旧连接，旧连接仍保持打开）
+    tokens = [create_access_token({"sub": name}) for name in names]
+
+    process = start_service(port, pool_size, max_overflow)
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                fetch_pool(f"http://127.0.0.1:{port}")
+                break
+            except requests.RequestException:
+                if time.time() > deadline or process.poll() is not None:
+                    logger.error(f"端口 {port} 上的WebSocket服务没有启动")
+                    return False
+                time.sleep(0.2)
+        logger.info(f"WebSocket服务已启动，数据库连接池 {pool_size} + {max_overflow}，{len(names)} 个测试用户")
+        passed = asyncio.run(run_load(port, tokens, connections, batch, timeout, pool_size + max_overflow))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    if passed:
+        logger.info(f"压测通过: 保持 {connections} 个WebSocket连接时数据库连接使用量没有随连接数增长")
+    else:
+        logger.error("压测失败")
+    return passed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WebSocket连接池压测工具")
+    parser.add_argument("--connections", type=int, default=2000, help="保持的WebSocket连接数")
+    parser.add_argument("--batch", type=int, default=200, help="每批同时建立的连接数")
+    parser.add_argument("--users", default="", help="逗号分隔的测试用户名，默认取已激活的用户")
+    parser.add_argument("--port", type=int, default=8112, help="WebSocket服务端口")
+    parser.add_argument("--pool-size", type=int, default=2, help="服务的数据库连接池大小（DATABASE_POOL_SIZE）")
+    parser.add_argument("--max-overflow", type=int, default=0, help="服务的连接池溢出连接数（DATABASE_MAX_OVERFLOW）")
+    parser.add_argument("--timeout", type=float, default=30, help="每个连接完成认证的最长秒数")
+
+    args = parser.parse_args()
+
+    usernames = [name.strip() for name in args.users.split(",") if name.strip()]
+    if not load_test(usernames, args.connections, args.batch, args.port, args.pool_size, args.max_overflow, args.timeout):
+        sys.exit(1)
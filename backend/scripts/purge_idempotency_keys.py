@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+过期幂等键清理脚本
+API进程默认每隔 IDEMPOTENCY_PURGE_INTERVAL 秒自动清理；设置为0关闭应用内清理时，用此脚本配合cron定期执行
+"""
+
+import os
+import sys
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 导入数据库配置
+from app.database import SessionLocal
+from app.modules.common.models import User  # noqa: F401  注册模型关系引用的用户表
+from app.services.idempotency import purge_expired
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def purge():
+    """删除所有过期的幂等键"""
+    db = SessionLocal()
+    try:
+        deleted = purge_expired(db)
+        db.commit()
+        logger.info(f"已清理 {deleted} 个过期的幂等键")
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.error(f"清理过期幂等键失败: {str(e)}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if not purge():
+        sys.exit(1)
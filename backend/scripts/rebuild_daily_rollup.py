@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+每日汇总重建脚本
+从历史任务记录回填 study_daily_rollup 表，用于上线每日汇总或修复汇总数据
+用户统计的日期字段依赖每日汇总，需在 rebuild_user_stats.py 之前运行
+"""
+
+import os
+import sys
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 导入数据库配置和模型
+from app.database import SessionLocal
+from app.modules.common.models import User
+from app.services.daily_rollup import rebuild_daily_rollup
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def rebuild(user_ids=None, chunk_size=500):
+    """按用户分块重建指定用户（默认全部用户）的每日汇总"""
+    db = SessionLocal()
+    try:
+        if user_ids is None:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+
+        logger.info(f"开始重建 {len(user_ids)} 个用户的每日汇总")
+        total_rows = 0
+        for offset in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[offset:offset + chunk_size]
+            total_rows += rebuild_daily_rollup(db, chunk)
+            db.commit()
+            logger.info(f"已重建 {offset + len(chunk)}/{len(user_ids)} 个用户，共 {total_rows} 条每日汇总")
+
+        logger.info("每日汇总重建完成!")
+        return True
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"重建每日汇总时出错: {str(e)}")
+        return False
+
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="每日汇总重建工具")
+    parser.add_argument("--all", action="store_true", help="重建所有用户的每日汇总")
+    parser.add_argument("--user-id", type=int, action="append", help="重建指定用户的每日汇总（可重复）")
+    parser.add_argument("--chunk-size", type=int, default=500, help="每批处理并提交的用户数")
+
+    args = parser.parse_args()
+
+    if args.all:
+        rebuild(chunk_size=args.chunk_size)
+    elif args.user_id:
+        rebuild(args.user_id, chunk_size=args.chunk_size)
+    else:
+        parser.print_help()
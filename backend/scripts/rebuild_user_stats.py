@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+用户统计重建脚本
+从历史任务和计划记录回填 study_user_stats 表，用于上线增量统计或修复统计数据
+"""
+
+import os
+import sys
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 导入数据库配置和模型
+from app.database import SessionLocal
+from app.modules.common.models import User
+from app.services.user_stats import rebuild_user_stats
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def rebuild(user_ids=None, batch_size=200):
+    """重建指定用户（默认全部用户）的统计记录"""
+    db = SessionLocal()
+    try:
+        if user_ids is None:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+
+        logger.info(f"开始重建 {len(user_ids)} 个用户的统计记录")
+        for index, user_id in enumerate(user_ids, start=1):
+            rebuild_user_stats(db, user_id)
+            if index % batch_size == 0:
+                db.commit()
+                logger.info(f"已重建 {index}/{len(user_ids)} 个用户")
+        db.commit()
+
+        logger.info("用户统计记录重建完成!")
+        return True
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"重建用户统计记录时出错: {str(e)}")
+        return False
+
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="用户统计重建工具")
+    parser.add_argument("--all", action="store_true", help="重建所有用户的统计记录")
+    parser.add_argument("--user-id", type=int, action="append", help="重建指定用户的统计记录（可重复）")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批提交的用户数")
+
+    args = parser.parse_args()
+
+    if args.all:
+        rebuild(batch_size=args.batch_size)
+    elif args.user_id:
+        rebuild(args.user_id, batch_size=args.batch_size)
+    else:
+        parser.print_help()
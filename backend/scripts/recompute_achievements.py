@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+成就批量重算脚本
+修改 ACHIEVEMENTS 阈值后，为所有用户重新计算成就等级并批量写入解锁/回收
+按用户ID分块执行集合式聚合查询，不把任务行加载到内存
+"""
+
+import os
+import sys
+import time
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 导入数据库配置和模型
+from app.database import SessionLocal
+from app.modules.common.models import User
+from app.modules.study.models import Achievement
+from app.services.achievements import ACHIEVEMENT_RULES, diff_achievements, apply_achievement_diff
+from app.services.study_metrics import compute_user_metrics
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def iter_user_id_chunks(db, chunk_size):
+    """按用户ID顺序分块返回用户ID列表（键集分页）"""
+    last_id = 0
+    while True:
+        chunk = [
+            user_id for (user_id,) in
+            db.query(User.id).filter(User.id > last_id).order_by(User.id).limit(chunk_size)
+        ]
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+def recompute_chunk(db, user_ids, dry_run=False):
+    """重算一批用户的成就，返回 (解锁/等级变化数, 回收数)"""
+    metrics = compute_user_metrics(db, user_ids)
+
+    # 已存储的成就等级
+    stored = {user_id: {} for user_id in user_ids}
+    for user_id, achievement_type, level in db.query(
+        Achievement.user_id, Achievement.type, Achievement.level
+    ).filter(Achievement.user_id.in_(user_ids)):
+        stored[user_id][achievement_type] = max(level, stored[user_id].get(achievement_type, 0))
+
+    upserts = []
+    deletes = []
+    for user_id in user_ids:
+        user_stats = metrics[user_id]
+        # 与成就接口一致：按重算前已解锁的成就种类计数
+        user_stats["unlocked_achievements"] = len({
+            achievement_type.split('_')[1] if '_' in achievement_type else achievement_type
+            for achievement_type in stored[user_id]
+        })
+        user_upserts, user_deletes = diff_achievements(
+            user_id, ACHIEVEMENT_RULES.evaluate(user_stats), stored[user_id]
+        )
+        upserts.extend(user_upserts)
+        deletes.extend(user_deletes)
+
+    if not dry_run and (upserts or deletes):
+        apply_achievement_diff(db, upserts, deletes)
+        db.commit()
+    else:
+        db.rollback()
+
+    return len(upserts), len(deletes)
+
+def recompute(chunk_size=1000, dry_run=False):
+    """为所有用户重算成就"""
+    db = SessionLocal()
+    try:
+        total_users = db.query(User.id).count()
+        logger.info(f"开始重算 {total_users} 个用户的成就{'（试运行，不写入数据库）' if dry_run else ''}")
+
+        started = time.monotonic()
+        processed = total_upserts = total_deletes = 0
+        for user_ids in iter_user_id_chunks(db, chunk_size):
+            upserts, deletes = recompute_chunk(db, user_ids, dry_run)
+            processed += len(user_ids)
+            total_upserts += upserts
+            total_deletes += deletes
+
+            elapsed = time.monotonic() - started
+            rate = processed / elapsed if elapsed > 0 else 0
+            remaining = (total_users - processed) / rate if rate > 0 else 0
+            logger.info(
+                f"进度 {processed}/{total_users} ({processed * 100 // max(total_users, 1)}%)，"
+                f"解锁/变更 {total_upserts}，回收 {total_deletes}，"
+                f"{rate:.0f} 用户/秒，预计剩余 {remaining:.0f} 秒"
+            )
+
+        logger.info(
+            f"成就重算完成: {processed} 个用户，解锁/变更 {total_upserts} 条，回收 {total_deletes} 条"
+            f"{'（试运行，未写入）' if dry_run else ''}"
+        )
+        return True
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"重算成就时出错: {str(e)}")
+        return False
+
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="成就批量重算工具")
+    parser.add_argument("--run", action="store_true", help="重算所有用户的成就并写入数据库")
+    parser.add_argument("--dry-run", action="store_true", help="只计算并报告变化，不写入数据库")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每批处理的用户数")
+
+    args = parser.parse_args()
+
+    if args.run or args.dry_run:
+        recompute(chunk_size=args.chunk_size, dry_run=args.dry_run)
+    else:
+        parser.print_help()
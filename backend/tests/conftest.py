@@ -0,0 +1,58 @@
+# backend/tests/conftest.py
+"""
+测试夹具
+在临时SQLite数据库上导入应用（导入时按 DATABASE_URL 创建引擎和数据表），用 TestClient 请求接口
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# 必须在导入应用之前设置；不连接Redis和WebSocket服务
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='study-tests-'), 'test.db')}"
+os.environ["CACHE_REDIS_URL"] = ""
+os.environ["WS_BACKPLANE_URL"] = ""
+os.environ["WS_SERVICE_URL"] = ""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.auth import get_password_hash
+from app.database import SessionLocal
+from app.modules.common.models import User
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    """已登录的测试用户（带有几天的任务和一个计划），认证缓存已预热"""
+    db = SessionLocal()
+    try:
+        db.add(User(username="tester", password=get_password_hash("tester123"), is_active=True, email_verified=True))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/api/auth/login", data={"username": "tester", "password": "tester123"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    now = datetime.now().replace(microsecond=0)
+    for days in range(3):
+        start = now - timedelta(days=days, hours=1)
+        response = client.post("/api/study/tasks/", headers=headers, json={
+            "name": f"task {days}", "duration": 30, "completed": True,
+            "start": start.isoformat(), "end": (start + timedelta(minutes=30)).isoformat()
+        })
+        assert response.status_code == 200, response.text
+    response = client.post("/api/study/plans/", headers=headers, json={"text": "plan", "completed": False})
+    assert response.status_code == 200, response.text
+
+    client.get("/api/users/me", headers=headers)
+    return headers
@@ -0,0 +1,19 @@
+# backend/tests/test_query_budgets.py
+"""各GET接口的查询次数不超过 scripts/check_query_budgets.py 中的预算（防止退化为 N+1）"""
+import pytest
+
+from app.core.db_metrics import QueryBudgetExceeded, query_budget
+from scripts.check_query_budgets import QUERY_BUDGETS
+
+
+@pytest.mark.parametrize("path, budget", QUERY_BUDGETS.items())
+def test_endpoint_within_query_budget(client, auth_headers, path, budget):
+    with query_budget(budget, f"GET {path}"):
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+
+def test_query_budget_exceeded(client, auth_headers):
+    with pytest.raises(QueryBudgetExceeded, match="GET /api/study/statistics/user"):
+        with query_budget(0, "GET /api/study/statistics/user"):
+            client.get("/api/study/statistics/user", headers=auth_headers)
@@ -0,0 +1,38 @@
+# backend/tests/test_task_times.py
+"""带时区偏移的任务时间按 TIMEZONE 本地时间保存和读取"""
+from datetime import datetime, timedelta, timezone
+
+import pytz
+
+from app.core.config import TIMEZONE
+
+
+def test_utc_start_stored_as_local_time(client, auth_headers):
+    # 与前端 toISOString() 的格式一致（UTC，以 Z 结尾）
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - timedelta(seconds=30)
+    response = client.post("/api/study/tasks/", headers=auth_headers, json={
+        "name": "utc task", "duration": 1, "completed": True,
+        "start": start.strftime("%Y-%m-%dT%H:%M:%S.000Z"), "end": end.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    })
+    assert response.status_code == 200, response.text
+    task = response.json()
+
+    local_start = start.astimezone(pytz.timezone(TIMEZONE)).replace(tzinfo=None)
+    assert datetime.fromisoformat(task["start"]) == local_start
+
+    stored = next(item for item in client.get("/api/study/tasks/", headers=auth_headers).json() if item["id"] == task["id"])
+    assert datetime.fromisoformat(stored["start"]) == local_start
+
+    today = client.get("/api/study/tasks/today", headers=auth_headers).json()
+    assert task["id"] in [item["id"] for item in today]
+
+
+def test_naive_start_kept_as_local_time(client, auth_headers):
+    start = datetime.now(pytz.timezone(TIMEZONE)).replace(tzinfo=None, microsecond=0) - timedelta(seconds=30)
+    response = client.post("/api/study/tasks/", headers=auth_headers, json={
+        "name": "local task", "duration": 1, "completed": True,
+        "start": start.isoformat(), "end": (start + timedelta(seconds=30)).isoformat()
+    })
+    assert response.status_code == 200, response.text
+    assert datetime.fromisoformat(response.json()["start"]) == start
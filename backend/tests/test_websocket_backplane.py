@@ -0,0 +1,219 @@
+# backend/tests/test_websocket_backplane.py
+"""
+WebSocket多节点集成测试
+启动两个WebSocket服务进程（scripts/websocket_service.py），共享同一个Redis后端，把测试用户分别连接到不同进程，检查：
+1. 每个客户端看到的在线用户列表（快照加上之后的增量）包含两个进程上的用户
+2. 一个进程上的用户发送的 task_update 会被另一个进程上的用户收到
+3. 用户断开后另一个进程上的客户端收到 user_left 增量
+默认在进程内启动 fakeredis 的TCP服务代替Redis；设置 WS_TEST_REDIS_URL 时使用该地址（如 redis://localhost:6379/15）
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+import subprocess
+from pathlib import Path
+
+import pytest
+
+websockets = pytest.importorskip("websockets")
+pytest.importorskip("redis")
+
+from app.auth import create_access_token, get_password_hash
+from app.database import SessionLocal
+from app.modules.common.models import User
+
+SERVICE_DIR = Path(__file__).resolve().parents[2] / "scripts"
+TIMEOUT = 10
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline and process.poll() is None:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    url = os.environ.get("WS_TEST_REDIS_URL")
+    if url:
+        yield url
+        return
+
+    fakeredis = pytest.importorskip("fakeredis")
+    port = free_port()
+    server = fakeredis.TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{port}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def nodes(redis_url):
+    """两个共享同一后端的WebSocket服务进程，返回它们的端口"""
+    env = dict(os.environ, WS_BACKPLANE_URL=redis_url, WS_BACKPLANE_PREFIX=f"ws-test-{os.getpid()}")
+    processes = []
+    try:
+        for _ in range(2):
+            port = free_port()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "websocket_service:app", "--app-dir", str(SERVICE_DIR),
+                 "--port", str(port), "--workers", "1", "--log-level", "warning"],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            processes.append((process, port))
+            assert wait_for_port(port, process), f"端口 {port} 上的WebSocket服务没有启动"
+        yield [port for _, port in processes]
+    finally:
+        for process, _ in processes:
+            process.terminate()
+        for process, _ in processes:
+            process.wait(timeout=10)
+
+
+@pytest.fixture(scope="module")
+def ws_users():
+    """每个测试使用不同的用户，避免上一个测试中正在关闭的连接影响在线列表"""
+    db = SessionLocal()
+    try:
+        users = [
+            User(username=f"ws-user-{index}", password=get_password_hash("ws-user"), is_active=True, email_verified=True)
+            for index in range(7)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [(user.id, user.username) for user in users]
+    finally:
+        db.close()
+
+
+async def connect(port: int, username: str):
+    """连接并发送认证消息"""
+    client = await websockets.connect(f"ws://127.0.0.1:{port}/ws")
+    await client.send(json.dumps({"type": "authenticate", "token": create_access_token({"sub": username})}))
+    return client
+
+
+async def wait_for(client, predicate):
+    """读取消息直到 predicate 返回True，超时或连接关闭时返回None"""
+    try:
+        async with asyncio.timeout(TIMEOUT):
+            while True:
+                message = json.loads(await client.recv())
+                if predicate(message):
+                    return message
+    except (TimeoutError, websockets.ConnectionClosed):
+        return None
+
+
+class PresenceView:
+    """
+    按客户端的规则应用在线用户快照和增量。不同进程同时分配的版本号可能乱序到达（客户端此时重新获取快照），
+    测试中其他用户的连接同时在断开，因此不检查版本号是否连续
+    """
+
+    def __init__(self):
+        self.users = set()
+        self.version = None
+
+    def apply(self, message):
+        action = message.get("action")
+        if action == "online_users_updated":
+            self.users = {user["id"] for user in message["users"]}
+            self.version = message["version"]
+        elif action in ("user_joined", "user_left", "user_updated") and self.version is not None and "version" in message:
+            if message["version"] <= self.version:
+                return
+            self.version = message["version"]
+            if action == "user_left":
+                self.users.discard(message["user_id"])
+            elif action == "user_joined" or not message["user"]["privacyMode"]:
+                self.users.add(message["user"]["id"])
+
+    def tracking(self, predicate):
+        """读取消息时先更新在线列表再判断 predicate"""
+        def check(message):
+            self.apply(message)
+            return predicate(message)
+        return check
+
+
+def test_online_users_shared_across_nodes(nodes, ws_users):
+    users = ws_users[0:3]
+
+    async def run():
+        # 用户轮流连接到两个进程
+        clients = [await connect(nodes[index % 2], username) for index, (_, username) in enumerate(users)]
+        expected = {user_id for user_id, _ in users}
+        try:
+            for client in clients:
+                view = PresenceView()
+                assert await wait_for(client, view.tracking(lambda message: expected <= view.users)) is not None
+        finally:
+            for client in clients:
+                await client.close()
+
+    asyncio.run(run())
+
+
+def test_task_update_forwarded_to_other_node(nodes, ws_users):
+    (sender_id, sender), (_, receiver) = ws_users[3:5]
+
+    async def run():
+        sender_client = await connect(nodes[0], sender)
+        receiver_client = await connect(nodes[1], receiver)
+        try:
+            # 接收方看到发送方在线后，两个进程都已订阅后端
+            view = PresenceView()
+            assert await wait_for(receiver_client, view.tracking(lambda message: sender_id in view.users)) is not None
+
+            task = {"id": int(time.time()), "name": "backplane test", "duration": 25}
+            await sender_client.send(json.dumps({"type": "task_update", "action": "started", "task": task}))
+            message = await wait_for(
+                receiver_client,
+                lambda message: message.get("type") == "task_update" and message.get("sender_id") == sender_id
+            )
+            assert message is not None
+            assert message["task"]["id"] == task["id"]
+        finally:
+            await sender_client.close()
+            await receiver_client.close()
+
+    asyncio.run(run())
+
+
+def test_disconnect_removes_user_on_other_node(nodes, ws_users):
+    (_, watcher), (leaving_id, leaving) = ws_users[5:7]
+
+    async def run():
+        watcher_client = await connect(nodes[0], watcher)
+        leaving_client = await connect(nodes[1], leaving)
+        try:
+            view = PresenceView()
+            assert await wait_for(watcher_client, view.tracking(lambda message: leaving_id in view.users)) is not None
+
+            await leaving_client.close()
+            message = await wait_for(
+                watcher_client, lambda message: message.get("action") == "user_left" and message["user_id"] == leaving_id
+            )
+            assert message is not None
+        finally:
+            await watcher_client.close()
+
+    asyncio.run(run())
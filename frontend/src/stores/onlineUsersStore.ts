@@ -5,7 +5,7 @@
  * 功能包括：
  * 1. 建立和维护WebSocket连接
  * 2. 用户认证和会话管理
- * 3. 在线用户列表的实时更新
+ * 3. 在线用户列表的实时更新（连接时收到完整快照，之后按版本号应用增量）
  * 4. 心跳机制保持连接活跃
  * 5. 自动重连和错误处理
  *
@@ -84,8 +84,8 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
   const reconnectTimeout = ref<number | null>(null);
   /** 最大重连延迟时间（毫秒） */
   const maxReconnectDelay = 3000; // 最大重连间隔3秒
-  /** 同步间隔计时器 */
-  const syncInterval = ref<number | null>(null);
+  /** 在线用户列表的版本号，null 表示正在等待快照 */
+  const presenceVersion = ref<number | null>(null);
   /** 是否正在重连中 */
   const isReconnecting = ref(false);
   /** 隐私模式状态 */
@@ -155,8 +155,8 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
       isConnected.value = true;
       isLoading.value = false;
 
-      // 请求在线用户列表
-      sendMessage({ type: 'get_online_users' });
+      // 复用连接时请求在线用户快照
+      requestSnapshot();
       return;
     }
 
@@ -246,13 +246,8 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
             sendMessage({ type: 'privacy_mode', enabled: true });
           }
 
-          // 请求在线用户列表
-            console.log('请求在线用户列表');
-          sendMessage({ type: 'get_online_users' });
-
-          // 启动心跳和同步
+          // 启动心跳（在线用户快照由服务器在认证后发送）
           startHeartbeat();
-          startSyncInterval();
 
           // 通知连接成功
           eventBus.emit(EVENT_NAMES.WS_CONNECTED);
@@ -268,11 +263,6 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
             // 处理消息
             handleMessage(message);
 
-            // 使用Event Bus广播消息
-            if (message.action === 'online_users_updated') {
-              eventBus.emit(EVENT_NAMES.ONLINE_USERS_UPDATED, message.users);
-            }
-
             // 广播所有WebSocket消息
             eventBus.emit(EVENT_NAMES.WS_MESSAGE, message);
           } catch (err) {
@@ -356,6 +346,7 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
 
     isConnected.value = false;
     users.value = [];
+    presenceVersion.value = null;
   }
 
   // 发送消息
@@ -375,12 +366,27 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
       
       // 更新用户列表
       users.value = message.users
+      presenceVersion.value = message.version ?? null
       
       // 通知其他组件用户列表已更新
       eventBus.emit(EVENT_NAMES.ONLINE_USERS_UPDATED, message.users)
       return
     }
 
+    // 处理在线用户增量消息
+    if (['user_joined', 'user_left', 'user_updated'].includes(message.action)) {
+      applyPresenceDelta(message)
+      return
+    }
+
+    // 服务器要求重新同步（如其他节点异常退出）
+    if (message.action === 'presence_resync') {
+      if (presenceVersion.value === null || message.version > presenceVersion.value) {
+        requestSnapshot()
+      }
+      return
+    }
+
     // 处理错误消息
     if (message.type === 'error') {
       error.value = message.message
@@ -413,6 +419,54 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
     }
   }
 
+  /**
+   * 应用在线用户增量
+   *
+   * 版本号不大于当前版本的增量已包含在快照中，直接忽略；
+   * 版本号不连续说明漏掉了增量，重新请求快照。
+   * 不带版本号的 user_updated 只发给本人（隐私模式下修改资料），直接应用
+   */
+  function applyPresenceDelta(message: any) {
+    if (message.version === undefined || message.version === null) {
+      if (message.action === 'user_updated') {
+        upsertUser(message.user)
+      }
+      return
+    }
+    if (presenceVersion.value === null || message.version <= presenceVersion.value) {
+      return
+    }
+    if (message.version !== presenceVersion.value + 1) {
+      console.warn('在线用户版本号不连续，重新获取快照:', presenceVersion.value, message.version)
+      requestSnapshot()
+      return
+    }
+    presenceVersion.value = message.version
+
+    if (message.action === 'user_left') {
+      users.value = users.value.filter(user => user.id !== message.user_id)
+      return
+    }
+    upsertUser(message.user)
+  }
+
+  // 加入或替换一个在线用户，只通知发生变化的用户
+  function upsertUser(user: OnlineUserType) {
+    const index = users.value.findIndex(existing => existing.id === user.id)
+    if (index === -1) {
+      users.value = [...users.value, user]
+    } else {
+      users.value = users.value.map(existing => existing.id === user.id ? user : existing)
+    }
+    eventBus.emit(EVENT_NAMES.ONLINE_USERS_UPDATED, [user])
+  }
+
+  // 丢弃当前版本并请求完整快照
+  function requestSnapshot() {
+    presenceVersion.value = null
+    sendMessage({ type: 'get_online_users' })
+  }
+
   // 节流版本的发送消息函数
   const throttledSendMessage = throttle(sendMessage, 1000); // 限制每秒最多发送一次
 
@@ -458,26 +512,6 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
     }
   }
 
-  // 定期同步在线用户列表
-  function startSyncInterval() {
-    if (syncInterval.value) {
-      clearInterval(syncInterval.value);
-    }
-
-    syncInterval.value = window.setInterval(() => {
-      if (isConnected.value) {
-        sendMessage({ type: 'get_online_users' });
-      }
-    }, 60000); // 每分钟同步一次
-  }
-
-  function stopSyncInterval() {
-    if (syncInterval.value) {
-      clearInterval(syncInterval.value);
-      syncInterval.value = null;
-    }
-  }
-
   /**
    * 设置隐私模式
    * @param enabled 是否启用隐私模式
@@ -503,7 +537,6 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
   // 清理函数
   function cleanup() {
     stopHeartbeat();
-    stopSyncInterval();
     disconnect();
   }
 
@@ -532,12 +565,13 @@ export const useOnlineUsersStore = defineStore('onlineUsers', () => {
 
   const requestUpdate = () => {
     if (isConnected.value && socket.value) {
-      socket.value.send(JSON.stringify({ type: 'get_online_users' }));
+      requestSnapshot();
     }
   }
 
   return {
     users,
+    presenceVersion,
     isConnected,
     isLoading,
     error,
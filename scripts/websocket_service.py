@@ -2,16 +2,21 @@
 """
 WebSocket服务
 独立运行WebSocket服务，避免与主API服务冲突
+设置 WS_BACKPLANE_URL 后可运行多个进程/节点，在线用户和任务更新通过Redis在节点间共享
+
+在线用户协议：连接时收到完整快照 online_users_updated，之后只收到增量 user_joined / user_left / user_updated，
+每条消息带全局递增的 version；客户端发现版本号不连续或收到 presence_resync 时发送 get_online_users 重新获取快照
 """
 
 import os
 import sys
 import uvicorn
 from pathlib import Path
-from fastapi import FastAPI, WebSocket, Depends
-from sqlalchemy.orm import Session
-from typing import Dict
+from fastapi import FastAPI, WebSocket, Header, HTTPException
+from sqlalchemy import select
+from typing import Dict, Optional
 import json
+import hmac
 import asyncio
 import logging
 import time
@@ -19,10 +24,6 @@ from jose import JWTError, jwt
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 
-# 全局变量
-connected_users = {}  # 存储所有连接的WebSocket客户端
-user_privacy_mode = {}  # 存储用户的隐私模式状态
-
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -50,8 +51,8 @@ else:
     else:
         logger.warning("No .env file found, using default values")
 
-# 导入数据库依赖
-from app.database import get_db
+# 导入数据库依赖：连接不持有数据库会话，只在认证和读取用户资料时使用短时的异步会话
+from app.database import AsyncSessionLocal
 # 导入所有需要的模型
 from app.modules.common.models.user import User
 # 导入Task模型以解决关系问题
@@ -60,7 +61,25 @@ from app.modules.study.models.task import Task
 from app.modules.study.models.plan import Plan
 # 导入Achievement模型以解决关系问题
 from app.modules.study.models.achievement import Achievement
-from app.core.config import SECRET_KEY, ALGORITHM
+from app.core.config import (
+    SECRET_KEY, ALGORITHM, WS_BACKPLANE_URL, WS_BACKPLANE_PREFIX, WS_NODE_TTL,
+    WS_PROFILE_CACHE_SIZE, WS_PROFILE_CACHE_TTL, WS_SEND_QUEUE_SIZE, WS_SLOW_CONSUMER_POLICY
+)
+from app.core.backplane import create_backplane, internal_token
+from app.core.fanout import Connection, FanOut
+from app.core.cache import create_cache
+from app.core.db_metrics import pool_stats
+from app.services.avatars import avatar_ref
+
+# 本节点的WebSocket连接，user_id -> Connection（每个连接有独立的发送队列和写任务）；
+# 在线用户和隐私模式由 backplane 在所有节点间共享
+connected_users = FanOut(maxsize=WS_SEND_QUEUE_SIZE, policy=WS_SLOW_CONSUMER_POLICY)
+# 在线状态与跨节点消息分发
+backplane = create_backplane(WS_BACKPLANE_URL, prefix=WS_BACKPLANE_PREFIX, node_ttl=WS_NODE_TTL)
+# 用户精简资料缓存（id、用户名、头像地址），user_id -> 资料；头像只保存按内容哈希生成的地址
+profile_cache = create_cache("ws_profiles", maxsize=WS_PROFILE_CACHE_SIZE, ttl=WS_PROFILE_CACHE_TTL)
+# 分配在线状态版本号到分发完成之间持有，本节点的客户端和其他节点按版本号顺序收到增量
+presence_lock = asyncio.Lock()
 
 # 确保使用正确的SECRET_KEY
 logger.info(f"Using SECRET_KEY: {SECRET_KEY[:10]}...")
@@ -78,11 +97,12 @@ app.add_middleware(
 )
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket):
     logger.info(f"New WebSocket connection attempt from {websocket.client}")
     await websocket.accept()
     logger.info(f"WebSocket connection accepted from {websocket.client}")
     user_id = None
+    connection = None
 
     try:
         # 等待认证消息
@@ -127,7 +147,7 @@ async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)
 
                 # 获取用户ID
                 logger.info(f"Looking up user in database: {username}")
-                user = db.query(User).filter(User.username == username).first()
+                user = await find_user(username)
 
                 if not user:
                     logger.error(f"User not found in database: {username}")
@@ -158,7 +178,7 @@ async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)
 
                 # 获取用户ID
                 logger.info(f"Looking up user in database: {username}")
-                user = db.query(User).filter(User.username == username).first()
+                user = await find_user(username)
 
                 if not user:
                     logger.error(f"User not found in database: {username}")
@@ -176,11 +196,15 @@ async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)
             return
 
         # 存储连接
-        connected_users[user_id] = websocket
+        before = await backplane.status(user_id)
+        connection = connected_users.add(user_id, websocket)
+        profile_cache.set(user_id, slim_profile(user.id, user.username, user.avatar))
+        await backplane.join(user_id)
         logger.info(f"User {user_id} connected. Total users: {len(connected_users)}")
 
-        # 广播在线用户列表
-        await broadcast_online_users(db)
+        # 新连接收到完整快照，其他用户收到增量
+        await send_online_snapshot(connection, user_id)
+        await presence_changed(user_id, before, await backplane.status(user_id))
 
         # 保持连接并处理消息
         while True:
@@ -191,20 +215,21 @@ async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)
 
                 # 处理心跳消息
                 if message.get("type") == "heartbeat":
-                    await websocket.send_json({"type": "heartbeat_ack"})
+                    connection.send(dump_message({"type": "heartbeat_ack"}))
 
-                # 处理获取在线用户列表请求
+                # 处理获取在线用户列表请求（只回复请求者）
                 elif message.get("type") == "get_online_users":
-                    await broadcast_online_users(db)
+                    await send_online_snapshot(connection, user_id)
 
                 # 处理隐私模式设置
                 elif message.get("type") == "privacy_mode":
                     # 记录用户隐私模式设置
-                    privacy_enabled = message.get("enabled", False)
-                    user_privacy_mode[user_id] = privacy_enabled
+                    privacy_enabled = bool(message.get("enabled", False))
+                    before = await backplane.status(user_id)
+                    await backplane.set_privacy(user_id, privacy_enabled)
                     logger.info(f"User {user_id} set privacy mode: {privacy_enabled}")
-                    # 更新在线用户列表
-                    await broadcast_online_users(db)
+                    # 发送在线状态增量
+                    await presence_changed(user_id, before, await backplane.status(user_id))
 
                 # 处理任务更新消息
                 elif message.get("type") == "task_update":
@@ -224,7 +249,7 @@ async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)
             except json.JSONDecodeError:
                 # 如果不是JSON格式，可能是简单的ping消息
                 if data == "ping":
-                    await websocket.send_text("pong")
+                    connection.send("pong")
                 else:
                     logger.warning(f"收到非JSON消息: {data}")
 
@@ -232,92 +257,157 @@ async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)
         logger.error(f"WebSocket error: {str(e)}")
     finally:
         # 断开连接时清理
-        if user_id and user_id in connected_users:
-            del connected_users[user_id]
-            if user_id in user_privacy_mode:
-                del user_privacy_mode[user_id]
+        if connection is not None:
+            await disconnect_user(connection)
             logger.info(f"User {user_id} disconnected. Total users: {len(connected_users)}")
-            # 广播更新后的在线用户列表
-            await broadcast_online_users(db)
 
-async def broadcast_online_users(db: Session):
-    """广播在线用户列表到所有连接的客户端"""
-    if not connected_users:
-        logger.info("没有连接的客户端")
+async def disconnect_user(connection: Connection):
+    """移除本节点上的连接并发送离开增量；连接已被同一用户的新连接替换时用户仍在线，不发送"""
+    if not await connected_users.remove(connection):
         return
+    user_id = connection.key
+    before = await backplane.status(user_id)
+    await backplane.leave(user_id)
+    await presence_changed(user_id, before, await backplane.status(user_id))
+
+def slim_profile(user_id: int, username: str, avatar: Optional[str]) -> dict:
+    """在线用户列表使用的精简资料，头像为地址而不是内嵌的数据"""
+    return {"id": user_id, "username": username, "avatar": avatar_ref(user_id, avatar)}
+
+async def find_user(username: str):
+    """按用户名读取认证所需的用户字段，查询结束即归还数据库连接"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(User.id, User.username, User.avatar).where(User.username == username))
+        return result.first()
+
+async def load_profiles(user_ids) -> Dict[int, dict]:
+    """读取用户的精简资料，缓存未命中的用户合并为一次查询（短时会话）"""
+    profiles, missing = {}, []
+    for user_id in user_ids:
+        profile = profile_cache.get(user_id)
+        if profile is None:
+            missing.append(user_id)
+        else:
+            profiles[user_id] = profile
+    if missing:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(User.id, User.username, User.avatar).where(User.id.in_(missing)))
+            rows = result.all()
+        for row in rows:
+            profiles[row.id] = slim_profile(row.id, row.username, row.avatar)
+            profile_cache.set(row.id, profiles[row.id])
+    return profiles
+
+async def profile_of(user_id: int) -> Optional[dict]:
+    """单个用户的精简资料，缓存未命中时读取数据库"""
+    return (await load_profiles([user_id])).get(user_id)
+
+async def refresh_profile(user_id: int):
+    """
+    API通知用户资料变化：清除缓存；用户在本节点在线时重新读取资料并发送 user_updated 增量
+    （用户在多个节点都有连接时每个节点各发送一次，客户端按版本号依次应用，结果相同）。
+    开启隐私模式的用户只有本人看得到，只向本人发送不带版本号的 user_updated，
+    不占用全局版本号（否则其他客户端会发现版本号不连续而重新获取快照）
+    """
+    profile_cache.delete(user_id)
+    if user_id not in connected_users:
+        return
+    status = await backplane.status(user_id)
+    profile = await profile_of(user_id)
+    if status is None or profile is None:
+        return
+    private = {"action": "user_updated", "user": online_user_entry(profile, status)}
+    if status:
+        connected_users.send(user_id, dump_message(private))
+    else:
+        public = {"action": "user_updated", "user": online_user_entry(profile)}
+        await publish_presence_delta(user_id, public, private)
+    logger.info(f"用户 {user_id} 的资料已更新")
+
+def online_user_entry(profile: dict, privacy_mode: bool = False) -> dict:
+    """在线用户列表中的一项"""
+    return {
+        "id": profile["id"],
+        "username": profile["username"],
+        "avatar": profile["avatar"],
+        "lastActivity": int(time.time()),
+        "privacyMode": privacy_mode
+    }
 
-    # 获取在线用户信息
-    user_ids = list(connected_users.keys())
-    users = db.query(User).filter(User.id.in_(user_ids)).all()
-    
-    logger.info(f"当前在线用户ID列表: {user_ids}")
-    logger.info(f"当前隐私模式状态: {user_privacy_mode}")
-
-    # 构建基础用户信息列表
-    base_users = []
-    for user in users:
-        privacy_mode = user_privacy_mode.get(user.id, False)
-        logger.info(f"用户 {user.username}(ID: {user.id}) 的隐私模式状态: {privacy_mode}")
-        base_users.append({
-            "id": user.id,
-            "username": user.username,
-            "avatar": user.avatar,
-            "lastActivity": int(time.time()),
-            "privacyMode": privacy_mode
-        })
-
-    logger.info(f"准备广播在线用户列表: {len(base_users)}人在线")
-
-    # 为每个连接的用户广播定制的在线用户列表
-    for user_id, websocket in connected_users.items():
-        try:
-            # 获取当前用户的隐私模式状态
-            current_user_privacy = user_privacy_mode.get(user_id, False)
-            logger.info(f"用户 {user_id} 的隐私模式状态: {current_user_privacy}")
-            
-            # 创建定制的用户列表
-            filtered_users = []
-            
-            # 添加当前用户（如果存在）
-            current_user = next((user for user in base_users if user["id"] == user_id), None)
-            if current_user:
-                filtered_users.append(current_user)
-                logger.info(f"添加当前用户到列表: {current_user['username']}")
-            
-            # 添加其他非隐私模式的用户
-            for user in base_users:
-                if user["id"] != user_id and not user["privacyMode"]:
-                    filtered_users.append(user)
-                    logger.info(f"添加其他用户到列表: {user['username']}")
-            
-            # 创建消息
-            message = {
-                "action": "online_users_updated",
-                "users": filtered_users
-            }
-            
-            # 发送消息
-            await websocket.send_json(message)
-            logger.info(f"成功向用户 {user_id} 发送在线用户列表，包含 {len(filtered_users)} 个用户")
-            
-        except Exception as e:
-            logger.error(f"向用户 {user_id} 发送在线用户列表失败: {str(e)}")
-            # 如果发送失败，可能是连接已断开，尝试清理连接
-            try:
-                await websocket.close()
-            except:
-                pass
-            if user_id in connected_users:
-                del connected_users[user_id]
-                logger.info(f"清理断开的连接: 用户 {user_id}")
-
-    return base_users
+def dump_message(message: dict) -> str:
+    """序列化消息（与 send_json 的格式一致），同一条消息只序列化一次"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+async def send_online_snapshot(connection: Connection, user_id: int):
+    """
+    向单个客户端发送完整的在线用户列表（连接时、或客户端发现版本号不连续时请求）
+    其他用户只能看到未开启隐私模式的用户，当前用户总是排在最前
+    """
+    # 先取版本号再读在线用户：快照可能已包含之后的变化，客户端再应用这些增量结果不变
+    version = await backplane.current_version()
+    online = await backplane.online()
+    visible_ids = [online_id for online_id, privacy in online.items() if online_id == user_id or not privacy]
+    profiles = await load_profiles(visible_ids)
+    users = sorted(profiles.values(), key=lambda profile: profile["id"] != user_id)
+
+    connection.send(dump_message({
+        "action": "online_users_updated",
+        "users": [online_user_entry(profile, online.get(profile["id"], False)) for profile in users],
+        "version": version
+    }))
+    logger.info(f"向用户 {user_id} 发送在线用户快照，版本 {version}，包含 {len(users)} 个用户")
+
+async def presence_changed(user_id: int, before: Optional[bool], after: Optional[bool]):
+    """
+    用户的在线状态从 before 变为 after（None 表示不在线，否则为隐私模式）后生成增量并分发到所有节点
+    对其他用户而言开启隐私模式等同于离开、关闭等同于加入；用户自己的连接收到 user_updated。
+    只有可见的变化才分配版本号，每个版本号每个连接恰好收到一条消息
+    """
+    visible_before, visible_after = before is False, after is False
+    public = None
+    if visible_after and not visible_before:
+        public = {"action": "user_joined", "user": online_user_entry(await profile_of(user_id))}
+    elif visible_before and not visible_after:
+        public = {"action": "user_left", "user_id": user_id}
+
+    private = None
+    if before is not None and after is not None and before != after:
+        private = {"action": "user_updated", "user": online_user_entry(await profile_of(user_id), after)}
+
+    if public is None and private is None:
+        return
+    await publish_presence_delta(user_id, public, private)
+
+async def publish_presence_delta(user_id: int, public: Optional[dict], private: Optional[dict]):
+    """
+    为增量分配版本号，发送给本节点的客户端和其他节点。
+    分配版本号和发布都会让出事件循环，整个过程持有 presence_lock，避免同一节点上并发的变化乱序（v+2 先于 v+1）
+    """
+    async with presence_lock:
+        version = await backplane.next_version()
+        event = {
+            "type": "presence_delta",
+            "subject_id": user_id,
+            "public": dict(public, version=version) if public else None,
+            "private": dict(private, version=version) if private else None
+        }
+        deliver_presence_delta(event)
+        await backplane.publish(event)
+
+def deliver_presence_delta(event: dict):
+    """把在线状态增量放入本节点客户端的发送队列：用户本人收到 private（没有时收到 public），其他用户收到 public"""
+    subject_id = event["subject_id"]
+    if event["public"]:
+        connected_users.broadcast(dump_message(event["public"]), exclude=subject_id)
+    if event["private"] or event["public"]:
+        connected_users.send(subject_id, dump_message(event["private"] or event["public"]))
+
+def deliver_presence_resync(message: dict):
+    """通知本节点的所有客户端重新获取在线用户快照"""
+    connected_users.broadcast(dump_message({"action": "presence_resync", "version": message["version"]}))
 
 async def broadcast_task_update(sender_id: int, action: str, task_data: dict):
-    """广播任务更新消息到所有连接的客户端"""
-    if not connected_users:
-        return
-        
+    """广播任务更新消息到所有节点连接的客户端"""
     logger.info(f"广播任务更新: {action}, 发送者: {sender_id}, 任务ID: {task_data.get('id')}")
     
     # 任务更新消息
@@ -340,35 +430,79 @@ async def broadcast_task_update(sender_id: int, action: str, task_data: dict):
         "sender_id": sender_id,
         "timestamp": int(time.time())
     }
-    
-    # 向除了发送者以外的所有用户广播消息
-    for user_id, websocket in connected_users.items():
-        if user_id != sender_id:  # 不向发送者广播
-            try:
-                await websocket.send_json(message)
-                logger.info(f"已向用户 {user_id} 发送任务更新消息")
-            except Exception as e:
-                logger.error(f"向用户 {user_id} 发送任务更新消息失败: {str(e)}")
-                
+
+    # 其他节点收到后各自发送给它们的客户端
+    await backplane.publish(message)
+    deliver_task_update(message)
     return True
 
-# 定期广播在线用户列表（保持活跃连接）
+def deliver_task_update(message: dict):
+    """把任务更新消息（只序列化一次）放入本节点除发送者以外所有用户的发送队列"""
+    queued = connected_users.broadcast(dump_message(message), exclude=message.get("sender_id"))
+    logger.info(f"已向 {queued} 个用户发送任务更新消息")
+
+async def handle_backplane_message(message: dict):
+    """处理其他节点转发的消息"""
+    if message.get("type") == "presence_delta":
+        # 增量中带有用户的精简资料，顺便更新缓存，之后的快照不再读取数据库
+        for delta in (message["public"], message["private"]):
+            if delta and "user" in delta:
+                profile_cache.set(delta["user"]["id"], {key: delta["user"][key] for key in ("id", "username", "avatar")})
+        deliver_presence_delta(message)
+    elif message.get("type") == "profile_changed":
+        await refresh_profile(message["user_id"])
+    elif message.get("type") == "presence_resync":
+        deliver_presence_resync(message)
+    elif message.get("type") == "task_update":
+        deliver_task_update(message)
+
+@app.post("/internal/notify")
+async def internal_notify(message: dict, x_internal_token: str = Header("")):
+    """
+    单进程部署（没有Redis后端）时API通过此接口发送通知（如 profile_changed），
+    按来自其他节点的消息处理；令牌由共用的 SECRET_KEY 派生
+    """
+    if not hmac.compare_digest(x_internal_token, internal_token(SECRET_KEY)):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+    if message.get("type") != "profile_changed":
+        raise HTTPException(status_code=400, detail="Unsupported message type")
+    await handle_backplane_message(message)
+    return {"status": "ok"}
+
+@app.get("/stats")
+async def stats():
+    """本节点的连接数、各连接发送队列深度和数据库连接池使用量（只在内网访问，Nginx只代理 /ws）"""
+    return {"backplane": backplane.stats(), "fanout": connected_users.stats(), "database_pools": pool_stats()}
+
+# 定期清理异常退出的节点
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(periodic_broadcast())
-
-async def periodic_broadcast():
-    """定期广播在线用户列表，保持连接活跃"""
+    await backplane.start(handle_backplane_message)
+    asyncio.create_task(periodic_reap())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 删除本节点的在线用户并通知其他节点
+    for _, connection in connected_users.items():
+        await disconnect_user(connection)
+    await backplane.close()
+
+async def periodic_reap():
+    """
+    定期清理已过期的节点。异常退出的节点没有发送离开增量，其用户随节点哈希过期消失，
+    此时分配新版本号并通知所有客户端重新获取快照
+    """
     while True:
-        await asyncio.sleep(30)  # 每30秒广播一次
-        if connected_users:
-            # 获取数据库会话
-            from app.database import SessionLocal
-            db = SessionLocal()
-            try:
-                await broadcast_online_users(db)
-            finally:
-                db.close()
+        await asyncio.sleep(WS_NODE_TTL)
+        try:
+            if await backplane.reap():
+                async with presence_lock:
+                    message = {"type": "presence_resync", "version": await backplane.next_version()}
+                    deliver_presence_resync(message)
+                    await backplane.publish(message)
+                logger.info(f"已清理过期的WebSocket节点，通知客户端重新同步，版本 {message['version']}")
+        except Exception as e:
+            logger.error(f"清理WebSocket节点失败: {str(e)}")
 
 if __name__ == "__main__":
     # 启动WebSocket服务